@@ -9,21 +9,30 @@ use ``TraceabilityLedger`` so the application aligns with the current
 traceability implementation.
 """
 
-from flask import Flask, request, jsonify, render_template_string, make_response, Response
+from flask import Flask, request, jsonify, render_template_string, make_response, Response, g
 import json
 import base64
+import random
 from datetime import datetime
 import subprocess
 import shutil
 import hashlib
+import heapq
 import os
 import hmac
 import logging
 from pathlib import Path
 import io
+import queue
 import sys
+import threading
 import time
 import re
+import uuid
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import gzip
 import importlib.util
 from prometheus_client import (
     Counter,
@@ -34,6 +43,11 @@ from prometheus_client import (
     CollectorRegistry,
 )
 
+try:  # Optional: serve pre-compressed pages with brotli when available.
+    import brotli
+except ImportError:  # pragma: no cover - brotli is not a hard dependency
+    brotli = None
+
 # Ensure the project root is on the module search path so local modules
 # such as ``incident_responder`` can be imported when running this file
 # directly.
@@ -67,6 +81,7 @@ from sensor_simulator import build_mapping
 from identity_enrollment import enroll_identity
 from channel_block_retrieval import fetch_channel_block
 from hybrid_lora_network import build_demo_network
+from flask_app.device_registry import scan_ids, sorted_ids
 from crt_pipeline import (
     Gateway as CRTGateway,
     SensorNode as CRTSensorNode,
@@ -133,11 +148,38 @@ REQUESTS = Counter(
     "gateway_requests_total", "Sensor requests", ["result"], registry=REGISTRY
 )
 COMMIT_LATENCY = Histogram(
-    "gateway_commit_latency_seconds", "Latency to commit sensor data", registry=REGISTRY
+    "gateway_commit_latency_seconds",
+    "Time to hand sensor data to the ledger client (enqueue, not commit)",
+    registry=REGISTRY,
+)
+STAGE_SECONDS = Histogram(
+    "gateway_stage_seconds",
+    "Time spent in each request-handling stage of sensor ingestion",
+    ["stage"],
+    registry=REGISTRY,
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0),
 )
+HMAC_SECONDS = STAGE_SECONDS.labels("hmac_verify")
+DECODE_SECONDS = STAGE_SECONDS.labels("json_decode")
 BACKLOG_GAUGE = Gauge(
     "gateway_backlog_depth", "Total backlog records", registry=REGISTRY
 )
+SHARD_DEPTH = Gauge(
+    "gateway_shard_queue_depth",
+    "Readings waiting in each ingest worker shard",
+    ["shard"],
+    registry=REGISTRY,
+)
+REQUEST_SECONDS = Histogram(
+    "gateway_request_seconds",
+    "Time to handle an HTTP request, by route and status code",
+    ["route", "status"],
+    registry=REGISTRY,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0),
+)
+# Fraction of requests observed by ``REQUEST_SECONDS``; lower it on busy
+# gateways to trim per-request overhead.
+REQUEST_SAMPLE_RATE = float(os.environ.get("REQUEST_SAMPLE_RATE", "1.0"))
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("gateway")
@@ -145,8 +187,11 @@ logger = logging.getLogger("gateway")
 # Track whether the Fabric network has been started
 BLOCKCHAIN_STARTED = False
 
-# Store recent HTTP access events
-ACCESS_LOG = []
+# Recent HTTP requests as ``(epoch, method, path, status, seconds)``.  A
+# bounded deque drops the oldest entry in O(1) and appends atomically, so
+# request threads need no lock.
+ACCESS_LOG_SIZE = int(os.environ.get("ACCESS_LOG_SIZE", "50"))
+ACCESS_LOG: deque = deque(maxlen=ACCESS_LOG_SIZE)
 
 
 TRACE_CHAIN = TraceabilityLedger()
@@ -164,16 +209,25 @@ TRACE_CHAIN.add_nft(
 
 
 @app.before_request
-def log_access():
-    """Record basic request info for the access log."""
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def log_access(response):
+    """Record the request in the access log and the latency histogram.
+
+    Streaming responses are timed up to the point the body starts.
+    """
+    started = g.pop("request_started", None)
+    elapsed = time.perf_counter() - started if started is not None else 0.0
     ACCESS_LOG.append(
-        {
-            "time": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
-            "path": request.path,
-        }
+        (time.time(), request.method, request.path, response.status_code, elapsed)
     )
-    if len(ACCESS_LOG) > 50:
-        del ACCESS_LOG[0]
+    if REQUEST_SAMPLE_RATE >= 1.0 or random.random() < REQUEST_SAMPLE_RATE:
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        REQUEST_SECONDS.labels(route, str(response.status_code)).observe(elapsed)
+    return response
 
 
 # Mapping of node identifiers to their IP addresses and attached sensors.  The
@@ -183,24 +237,6 @@ def log_access():
 NODE_MAP = {}
 
 
-def compute_merkle_root(tx_hashes):
-    """Return Merkle root and list of levels for given transaction hashes."""
-    if not tx_hashes:
-        return "0x0", []
-    level = tx_hashes[:]
-    tree = [level]
-    while len(level) > 1:
-        next_level = []
-        for i in range(0, len(level), 2):
-            left = level[i]
-            right = level[i + 1] if i + 1 < len(level) else left
-            m = hashlib.sha256((left + right).encode()).hexdigest()
-            next_level.append(m)
-        level = next_level
-        tree.append(level)
-    return level[0], tree
-
-
 def _group_devices(devices):
     """Group individual sensor IDs into Raspberry Pi nodes.
 
@@ -222,29 +258,174 @@ def _group_devices(devices):
 
 def _apply_mapping(mapping):
     """Store the simulator mapping for later discovery requests."""
+    global _NODE_MAP_VERSION
     NODE_MAP.clear()
     NODE_MAP.update(mapping)
+    _NODE_MAP_VERSION += 1
 
 
-def build_csv(sensor_id=None, start=None, end=None):
-    """Return CSV bytes and SHA256 hash for the requested data."""
+_NODE_MAP_VERSION = 0
+
+
+def _node_list():
+    """Return the registered nodes with their IP and attached sensors."""
+    node_list = []
+    for node_id, sensors in _group_devices(list_devices() or []).items():
+        info = NODE_MAP.get(node_id, {})
+        node_list.append(
+            {
+                "id": node_id,
+                "ip": info.get("ip", node_id),
+                "sensors": list(sensors.keys()),
+            }
+        )
+    return node_list
+
+
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_FIELDS = ["id", "temperature", "humidity", "timestamp", "payload"]
+
+
+def iter_csv(sensor_id=None, start=None, end=None, digest=None):
+    """Yield the CSV export for the requested data as byte chunks.
+
+    Records are streamed in timestamp order from the ledger client and
+    encoded in chunks of about ``EXPORT_CHUNK_BYTES``, so memory use does not
+    grow with the size of the export.  ``digest`` (a ``hashlib`` object) is
+    updated with every chunk before it is yielded.
+    """
     import csv
 
-    if sensor_id:
-        records = get_sensor_history(sensor_id, start, end)
-    else:
-        records = get_all_sensor_data(start, end)
-    records.sort(key=lambda r: r["timestamp"])
+    sensor_ids = [sensor_id] if sensor_id else None
+    records = hlf_client.iter_sensor_data(start, end, sensor_ids)
     out = io.StringIO()
-    writer = csv.DictWriter(
-        out, fieldnames=["id", "temperature", "humidity", "timestamp", "payload"]
-    )
+    writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+
+    def flush():
+        chunk = out.getvalue().encode("utf-8")
+        out.seek(0)
+        out.truncate()
+        if digest is not None:
+            digest.update(chunk)
+        return chunk
+
     writer.writeheader()
     for r in records:
         writer.writerow(r)
-    data = out.getvalue().encode("utf-8")
-    h = hashlib.sha256(data).hexdigest()
-    return data, h
+        if out.tell() >= EXPORT_CHUNK_BYTES:
+            yield flush()
+    chunk = flush()
+    if chunk:
+        yield chunk
+
+
+def build_csv(sensor_id=None, start=None, end=None):
+    """Return CSV bytes and SHA256 hash for the requested data."""
+    digest = hashlib.sha256()
+    data = b"".join(iter_csv(sensor_id, start, end, digest))
+    return data, digest.hexdigest()
+
+
+def export_digest(sensor_id=None, start=None, end=None):
+    """Return the SHA256 of the CSV export, from cache when possible.
+
+    A miss streams the export through the hash without keeping it and caches
+    the result until a new reading lands in the range.
+    """
+    cached = hlf_client.get_export_digest(sensor_id, start, end)
+    if cached is not None:
+        return cached
+    version = hlf_client.data_version()
+    digest = hashlib.sha256()
+    for _ in iter_csv(sensor_id, start, end, digest):
+        pass
+    hexdigest = digest.hexdigest()
+    hlf_client.put_export_digest(sensor_id, start, end, hexdigest, version)
+    return hexdigest
+
+
+# Manifests of recent streamed exports.  The hash of a streamed export is only
+# known once the last byte is sent, so clients fetch it from
+# ``/export/<export_id>/manifest`` afterwards.
+EXPORT_MANIFESTS: "OrderedDict[str, dict]" = OrderedDict()
+MAX_EXPORT_MANIFESTS = 256
+_MANIFEST_LOCK = threading.Lock()
+
+
+def _stream_export(manifest, sensor_id, start, end, compress):
+    """Yield an export, gzip-compressed if ``compress``, and fill its manifest.
+
+    The generator holds ``manifest`` itself, so the export still completes if
+    the entry is evicted from ``EXPORT_MANIFESTS`` while it streams.
+    """
+    version = hlf_client.data_version()
+    digest = hashlib.sha256()
+    gzipper = zlib.compressobj(wbits=31) if compress else None
+    size = 0
+    for chunk in iter_csv(sensor_id, start, end, digest):
+        size += len(chunk)
+        if gzipper is not None:
+            chunk = gzipper.compress(chunk)
+            if not chunk:
+                continue
+        yield chunk
+    if gzipper is not None:
+        yield gzipper.flush()
+    hexdigest = digest.hexdigest()
+    with _MANIFEST_LOCK:
+        manifest.update({"sha256": hexdigest, "bytes": size, "complete": True})
+    hlf_client.put_export_digest(sensor_id, start, end, hexdigest, version)
+
+
+# Dashboard pages are plain HTML files in the project root.  They take no
+# template context, so each is compiled and rendered once, compressed once
+# per encoding and reloaded only when the file's mtime changes.
+PAGE_DIR = Path(__file__).resolve().parent.parent
+PAGE_MAX_AGE = int(os.environ.get("PAGE_MAX_AGE", "60"))
+_PAGES = {}
+_PAGES_LOCK = threading.Lock()
+
+
+def _compile_page(path: Path, mtime: int) -> dict:
+    body = app.jinja_env.from_string(path.read_text()).render().encode("utf-8")
+    bodies = {"identity": body, "gzip": gzip.compress(body, 9)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body)
+    return {
+        "mtime": mtime,
+        "etag": hashlib.sha256(body).hexdigest()[:16],
+        "bodies": bodies,
+    }
+
+
+def load_page(name: str) -> dict:
+    """Return the compiled entry for page ``name``, recompiling if it changed."""
+    path = PAGE_DIR / name
+    mtime = path.stat().st_mtime_ns
+    entry = _PAGES.get(name)
+    if entry is None or entry["mtime"] != mtime:
+        with _PAGES_LOCK:
+            entry = _PAGES.get(name)
+            if entry is None or entry["mtime"] != mtime:
+                entry = _PAGES[name] = _compile_page(path, mtime)
+    return entry
+
+
+def serve_page(name: str) -> Response:
+    """Serve a dashboard page in the best encoding the client accepts."""
+    entry = load_page(name)
+    accepted = request.accept_encodings
+    encoding = next(
+        (e for e in ("br", "gzip") if e in entry["bodies"] and accepted[e]),
+        "identity",
+    )
+    resp = Response(entry["bodies"][encoding], mimetype="text/html")
+    if encoding != "identity":
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.headers["Cache-Control"] = f"public, max-age={PAGE_MAX_AGE}, must-revalidate"
+    resp.set_etag(f"{entry['etag']}-{encoding}")
+    return resp.make_conditional(request)
 
 
 @app.route("/")
@@ -260,23 +441,14 @@ def index():
             body { padding-top: 20px; }
             </style>
             <script>
-            async function loadNodes() {
-                try {
-                    const res = await fetch('/nodes');
-                    const raw = await res.json();
-                    const nodes = Array.isArray(raw.nodes) ? raw.nodes : [];
-                    document.getElementById('node-count').innerText = raw.count ?? nodes.length;
-                    document.getElementById('node-list').innerHTML =
-                        nodes.map(n => {
-                            const ip = n.ip || n.id || n;
-                            const sensors = n.sensors ? n.sensors.join(', ') : '';
-                            return `<li>${ip}${sensors ? ' (' + sensors + ')' : ''}</li>`;
-                        }).join('');
-                } catch (err) {
-                    console.error('Load nodes failed:', err);
-                    document.getElementById('node-count').innerText = '0';
-                    document.getElementById('node-list').innerHTML = '';
-                }
+            function renderNodes(nodes) {
+                document.getElementById('node-count').innerText = nodes.length;
+                document.getElementById('node-list').innerHTML =
+                    nodes.map(n => {
+                        const ip = n.ip || n.id || n;
+                        const sensors = n.sensors ? n.sensors.join(', ') : '';
+                        return `<li>${ip}${sensors ? ' (' + sensors + ')' : ''}</li>`;
+                    }).join('');
             }
             async function showMerkle() {
                 const num = document.getElementById('block-num').value;
@@ -287,21 +459,38 @@ def index():
                 const levels = data.tree.map(l => '<li>' + l.join(', ') + '</li>').join('');
                 document.getElementById('merkle-tree').innerHTML = levels;
             }
-            async function loadReadings() {
-                const res = await fetch('/latest-readings');
-                const data = await res.json();
-                const rows = Object.entries(data).map(([id,r]) =>
-                    `<tr><td>${id}</td><td>${r.temperature}</td><td>${r.humidity}</td><td>${r.timestamp}</td></tr>`
-                ).join('');
-                document.getElementById('sensor-body').innerHTML = rows;
-            }
-            async function loadBlocks() {
-                const res = await fetch('/block-events');
-                const data = await res.json();
-                const rows = data.events.map(e =>
-                    `<tr><td>${e.time}</td><td>${e.message}</td></tr>`
-                ).join('');
-                document.getElementById('block-body').innerHTML = rows;
+            let snapshotVersion = null;
+            let snapshotTag = null;
+            const readings = {};
+            let events = [];
+            async function loadSnapshot() {
+                // Ask only for what changed since the last snapshot; an
+                // unchanged dashboard answers 304 with no body.
+                const url = '/dashboard-snapshot' +
+                    (snapshotVersion === null ? '' : '?since=' + snapshotVersion);
+                const headers = snapshotTag ? {'If-None-Match': snapshotTag} : {};
+                try {
+                    const res = await fetch(url, {headers, cache: 'no-store'});
+                    if (res.status === 304 || !res.ok) return;
+                    const data = await res.json();
+                    snapshotTag = res.headers.get('ETag');
+                    snapshotVersion = data.version;
+                    if (data.full) {
+                        Object.keys(readings).forEach(k => delete readings[k]);
+                        events = [];
+                    }
+                    if (data.nodes) renderNodes(data.nodes);
+                    Object.assign(readings, data.readings);
+                    events = events.concat(data.events).slice(-50);
+                    document.getElementById('sensor-body').innerHTML =
+                        Object.entries(readings).map(([id,r]) =>
+                            `<tr><td>${id}</td><td>${r.temperature}</td><td>${r.humidity}</td><td>${r.timestamp}</td></tr>`
+                        ).join('');
+                    document.getElementById('block-body').innerHTML =
+                        events.map(e => `<tr><td>${e.time}</td><td>${e.message}</td></tr>`).join('');
+                } catch (err) {
+                    console.error('Load snapshot failed:', err);
+                }
             }
             function formatChainResponse(data){
                 let msg = data.started ? 'Blockchain started' : 'Blockchain not running';
@@ -335,18 +524,42 @@ def index():
                     alertBox.classList.add('d-none');
                 }
             }
+            let refreshPending = false;
+            function refreshOnCommit() {
+                // Coalesce bursts of commits into one refresh per second.
+                if (refreshPending) return;
+                refreshPending = true;
+                setTimeout(() => {
+                    refreshPending = false;
+                    loadSnapshot();
+                }, 1000);
+            }
+            let pollTimer = null;
             function startPolling() {
-                loadNodes();
-                loadReadings();
-                loadBlocks();
-                setInterval(loadNodes, 3000);
-                setInterval(loadReadings, 3000);
-                setInterval(loadBlocks, 3000);
+                // Fallback for browsers without SSE and while the stream is down.
+                if (pollTimer === null) pollTimer = setInterval(loadSnapshot, 3000);
+            }
+            function startUpdates() {
+                loadSnapshot();
+                if (typeof EventSource === 'undefined') {
+                    startPolling();
+                    return;
+                }
+                const source = new EventSource('/commits/stream');
+                source.addEventListener('commit', refreshOnCommit);
+                source.onerror = startPolling;
+                source.onopen = () => {
+                    if (pollTimer === null) return;
+                    // Reconnected: stop polling and catch up once.
+                    clearInterval(pollTimer);
+                    pollTimer = null;
+                    loadSnapshot();
+                };
             }
             document.addEventListener('DOMContentLoaded', () => {
                 document.getElementById('start-chain-btn').addEventListener('click', startChain);
                 document.getElementById('restart-chain-btn').addEventListener('click', restartChain);
-                startPolling();
+                startUpdates();
             });
             </script>
         </head>
@@ -442,18 +655,7 @@ def index():
 
 @app.route("/nodes")
 def nodes():
-    devices = list_devices()
-    grouped = _group_devices(devices)
-    node_list = []
-    for node_id, sensors in grouped.items():
-        info = NODE_MAP.get(node_id, {})
-        node_list.append(
-            {
-                "id": node_id,
-                "ip": info.get("ip", node_id),
-                "sensors": list(sensors.keys()),
-            }
-        )
+    node_list = _node_list()
     return jsonify({"count": len(node_list), "nodes": node_list})
 
 
@@ -463,16 +665,182 @@ def latest_readings():
     return jsonify(get_latest_readings())
 
 
+COMMIT_POLL_MAX_SECONDS = 30.0
+COMMIT_STREAM_HEARTBEAT_SECONDS = 15.0
+
+
+@app.route("/commits")
+def commits():
+    """Long-poll for commit events.
+
+    Returns events after ``after`` (optionally for one ``device`` and ``seq``)
+    as soon as one is available, or an empty list once ``timeout`` seconds
+    have passed.  ``last_id`` is the cursor to pass as ``after`` next time.
+    """
+    after = request.args.get("after", 0, type=int)
+    device = request.args.get("device")
+    seq = request.args.get("seq", type=int)
+    timeout = min(request.args.get("timeout", 10.0, type=float), COMMIT_POLL_MAX_SECONDS)
+    events = hlf_client.wait_for_commits(after, max(timeout, 0.0), device=device, seq=seq)
+    last_id = events[-1]["id"] if events else max(after, hlf_client.last_commit_id())
+    return jsonify({"events": events, "last_id": last_id})
+
+
+@app.route("/commits/stream")
+def commit_stream():
+    """Stream commit events as Server-Sent Events.
+
+    Resumes after the ``Last-Event-ID`` header (or ``after``) when given and
+    otherwise starts with the next commit.  ``device`` limits the stream to a
+    single device.
+    """
+    after = request.headers.get("Last-Event-ID", type=int)
+    if after is None:
+        after = request.args.get("after", hlf_client.last_commit_id(), type=int)
+    device = request.args.get("device")
+
+    def generate(last):
+        yield "retry: 3000\n\n"
+        while True:
+            events = hlf_client.wait_for_commits(
+                last, COMMIT_STREAM_HEARTBEAT_SECONDS, device=device
+            )
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                last = event["id"]
+                yield f"id: {last}\nevent: commit\ndata: {json.dumps(event)}\n\n"
+
+    return Response(
+        generate(after),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/block-events")
 def block_events():
     """Return recent blockchain operation events."""
     return jsonify({"events": get_block_events()})
 
 
+# The dashboard snapshot is shared by every open index page.  It is rebuilt
+# only when readings, block events or the node list change, and each rebuild
+# bumps ``version``.  Readings and events remember the version they changed
+# in so ``?since=<version>`` can return just the difference.
+DASHBOARD_FIELDS = ("temperature", "humidity", "timestamp")
+_DASHBOARD_LOCK = threading.RLock()
+_DASHBOARD = {
+    "version": 0,
+    "source": None,
+    "nodes": [],
+    "nodes_version": 0,
+    "readings": {},
+    "reading_versions": {},
+    "events": [],
+    "event_versions": {},
+}
+
+
+def _dashboard_source():
+    """Return cheap change markers for everything the snapshot contains."""
+    events = get_block_events() or []
+    return (
+        hlf_client.data_version(),
+        events[-1].get("id") if events else 0,
+        len(list_devices() or []),
+        _NODE_MAP_VERSION,
+    )
+
+
+def dashboard_snapshot():
+    """Return the current dashboard snapshot, rebuilding it if stale."""
+    with _DASHBOARD_LOCK:
+        source = _dashboard_source()
+        if source == _DASHBOARD["source"]:
+            return _DASHBOARD
+        version = _DASHBOARD["version"] + 1
+        nodes = _node_list()
+        if nodes != _DASHBOARD["nodes"]:
+            _DASHBOARD["nodes"] = nodes
+            _DASHBOARD["nodes_version"] = version
+        old = _DASHBOARD["readings"]
+        readings = {}
+        for device, record in (get_latest_readings() or {}).items():
+            reading = {field: record.get(field) for field in DASHBOARD_FIELDS}
+            readings[device] = reading
+            if old.get(device) != reading:
+                _DASHBOARD["reading_versions"][device] = version
+        events = list(get_block_events() or [])
+        seen = _DASHBOARD["event_versions"]
+        _DASHBOARD["event_versions"] = {
+            e.get("id"): seen.get(e.get("id"), version) for e in events
+        }
+        _DASHBOARD.update(
+            version=version, source=source, readings=readings, events=events
+        )
+        return _DASHBOARD
+
+
+@app.route("/dashboard-snapshot")
+def dashboard_snapshot_route():
+    """Return nodes, latest readings and block events in one response.
+
+    The ``ETag`` is the snapshot version, so a client sending it back in
+    ``If-None-Match`` gets ``304 Not Modified`` until something changes.
+    With ``since=<version>`` only nodes, readings and events changed after
+    that version are included and ``full`` is false.
+    """
+    with _DASHBOARD_LOCK:
+        snap = dashboard_snapshot()
+        version = snap["version"]
+        etag = f'"dash-{version}"'
+        if etag in request.headers.get("If-None-Match", ""):
+            resp = make_response("", 304)
+        else:
+            since = request.args.get("since", type=int)
+            full = since is None or since > version
+            if full:
+                since = 0
+            versions = snap["reading_versions"]
+            body = {
+                "version": version,
+                "full": full,
+                "nodes": snap["nodes"] if full or snap["nodes_version"] > since else None,
+                "readings": {
+                    dev: r
+                    for dev, r in snap["readings"].items()
+                    if versions.get(dev, 0) > since
+                },
+                "events": [
+                    e
+                    for e in snap["events"]
+                    if snap["event_versions"].get(e.get("id"), 0) > since
+                ],
+            }
+            resp = jsonify(body)
+    resp.headers["ETag"] = etag
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
 @app.route("/start-blockchain", methods=["POST"])
 def start_blockchain_route():
-    checks, started, error = start_blockchain()
-    return jsonify({"started": started, "checks": checks, "error": error})
+    """Return the network state, re-running the checks once it is stale.
+
+    ``?refresh=1`` ignores the cached result.
+    """
+    max_age = 0.0 if _flag("refresh") else SYSTEM_CHECK_TTL
+    state = start_blockchain_cached(max_age)
+    return jsonify(
+        {
+            "started": state["started"],
+            "checks": state["checks"],
+            "error": state["error"],
+            "checked_at": state["checked_at"],
+        }
+    )
 
 
 @app.route("/restart-blockchain", methods=["POST"])
@@ -483,8 +851,25 @@ def restart_blockchain_route():
 
 @app.route("/health")
 def health():
-    """Simple health probe for monitoring."""
-    return jsonify({"status": "ok"}), 200
+    """Health probe for monitoring.
+
+    Reports the cached blockchain checks without running them; a stale
+    result triggers a refresh in the background.
+    """
+    state = SYSTEM_STATE
+    # ``checked_at`` is 0 until the first run, which counts as stale.
+    if time.time() - state["checked_at"] > SYSTEM_CHECK_TTL:
+        start_blockchain_in_background()
+    return jsonify(
+        {
+            "status": "ok",
+            "blockchain": {
+                "started": state["started"],
+                "checked_at": state["checked_at"],
+                "failed": [c["check"] for c in state["checks"] or [] if not c["ok"]],
+            },
+        }
+    ), 200
 
 
 def ping_node(ip: str) -> bool:
@@ -592,41 +977,96 @@ def _chaincode_committed(name: str) -> bool:
         return False
 
 
-def ensure_admin_enrollment(net_dir: Path) -> None:
-    """Ensure admin identities have valid MSP/TLS credentials."""
+# Admin identity per organisation: (CA URL, peer address).
+_ADMIN_ENROLLMENTS = {
+    "org1": ("http://localhost:7054", "peer0.org1.example.com:7051"),
+    "org2": ("http://localhost:8054", "peer0.org2.example.com:9051"),
+}
+
 
+def _enroll_admin(net_dir: Path, org: str, ca_url: str, peer: str) -> None:
+    users = net_dir / f"organizations/peerOrganizations/{org}.example.com/users"
     enroll_identity(
         "admin",
-        "http://localhost:7054",
-        net_dir
-        / "organizations/peerOrganizations/org1.example.com/users/Admin@org1.example.com/msp",
-        net_dir
-        / "organizations/peerOrganizations/org1.example.com/users/Admin@org1.example.com/tls",
-        "peer0.org1.example.com:7051",
+        ca_url,
+        users / f"Admin@{org}.example.com/msp",
+        users / f"Admin@{org}.example.com/tls",
+        peer,
         "orderer.example.com:7050",
         secret="adminpw",
     )
-    enroll_identity(
-        "admin",
-        "http://localhost:8054",
-        net_dir
-        / "organizations/peerOrganizations/org2.example.com/users/Admin@org2.example.com/msp",
-        net_dir
-        / "organizations/peerOrganizations/org2.example.com/users/Admin@org2.example.com/tls",
-        "peer0.org2.example.com:9051",
-        "orderer.example.com:7050",
-        secret="adminpw",
+
+
+def ensure_admin_enrollment(net_dir: Path) -> None:
+    """Ensure admin identities have valid MSP/TLS credentials.
+
+    Each organisation has its own CA, so the enrollments run concurrently.
+    """
+    _probe_all(
+        {
+            org: (_enroll_admin, net_dir, org, *args)
+            for org, args in _ADMIN_ENROLLMENTS.items()
+        }
     )
 
 
+# Fabric probes shell out to docker, so they run concurrently on a small pool
+# and the combined result is cached for ``SYSTEM_CHECK_TTL`` seconds.
+# Requests read the cache; registrations refresh it in the background.
+SYSTEM_CHECK_TTL = float(os.environ.get("SYSTEM_CHECK_TTL", "30"))
+SYSTEM_CHECK_WORKERS = int(os.environ.get("SYSTEM_CHECK_WORKERS", "8"))
+_PROBE_POOL = ThreadPoolExecutor(
+    max_workers=SYSTEM_CHECK_WORKERS, thread_name_prefix="fabric-probe"
+)
+_CONTAINERS = {
+    "orderer": "orderer.example.com",
+    "peer1": "peer0.org1.example.com",
+    "peer2": "peer0.org2.example.com",
+    "ca1": "ca_org1",
+    "ca2": "ca_org2",
+    "couch0": "couchdb0",
+    "couch1": "couchdb1",
+}
+SYSTEM_STATE = {"checks": None, "started": False, "error": None, "checked_at": 0.0}
+_START_LOCK = threading.Lock()
+
+
+def _probe_all(probes):
+    """Run ``{name: (func, *args)}`` concurrently and return results by name."""
+    futures = {
+        name: _PROBE_POOL.submit(func, *args) for name, (func, *args) in probes.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
+
+
+def _fabric_probes(root: Path):
+    probes = {name: (_container_running, c) for name, c in _CONTAINERS.items()}
+    probes.update(_ledger_probes(root))
+    return probes
+
+
+def _ledger_probes(root: Path):
+    probes = {
+        "h1": (_ledger_height, "peer0.org1.example.com"),
+        "h2": (_ledger_height, "peer0.org2.example.com"),
+        "cc_sensor": (_chaincode_committed, "sensor"),
+    }
+    if (root / "chaincode/agri").is_dir():
+        probes["cc_agri"] = (_chaincode_committed, "agri")
+    return probes
+
+
 def run_system_checks():
     """Ensure the Fabric test network is running and healthy."""
     checks = []
 
-    docker_ok = _can_run(["docker", "--version"])
+    tools = _probe_all(
+        {"docker": (_can_run, ["docker", "--version"]), "compose": (compose_cmd,)}
+    )
+    docker_ok = tools["docker"]
     checks.append({"check": "Docker installed", "ok": docker_ok})
 
-    compose_ok = compose_cmd() is not None
+    compose_ok = tools["compose"] is not None
     checks.append({"check": "Docker Compose installed", "ok": compose_ok})
 
     if not docker_ok or not compose_ok:
@@ -637,29 +1077,24 @@ def run_system_checks():
     start_script = root / "test_network.sh"
 
     # Start network if core containers are not running
-    if not _container_running("orderer.example.com"):
+    state = _probe_all(_fabric_probes(root))
+    if not state["orderer"]:
         subprocess.run(
             ["bash", str(start_script)],
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL,
         )
         time.sleep(3)
+        state = _probe_all(_fabric_probes(root))
 
     # Verify container health
-    orderer_ok = _container_running("orderer.example.com")
-    peer1_ok = _container_running("peer0.org1.example.com")
-    peer2_ok = _container_running("peer0.org2.example.com")
-    ca1_ok = _container_running("ca_org1")
-    ca2_ok = _container_running("ca_org2")
-    couch0_ok = _container_running("couchdb0")
-    couch1_ok = _container_running("couchdb1")
-    checks.append({"check": "Orderer reachable", "ok": orderer_ok})
-    checks.append({"check": "Peer0.org1 active", "ok": peer1_ok})
-    checks.append({"check": "Peer0.org2 active", "ok": peer2_ok})
-    checks.append({"check": "CA org1 reachable", "ok": ca1_ok})
-    checks.append({"check": "CA org2 reachable", "ok": ca2_ok})
+    checks.append({"check": "Orderer reachable", "ok": state["orderer"]})
+    checks.append({"check": "Peer0.org1 active", "ok": state["peer1"]})
+    checks.append({"check": "Peer0.org2 active", "ok": state["peer2"]})
+    checks.append({"check": "CA org1 reachable", "ok": state["ca1"]})
+    checks.append({"check": "CA org2 reachable", "ok": state["ca2"]})
     checks.append(
-        {"check": "CouchDB instances reachable", "ok": couch0_ok and couch1_ok}
+        {"check": "CouchDB instances reachable", "ok": state["couch0"] and state["couch1"]}
     )
 
     try:
@@ -682,8 +1117,7 @@ def run_system_checks():
 
     # Ensure channel exists
     channel_ok = False
-    h1 = _ledger_height("peer0.org1.example.com")
-    h2 = _ledger_height("peer0.org2.example.com")
+    h1, h2 = state["h1"], state["h2"]
     if h1 is None or h2 is None:
         subprocess.run(
             ["bash", "network.sh", "createChannel", "-c", "mychannel"],
@@ -692,8 +1126,8 @@ def run_system_checks():
             stderr=subprocess.DEVNULL,
         )
         time.sleep(2)
-        h1 = _ledger_height("peer0.org1.example.com")
-        h2 = _ledger_height("peer0.org2.example.com")
+        state.update(_probe_all(_ledger_probes(root)))
+        h1, h2 = state["h1"], state["h2"]
     channel_ok = h1 is not None and h2 is not None
     checks.append({"check": "Channel mychannel exists", "ok": channel_ok})
 
@@ -723,67 +1157,79 @@ def run_system_checks():
     ledger_ok = channel_ok and h1 == h2 and h1 is not None
     checks.append({"check": "Ledger synchronized", "ok": ledger_ok})
 
-    # Ensure required chaincodes are committed
-    cc_sensor = _chaincode_committed("sensor")
-    if not cc_sensor and (root / "chaincode/sensor").is_dir():
-        subprocess.run(
-            [
-                "bash",
-                "network.sh",
-                "deployCC",
-                "-c",
-                "mychannel",
-                "-ccn",
-                "sensor",
-                "-ccl",
-                "go",
-                "-ccp",
-                str(root / "chaincode/sensor"),
-            ],
-            cwd=net_dir,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
-        cc_sensor = _chaincode_committed("sensor")
-    checks.append({"check": "Chaincode sensor committed", "ok": cc_sensor})
-
-    cc_agri = True
+    # Ensure required chaincodes are committed.  Deploys run one at a time:
+    # network.sh shares log.txt and package files in the test-network dir.
+    for name in ("sensor", "agri"):
+        if not state.get(f"cc_{name}") and (root / "chaincode" / name).is_dir():
+            state[f"cc_{name}"] = _deploy_chaincode(root, net_dir, name)
+    checks.append({"check": "Chaincode sensor committed", "ok": state["cc_sensor"]})
     if (root / "chaincode/agri").is_dir():
-        cc_agri = _chaincode_committed("agri")
-        if not cc_agri:
-            subprocess.run(
-                [
-                    "bash",
-                    "network.sh",
-                    "deployCC",
-                    "-c",
-                    "mychannel",
-                    "-ccn",
-                    "agri",
-                    "-ccl",
-                    "go",
-                    "-ccp",
-                    str(root / "chaincode/agri"),
-                ],
-                cwd=net_dir,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL,
-            )
-            cc_agri = _chaincode_committed("agri")
-        checks.append({"check": "Chaincode agri committed", "ok": cc_agri})
+        checks.append({"check": "Chaincode agri committed", "ok": state["cc_agri"]})
 
     all_ok = all(c["ok"] for c in checks)
     return checks, all_ok
 
 
+def _deploy_chaincode(root: Path, net_dir: Path, name: str) -> bool:
+    """Deploy chaincode ``name`` and return whether it is now committed."""
+    subprocess.run(
+        [
+            "bash",
+            "network.sh",
+            "deployCC",
+            "-c",
+            "mychannel",
+            "-ccn",
+            name,
+            "-ccl",
+            "go",
+            "-ccp",
+            str(root / "chaincode" / name),
+        ],
+        cwd=net_dir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return _chaincode_committed(name)
+
+
 def start_blockchain():
     """Run checks and ensure the Fabric test network is ready."""
     global BLOCKCHAIN_STARTED
     checks, ok = run_system_checks()
-    if not ok:
-        return checks, False, "Baseline checks failed"
-    BLOCKCHAIN_STARTED = True
-    return checks, True, None
+    error = None if ok else "Baseline checks failed"
+    if ok:
+        BLOCKCHAIN_STARTED = True
+    SYSTEM_STATE.update(
+        checks=checks, started=ok, error=error, checked_at=time.time()
+    )
+    return checks, ok, error
+
+
+def start_blockchain_cached(max_age: float = SYSTEM_CHECK_TTL) -> dict:
+    """Return :data:`SYSTEM_STATE`, running the checks if it is older than ``max_age``.
+
+    Only one run happens at a time; callers arriving during a run wait for
+    it and share its result.
+    """
+    requested = time.time()
+    if SYSTEM_STATE["checked_at"] and requested - SYSTEM_STATE["checked_at"] <= max_age:
+        return SYSTEM_STATE
+    with _START_LOCK:
+        # A run that finished while we waited is fresh enough for us.
+        checked_at = SYSTEM_STATE["checked_at"]
+        if not checked_at or (checked_at < requested and requested - checked_at > max_age):
+            start_blockchain()
+    return SYSTEM_STATE
+
+
+def start_blockchain_in_background() -> None:
+    """Refresh the cached checks on a thread unless a run is in progress."""
+    if _START_LOCK.locked():
+        return
+    threading.Thread(
+        target=start_blockchain_cached, name="fabric-start", daemon=True
+    ).start()
 
 
 def restart_blockchain():
@@ -797,13 +1243,22 @@ def restart_blockchain():
     except Exception:
         pass
     BLOCKCHAIN_STARTED = False
-    return start_blockchain()
+    with _START_LOCK:
+        return start_blockchain()
 
 
 def check_and_start_blockchain():
-    """Start the blockchain if at least two devices are registered."""
-    if len(list_devices()) >= 2:
-        start_blockchain()
+    """Start the blockchain in the background once two devices are registered.
+
+    Registrations never wait for the checks; a fresh cached result means
+    nothing is run at all.
+    """
+    if len(list_devices()) < 2:
+        return
+    checked_at = SYSTEM_STATE["checked_at"]
+    if checked_at and time.time() - checked_at <= SYSTEM_CHECK_TTL:
+        return
+    start_blockchain_in_background()
 
 
 @app.route("/announce", methods=["POST"])
@@ -833,6 +1288,7 @@ def upload_file():
     }
     record_sensor_data(
         id=file.filename,
+        seq=hlf_client.get_last_seq(file.filename) + 1,
         temperature=0,
         humidity=0,
         soil_moisture=0,
@@ -845,18 +1301,28 @@ def upload_file():
     return jsonify({"stored": True})
 
 
-@app.route("/register", methods=["POST"])
-def register():
-    raw = request.get_data()
+def _check_signature(raw: bytes):
+    """Return an error response if ``raw`` fails client authentication."""
     if HMAC_KEY:
         if not request.environ.get("SSL_CLIENT_CERT"):
             REQUESTS.labels("unauthenticated").inc()
             return "client certificate required", 403
         sig = request.headers.get("X-Payload-Signature", "")
-        expected = hmac.new(HMAC_KEY, raw, hashlib.sha256).hexdigest()
-        if not hmac.compare_digest(expected, sig):
+        with HMAC_SECONDS.time():
+            expected = hmac.new(HMAC_KEY, raw, hashlib.sha256).hexdigest()
+            valid = hmac.compare_digest(expected, sig)
+        if not valid:
             REQUESTS.labels("bad_signature").inc()
             return "invalid signature", 401
+    return None
+
+
+@app.route("/register", methods=["POST"])
+def register():
+    raw = request.get_data()
+    error = _check_signature(raw)
+    if error:
+        return error
     data = json.loads(raw.decode() or "{}")
     if not data or "id" not in data or "owner" not in data:
         REQUESTS.labels("bad_request").inc()
@@ -905,13 +1371,19 @@ def recover(sensor_id):
 @app.route("/merkle/<int:block_num>")
 def merkle(block_num: int):
     """Return Merkle tree information for a block."""
-    block = get_block(block_num)
-    tx_hashes = [
-        hashlib.sha256(json.dumps(tx).encode()).hexdigest()
-        for tx in block.get("data", [])
-    ]
-    root, tree = compute_merkle_root(tx_hashes)
-    return jsonify({"root": root, "tree": tree})
+    tree = hlf_client.get_merkle_tree(block_num)
+    if tree is None:
+        return jsonify({"error": "block not found"}), 404
+    return jsonify(tree)
+
+
+@app.route("/merkle/<int:block_num>/proof/<int:tx_index>")
+def merkle_proof(block_num: int, tx_index: int):
+    """Return the inclusion proof of one transaction in a block."""
+    proof = hlf_client.get_merkle_proof(block_num, tx_index)
+    if proof is None:
+        return jsonify({"error": "block or transaction not found"}), 404
+    return jsonify(proof)
 
 
 @app.route("/status-data")
@@ -975,15 +1447,13 @@ def status_page():
 @app.route("/connect")
 def connect_page():
     """Serve the sensor connection setup page."""
-    template = Path(__file__).resolve().parent.parent / "sensor_connection.html"
-    return render_template_string(template.read_text())
+    return serve_page("sensor_connection.html")
 
 
 @app.route("/simulate-ui")
 def simulator_page():
     """Serve the sensor simulator page."""
-    template = Path(__file__).resolve().parent.parent / "sensor_simulator.html"
-    return render_template_string(template.read_text())
+    return serve_page("sensor_simulator.html")
 
 
 @app.route("/simulate", methods=["POST"])
@@ -1052,8 +1522,7 @@ def one_click_test_route():
 @app.route("/tde")
 def tde_page():
     """Show threat detection incidents."""
-    template = Path(__file__).resolve().parent.parent / "threat_detection.html"
-    return render_template_string(template.read_text())
+    return serve_page("threat_detection.html")
 
 
 @app.route("/check-pins", methods=["POST"])
@@ -1069,23 +1538,54 @@ def check_pins():
 @app.route("/integrity")
 def integrity_page():
     """Serve the data integrity management page."""
-    template = Path(__file__).resolve().parent.parent / "data_integrity.html"
-    return render_template_string(template.read_text())
+    return serve_page("data_integrity.html")
 
 
 @app.route("/export")
 def export_data():
-    sensor_id = request.args.get("sensor_id")
-    start = request.args.get("start")
-    end = request.args.get("end")
-    data, h = build_csv(sensor_id, start, end)
-    resp = make_response(data)
-    resp.headers["Content-Type"] = "text/csv"
-    resp.headers["Content-Disposition"] = 'attachment; filename="sensor_data.csv"'
-    resp.headers["X-Data-Hash"] = h
+    sensor_id = request.args.get("sensor_id") or None
+    start = request.args.get("start") or None
+    end = request.args.get("end") or None
+    compress = request.args.get("gzip", "").lower() in ("1", "true", "yes")
+    export_id = uuid.uuid4().hex
+    manifest = {
+        "export_id": export_id,
+        "sensor_id": sensor_id,
+        "start": start,
+        "end": end,
+        "gzip": compress,
+        "complete": False,
+    }
+    with _MANIFEST_LOCK:
+        EXPORT_MANIFESTS[export_id] = manifest
+        while len(EXPORT_MANIFESTS) > MAX_EXPORT_MANIFESTS:
+            EXPORT_MANIFESTS.popitem(last=False)
+    filename = "sensor_data.csv.gz" if compress else "sensor_data.csv"
+    resp = Response(
+        _stream_export(manifest, sensor_id, start, end, compress),
+        mimetype="application/gzip" if compress else "text/csv",
+    )
+    resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    cached = hlf_client.get_export_digest(sensor_id, start, end)
+    if cached is not None:
+        # Known up front when the same range was exported or verified before.
+        resp.headers["X-Data-Hash"] = cached
+    resp.headers["X-Export-Id"] = export_id
+    resp.headers["Link"] = f'</export/{export_id}/manifest>; rel="describedby"'
     return resp
 
 
+@app.route("/export/<export_id>/manifest")
+def export_manifest(export_id):
+    """Return the SHA-256 of the uncompressed CSV once an export has finished."""
+    with _MANIFEST_LOCK:
+        manifest = EXPORT_MANIFESTS.get(export_id)
+        manifest = dict(manifest) if manifest is not None else None
+    if manifest is None:
+        return jsonify({"error": "unknown export"}), 404
+    return jsonify(manifest)
+
+
 @app.route("/state/<date>")
 def state_on(date):
     """Return the last reading for each node on the given YYYY-MM-DD date."""
@@ -1100,53 +1600,72 @@ def verify_data():
     end = request.form.get("end")
     if "file" not in request.files:
         return "no file", 400
-    uploaded = request.files["file"].read()
-    uploaded_hash = hashlib.sha256(uploaded).hexdigest()
-    _, expected_hash = build_csv(sensor_id, start, end)
-    return jsonify({"verified": uploaded_hash == expected_hash})
+    upload = request.files["file"]
+    # Hash the upload in chunks; gzip exports are accepted as downloaded.
+    digest = hashlib.sha256()
+    gunzip = (
+        zlib.decompressobj(wbits=31)
+        if (upload.filename or "").endswith(".gz")
+        else None
+    )
+    try:
+        for chunk in iter(lambda: upload.stream.read(EXPORT_CHUNK_BYTES), b""):
+            digest.update(gunzip.decompress(chunk) if gunzip else chunk)
+        if gunzip:
+            digest.update(gunzip.flush())
+    except zlib.error:
+        return "invalid gzip file", 400
+    expected_hash = export_digest(sensor_id or None, start or None, end or None)
+    return jsonify({"verified": digest.hexdigest() == expected_hash})
 
 
 @app.route("/backlog")
 def backlog_stats():
     """Expose counts of buffered readings per device."""
     stats = hlf_client.get_backlog_stats()
-    BACKLOG_GAUGE.set(sum(stats.values()))
+    BACKLOG_GAUGE.set(hlf_client.get_backlog_depth())
     return jsonify(stats)
 
 
 @app.route("/metrics")
 def metrics():
     """Prometheus metrics endpoint."""
-    return Response(generate_latest(REGISTRY), mimetype=CONTENT_TYPE_LATEST)
-
-
-@app.route("/sensor", methods=["POST"])
-def record_sensor():
-    raw = request.get_data()
-    if HMAC_KEY:
-        if not request.environ.get("SSL_CLIENT_CERT"):
-            REQUESTS.labels("unauthenticated").inc()
-            return "client certificate required", 403
-        sig = request.headers.get("X-Payload-Signature", "")
-        expected = hmac.new(HMAC_KEY, raw, hashlib.sha256).hexdigest()
-        if not hmac.compare_digest(expected, sig):
-            REQUESTS.labels("bad_signature").inc()
-            return "invalid signature", 401
-
+    for shard, depth in enumerate(hlf_client.get_shard_depths()):
+        SHARD_DEPTH.labels(str(shard)).set(depth)
+    BACKLOG_GAUGE.set(hlf_client.get_backlog_depth())
+    output = generate_latest(REGISTRY)
+    ledger_registry = getattr(hlf_client, "METRICS_REGISTRY", None)
+    if ledger_registry is not None:
+        hlf_client.update_queue_metrics()
+        output += generate_latest(ledger_registry)
+    return Response(output, mimetype=CONTENT_TYPE_LATEST)
+
+
+def _ingest_reading(raw: bytes, node_ip: str, received: str):
+    """Decode one signed reading and queue it for the ledger.
+
+    Returns ``(status, detail)`` where status is ``queued``, ``bad_request``,
+    ``backpressure``, ``duplicate``, ``out_of_order`` or ``error``.  ``queued``
+    means the reading reached its worker shard; it is committed later.
+    Sequence numbers are checked against the committed readings first.
+    Shared by the synchronous ``/sensor`` path and the accept-queue worker.
+    """
     try:
-        data = json.loads(raw.decode() or "{}")
+        with DECODE_SECONDS.time():
+            data = json.loads(raw.decode() or "{}")
     except Exception:
         REQUESTS.labels("bad_request").inc()
-        return "Invalid payload", 400
+        return "bad_request", "Invalid payload"
 
-    data["node_ip"] = request.remote_addr
+    data["node_ip"] = node_ip
     if data.get("id") and data["id"] not in list_devices():
         register_device(data["id"], data["node_ip"])
         check_and_start_blockchain()
-    data["timestamp"] = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    data["timestamp"] = received
     seq = int(data.get("seq", 0))
     start = time.time()
     try:
+        hlf_client.check_sequence(data.get("id", "unknown"), seq)
         record_sensor_data(
             data.get("id", "unknown"),
             seq,
@@ -1160,11 +1679,22 @@ def record_sensor():
             data,
         )
         REQUESTS.labels("success").inc()
+    except queue.Full:
+        REQUESTS.labels("backpressure").inc()
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "backpressure",
+                    "tx_id": data.get("tx_id"),
+                    "device_id": data.get("id"),
+                    "seq": seq,
+                }
+            )
+        )
+        return "backpressure", "ingest queue full"
     except Exception as exc:
-        if "exists" in str(exc):
-            REQUESTS.labels("duplicate").inc()
-        else:
-            REQUESTS.labels("error").inc()
+        status = exc.reason if isinstance(exc, hlf_client.SequenceError) else "error"
+        REQUESTS.labels(status).inc()
         logger.error(
             json.dumps(
                 {
@@ -1176,30 +1706,215 @@ def record_sensor():
                 }
             )
         )
-        return str(exc), 400
+        return status, str(exc)
     finally:
         COMMIT_LATENCY.observe(time.time() - start)
 
     logger.info(
         json.dumps(
             {
-                "event": "stored",
+                "event": "queued",
                 "tx_id": data.get("tx_id"),
                 "device_id": data.get("id"),
                 "seq": seq,
             }
         )
     )
+    return "queued", None
+
+
+# Asynchronous ingest: with ``SENSOR_ASYNC_INGEST`` set (or a request sending
+# ``Prefer: respond-async``) /sensor only checks the signature, appends the
+# body to a bounded accept queue and answers 202 with a receipt ID.  One
+# worker drains the queue in arrival order, so per-device sequence order is
+# preserved.  A full queue is answered with 429 and ``Retry-After``.
+SENSOR_ASYNC_INGEST = os.environ.get("SENSOR_ASYNC_INGEST", "").lower() in ("1", "true", "yes")
+ACCEPT_QUEUE_SIZE = int(os.environ.get("ACCEPT_QUEUE_SIZE", "5000"))
+ACCEPT_RETRY_AFTER = int(os.environ.get("ACCEPT_RETRY_AFTER", "2"))
+RECEIPT_BUFFER = int(os.environ.get("RECEIPT_BUFFER", "10000"))
+ACCEPT_QUEUE: "queue.Queue" = queue.Queue(maxsize=ACCEPT_QUEUE_SIZE)
+ACCEPT_DEPTH = Gauge(
+    "gateway_accept_queue_depth",
+    "Readings accepted with 202 and not yet processed",
+    registry=REGISTRY,
+)
+ACCEPT_DEPTH.set_function(lambda: ACCEPT_QUEUE.qsize())
+RECEIPTS: "OrderedDict[str, dict]" = OrderedDict()
+_RECEIPT_LOCK = threading.Lock()
+_ACCEPT_WORKER = None
+_ACCEPT_WORKER_LOCK = threading.Lock()
+
+
+def _set_receipt(receipt_id: str, **fields) -> None:
+    with _RECEIPT_LOCK:
+        receipt = RECEIPTS.setdefault(receipt_id, {"id": receipt_id})
+        receipt.update(fields)
+        while len(RECEIPTS) > RECEIPT_BUFFER:
+            RECEIPTS.popitem(last=False)
+
+
+def _accept_worker() -> None:
+    while True:
+        receipt_id, raw, node_ip, received = ACCEPT_QUEUE.get()
+        try:
+            status, detail = _ingest_reading(raw, node_ip, received)
+        except Exception as exc:  # keep draining whatever happens
+            logger.exception("accepted reading %s failed", receipt_id)
+            status, detail = "error", str(exc)
+        finally:
+            ACCEPT_QUEUE.task_done()
+        _set_receipt(receipt_id, status=status, error=detail)
+
+
+def _ensure_accept_worker() -> None:
+    global _ACCEPT_WORKER
+    if _ACCEPT_WORKER is not None and _ACCEPT_WORKER.is_alive():
+        return
+    with _ACCEPT_WORKER_LOCK:
+        if _ACCEPT_WORKER is None or not _ACCEPT_WORKER.is_alive():
+            _ACCEPT_WORKER = threading.Thread(
+                target=_accept_worker, name="sensor-accept", daemon=True
+            )
+            _ACCEPT_WORKER.start()
+
+
+def _wants_async() -> bool:
+    return SENSOR_ASYNC_INGEST or "respond-async" in request.headers.get("Prefer", "")
+
+
+_SYNC_STATUS_CODES = {"bad_request": 400, "duplicate": 400, "out_of_order": 400, "error": 400}
+
+
+@app.route("/sensor", methods=["POST"])
+def record_sensor():
+    raw = request.get_data()
+    error = _check_signature(raw)
+    if error:
+        return error
+
+    received = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    if _wants_async():
+        receipt_id = uuid.uuid4().hex
+        _ensure_accept_worker()
+        # Record the receipt first so the worker's result cannot be overwritten.
+        _set_receipt(receipt_id, status="accepted", error=None, received=received)
+        try:
+            ACCEPT_QUEUE.put_nowait((receipt_id, raw, request.remote_addr, received))
+        except queue.Full:
+            with _RECEIPT_LOCK:
+                RECEIPTS.pop(receipt_id, None)
+            REQUESTS.labels("admission_rejected").inc()
+            return "accept queue full", 429, {"Retry-After": str(ACCEPT_RETRY_AFTER)}
+        REQUESTS.labels("accepted").inc()
+        location = f"/sensor/receipts/{receipt_id}"
+        return jsonify({"receipt": receipt_id, "status": "accepted"}), 202, {"Location": location}
+
+    status, detail = _ingest_reading(raw, request.remote_addr, received)
+    if status == "backpressure":
+        return detail, 503, {"Retry-After": "1"}
+    if status != "queued":
+        return detail, _SYNC_STATUS_CODES[status]
     return jsonify({"stored": True})
 
 
+@app.route("/sensor/receipts/<receipt_id>")
+def sensor_receipt(receipt_id):
+    """Return the processing status of a reading accepted with 202."""
+    with _RECEIPT_LOCK:
+        receipt = RECEIPTS.get(receipt_id)
+        receipt = dict(receipt) if receipt is not None else None
+    if receipt is None:
+        return jsonify({"error": "unknown receipt"}), 404
+    return jsonify(receipt)
+
+
+MAX_SENSOR_BATCH = int(os.environ.get("MAX_SENSOR_BATCH", "1000"))
+_BATCH_RESULT_LABELS = {"queued": "success", "duplicate": "duplicate"}
+
+
+@app.route("/sensor/batch", methods=["POST"])
+def record_sensor_batch():
+    """Store an array of readings with one signature over the whole body.
+
+    The body is a JSON list of readings (or ``{"readings": [...]}``).  Every
+    reading is stamped with the server's receive time, like ``/sensor``.  The
+    response lists a result per reading in request order.
+    """
+    raw = request.get_data()
+    error = _check_signature(raw)
+    if error:
+        return error
+
+    try:
+        with DECODE_SECONDS.time():
+            body = json.loads(raw.decode() or "[]")
+        readings = body.get("readings", []) if isinstance(body, dict) else body
+        if not isinstance(readings, list) or not all(
+            isinstance(r, dict) for r in readings
+        ):
+            raise ValueError("readings must be a list of objects")
+    except Exception:
+        REQUESTS.labels("bad_request").inc()
+        return "Invalid payload", 400
+    if len(readings) > MAX_SENSOR_BATCH:
+        REQUESTS.labels("bad_request").inc()
+        return f"batch larger than {MAX_SENSOR_BATCH} readings", 413
+
+    node_ip = request.remote_addr
+    now = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    known = list_devices()
+    records = []
+    try:
+        for data in readings:
+            data["node_ip"] = node_ip
+            device_id = data.get("id", "unknown")
+            if data.get("id") and device_id not in known:
+                register_device(device_id, node_ip)
+                check_and_start_blockchain()
+            data["timestamp"] = now
+            records.append(
+                (
+                    device_id,
+                    int(data.get("seq", 0)),
+                    float(data.get("temperature", 0)),
+                    float(data.get("humidity", 0)),
+                    float(data.get("soil_moisture", 0)),
+                    float(data.get("ph", 0)),
+                    float(data.get("light", 0)),
+                    float(data.get("water_level", 0)),
+                    data["timestamp"],
+                    data,
+                )
+            )
+    except (TypeError, ValueError):
+        REQUESTS.labels("bad_request").inc()
+        return "Invalid reading in batch", 400
+
+    start = time.time()
+    try:
+        results = hlf_client.record_sensor_data_batch(records)
+    finally:
+        COMMIT_LATENCY.observe(time.time() - start)
+
+    counts = {}
+    for result in results:
+        label = _BATCH_RESULT_LABELS.get(result["status"], result["status"])
+        counts[label] = counts.get(label, 0) + 1
+    for label, count in counts.items():
+        REQUESTS.labels(label).inc(count)
+    logger.info(
+        json.dumps({"event": "batch_stored", "size": len(results), "results": counts})
+    )
+    accepted = counts.get("success", 0)
+    return jsonify({"accepted": accepted, "results": results})
+
+
 # ----------------- Additional dashboard pages -----------------
 
 
 @app.route("/history")
 def history_page():
-    template = Path(__file__).resolve().parent.parent / "history_view.html"
-    return render_template_string(template.read_text())
+    return serve_page("history_view.html")
 
 
 @app.route("/history-data")
@@ -1211,7 +1926,9 @@ def history_data():
     """
     sensor_id = request.args.get("sensor_id")
     # Include sensors with recorded data even if never formally registered
-    all_ids = sorted(set(list_devices()) | set(hlf_client.SENSOR_DATA.keys()))
+    devices = list_devices()
+    extra = sorted(d for d in hlf_client.SENSOR_DATA.keys() if d not in devices)
+    all_ids = list(heapq.merge(sorted_ids(devices), extra))
     if not sensor_id:
         sensor_id = all_ids[0] if all_ids else None
     records = get_sensor_history(sensor_id) if sensor_id else []
@@ -1220,8 +1937,7 @@ def history_data():
 
 @app.route("/explorer")
 def explorer_page():
-    template = Path(__file__).resolve().parent.parent / "block_explorer.html"
-    return render_template_string(template.read_text())
+    return serve_page("block_explorer.html")
 
 
 @app.route("/blockchain-info")
@@ -1234,21 +1950,71 @@ def blockchain_info():
     return jsonify(info)
 
 
+@app.route("/blocks")
+def blocks():
+    """Return a page of block headers, newest first.
+
+    ``before`` is the lowest block number from the previous page.
+    """
+    before = request.args.get("before", type=int)
+    limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+    return jsonify({"blocks": hlf_client.list_blocks(before=before, limit=limit)})
+
+
 @app.route("/devices")
 def devices_page():
-    template = Path(__file__).resolve().parent.parent / "device_management.html"
-    return render_template_string(template.read_text())
+    return serve_page("device_management.html")
+
+
+def _page_limit(default: int, maximum: int) -> int:
+    return max(1, min(request.args.get("limit", default, type=int), maximum))
+
+
+def _flag(name: str):
+    """Return a tri-state boolean query parameter (``None`` when absent)."""
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    return value.lower() in ("1", "true", "yes")
 
 
 @app.route("/device-data")
 def device_data():
+    """Return devices ordered by ID, one page at a time.
+
+    Filters: ``prefix`` (ID prefix), ``quarantined`` (true/false) and
+    ``active_since`` (last reading at or after this ISO timestamp).  Pass
+    ``next_cursor`` from the response as ``cursor`` to get the next page.
+    """
+    limit = _page_limit(100, 1000)
+    cursor = request.args.get("cursor", "")
+    prefix = request.args.get("prefix", "")
+    quarantined_filter = _flag("quarantined")
+    active_since = request.args.get("active_since")
+    since_key = hlf_client.timestamp_epoch(active_since) if active_since else None
     devices = []
-    q = set(get_quarantined())
-    for dev in list_devices():
-        hist = get_sensor_history(dev)
-        last = hist[-1]["timestamp"] if hist else ""
-        devices.append({"id": dev, "quarantined": dev in q, "last": last})
-    return jsonify({"devices": devices})
+    next_cursor = None
+    for dev in scan_ids(list_devices(), cursor, prefix):
+        quarantined = hlf_client.is_quarantined(dev)
+        if quarantined_filter is not None and quarantined != quarantined_filter:
+            continue
+        summary = hlf_client.get_device_summary(dev) or {}
+        last = summary.get("last_timestamp") or ""
+        if since_key is not None and (not last or hlf_client.timestamp_epoch(last) < since_key):
+            continue
+        if len(devices) == limit:
+            next_cursor = devices[-1]["id"]
+            break
+        devices.append(
+            {
+                "id": dev,
+                "quarantined": quarantined,
+                "last": last,
+                "count": summary.get("count", 0),
+                "last_cid": summary.get("last_cid"),
+            }
+        )
+    return jsonify({"devices": devices, "next_cursor": next_cursor})
 
 
 @app.route("/quarantine/<device_id>", methods=["POST", "DELETE"])
@@ -1256,34 +2022,47 @@ def quarantine_route(device_id):
     if request.method == "POST":
         hlf_client.quarantine_device(device_id)
     else:
-        hlf_client.QUARANTINED.discard(device_id)
+        hlf_client.release_device(device_id)
     return "ok"
 
 
 @app.route("/storage")
 def storage_page():
-    template = Path(__file__).resolve().parent.parent / "storage_monitor.html"
-    return render_template_string(template.read_text())
+    return serve_page("storage_monitor.html")
 
 
 @app.route("/storage-data")
 def storage_data():
+    """Return stored CIDs in timestamp order, one page at a time.
+
+    Filters: ``device`` (repeatable), ``start`` and ``end``.  Pass
+    ``next_cursor`` from the response as ``cursor`` to get the next page.
+    """
+    devices = request.args.getlist("device") or None
+    try:
+        records, next_cursor = hlf_client.page_sensor_data(
+            start=request.args.get("start") or None,
+            end=request.args.get("end") or None,
+            sensor_ids=devices,
+            limit=_page_limit(500, 5000),
+            cursor=request.args.get("cursor") or None,
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
     out = []
-    for dev in list_devices():
-        for rec in get_sensor_history(dev):
-            payload = rec.get("payload")
-            if isinstance(payload, dict):
-                cid = payload.get("cid")
-            else:
-                cid = payload
-            out.append({"id": dev, "cid": cid, "timestamp": rec.get("timestamp")})
-    return jsonify(out)
+    for rec in records:
+        payload = rec.get("payload")
+        if isinstance(payload, dict):
+            cid = payload.get("cid")
+        else:
+            cid = payload
+        out.append({"id": rec["id"], "cid": cid, "timestamp": rec.get("timestamp")})
+    return jsonify({"records": out, "next_cursor": next_cursor})
 
 
 @app.route("/recovery")
 def recovery_page():
-    template = Path(__file__).resolve().parent.parent / "recovery_dashboard.html"
-    return render_template_string(template.read_text())
+    return serve_page("recovery_dashboard.html")
 
 
 @app.route("/simulate-recovery", methods=["POST"])
@@ -1294,8 +2073,7 @@ def simulate_recovery():
 
 @app.route("/bootstrap")
 def bootstrap_page():
-    template = Path(__file__).resolve().parent.parent / "bootstrap_status.html"
-    return render_template_string(template.read_text())
+    return serve_page("bootstrap_status.html")
 
 
 @app.route("/bootstrap-status")
@@ -1317,19 +2095,28 @@ def verify_product_route(nft_id):
 
 @app.route("/diagnostics")
 def diagnostics_page():
-    template = Path(__file__).resolve().parent.parent / "node_diagnostics.html"
-    return render_template_string(template.read_text())
+    return serve_page("node_diagnostics.html")
 
 
 @app.route("/access-log")
 def access_log_page():
-    template = Path(__file__).resolve().parent.parent / "access_log.html"
-    return render_template_string(template.read_text())
+    return serve_page("access_log.html")
 
 
 @app.route("/access-data")
 def access_data():
-    return jsonify(ACCESS_LOG)
+    return jsonify(
+        [
+            {
+                "time": datetime.utcfromtimestamp(ts).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "method": method,
+                "path": path,
+                "status": status,
+                "duration_ms": round(seconds * 1000, 3),
+            }
+            for ts, method, path, status, seconds in list(ACCESS_LOG)
+        ]
+    )
 
 
 if __name__ == "__main__":
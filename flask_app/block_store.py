@@ -0,0 +1,278 @@
+"""Append-only block file with a block number index.
+
+Blocks cut by the in-memory ledger are written to ``blocks.dat`` as framed
+JSON records (length, CRC32, payload).  ``blocks.idx`` holds the byte offset
+of every block as a fixed-width integer, so block ``n`` is found by reading
+entry ``n - 1`` and a single positioned read of the block file.
+
+Each block header carries the number, the hash of the previous header, a hash
+of the transaction list and the Merkle root of the transaction hashes, which
+chains every block to its predecessor.  Merkle trees are built over binary
+SHA-256 digests and kept in a small per-block LRU for proofs.  The index is
+written after the block itself; on open, blocks missing from the index are
+re-indexed and a torn block at the tail is truncated.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import struct
+import threading
+import zlib
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+GENESIS_HASH = "0x0"
+_FRAME = struct.Struct("<II")  # payload length, CRC32 of payload
+_OFFSET = struct.Struct("<q")
+_BLOCKS_FILE = "blocks.dat"
+_INDEX_FILE = "blocks.idx"
+
+
+def tx_digest(tx: dict) -> bytes:
+    """Return the SHA-256 of a transaction, the leaf of the Merkle tree."""
+    return hashlib.sha256(json.dumps(tx).encode()).digest()
+
+
+def data_hash(leaves: List[bytes]) -> str:
+    return hashlib.sha256(b"".join(leaves)).hexdigest()
+
+
+def merkle_levels(leaves: List[bytes]) -> List[List[bytes]]:
+    """Return every level of the Merkle tree as binary digests, leaves first.
+
+    Parents hash the concatenated child digests; an odd node is paired with
+    itself.
+    """
+    if not leaves:
+        return []
+    level = list(leaves)
+    levels = [level]
+    sha256 = hashlib.sha256
+    while len(level) > 1:
+        if len(level) % 2:
+            level = level + [level[-1]]
+        level = [sha256(level[i] + level[i + 1]).digest() for i in range(0, len(level), 2)]
+        levels.append(level)
+    return levels
+
+
+def merkle_root(leaves: List[bytes]) -> str:
+    levels = merkle_levels(leaves)
+    return levels[-1][0].hex() if levels else GENESIS_HASH
+
+
+def merkle_proof(levels: List[List[bytes]], index: int) -> List[Tuple[str, str]]:
+    """Return ``(sibling_hex, side)`` pairs from leaf ``index`` up to the root.
+
+    ``side`` says whether the sibling goes on the ``left`` or ``right`` when
+    hashing the pair.
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling >= len(level):
+            sibling = index
+        proof.append((level[sibling].hex(), "left" if sibling < index else "right"))
+        index //= 2
+    return proof
+
+
+def verify_proof(leaf: str, proof: List[Tuple[str, str]], root: str) -> bool:
+    """Check a proof from :func:`merkle_proof` against a hex Merkle root."""
+    node = bytes.fromhex(leaf)
+    for sibling, side in proof:
+        other = bytes.fromhex(sibling)
+        node = hashlib.sha256(other + node if side == "left" else node + other).digest()
+    return node.hex() == root
+
+
+def header_hash(header: dict) -> str:
+    """Return the hash identifying a block, computed over its header."""
+    return hashlib.sha256(json.dumps(header, sort_keys=True).encode()).hexdigest()
+
+
+class BlockStore:
+    """Persisted chain of blocks with O(1) lookup by block number."""
+
+    def __init__(self, directory: Path, tree_cache_size: int = 128) -> None:
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.tree_cache_size = tree_cache_size
+        self._trees: "OrderedDict[int, List[List[bytes]]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._offsets = array("q")
+        self._end = 0
+        self._last_hash = GENESIS_HASH
+        self._recover()
+
+    # ------------------------------------------------------------------
+    # recovery
+    # ------------------------------------------------------------------
+
+    def _recover(self) -> None:
+        data_path = self.dir / _BLOCKS_FILE
+        index_path = self.dir / _INDEX_FILE
+        data_path.touch()
+        raw = index_path.read_bytes() if index_path.exists() else b""
+        raw = raw[: len(raw) - len(raw) % _OFFSET.size]
+        offsets = array("q")
+        offsets.frombytes(raw)
+        size = data_path.stat().st_size
+        with data_path.open("rb") as fh:
+            # Drop index entries pointing past the intact part of the file.
+            while offsets and self._frame_end(fh, offsets[-1], size) is None:
+                offsets.pop()
+            end = self._frame_end(fh, offsets[-1], size) if offsets else 0
+            # Index blocks that were written but not yet indexed.
+            while True:
+                next_end = self._frame_end(fh, end, size)
+                if next_end is None:
+                    break
+                offsets.append(end)
+                end = next_end
+        if end != size:
+            with data_path.open("r+b") as fh:
+                fh.truncate(end)
+        with index_path.open("wb") as fh:
+            fh.write(offsets.tobytes())
+        self._offsets = offsets
+        self._end = end
+        if offsets:
+            self._last_hash = self._read(len(offsets))["hash"]
+
+    @staticmethod
+    def _frame_end(fh, offset: int, size: int) -> Optional[int]:
+        """Return the end offset of the intact frame at ``offset``."""
+        if offset + _FRAME.size > size:
+            return None
+        fh.seek(offset)
+        length, crc = _FRAME.unpack(fh.read(_FRAME.size))
+        payload = fh.read(length)
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return None
+        return offset + _FRAME.size + length
+
+    # ------------------------------------------------------------------
+    # writing
+    # ------------------------------------------------------------------
+
+    @property
+    def height(self) -> int:
+        return len(self._offsets)
+
+    @property
+    def current_hash(self) -> str:
+        return self._last_hash
+
+    def append(self, data: List[dict], mode: Optional[str] = None) -> dict:
+        """Persist a block holding ``data`` and return its header."""
+        with self._lock:
+            leaves = [tx_digest(tx) for tx in data]
+            header = {
+                "number": self.height + 1,
+                "previous_hash": self._last_hash,
+                "data_hash": data_hash(leaves),
+                "merkle_root": merkle_root(leaves),
+                "tx_count": len(data),
+                "mode": mode,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            }
+            block_hash = header_hash(header)
+            payload = json.dumps(
+                {"header": header, "hash": block_hash, "data": data}
+            ).encode("utf-8")
+            frame = _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+            with (self.dir / _BLOCKS_FILE).open("ab") as fh:
+                fh.write(frame)
+                fh.flush()
+                os.fsync(fh.fileno())
+            with (self.dir / _INDEX_FILE).open("ab") as fh:
+                fh.write(_OFFSET.pack(self._end))
+            self._offsets.append(self._end)
+            self._end += len(frame)
+            self._last_hash = block_hash
+            return header
+
+    def clear(self) -> None:
+        """Delete every stored block."""
+        with self._lock:
+            shutil.rmtree(self.dir, ignore_errors=True)
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self._offsets = array("q")
+            self._end = 0
+            self._last_hash = GENESIS_HASH
+            self._trees.clear()
+            self._recover()
+
+    # ------------------------------------------------------------------
+    # reading
+    # ------------------------------------------------------------------
+
+    def _read_many(self, numbers) -> Iterator[dict]:
+        """Yield the given blocks, reusing one file descriptor."""
+        fd = os.open(self.dir / _BLOCKS_FILE, os.O_RDONLY)
+        try:
+            for number in numbers:
+                offset = self._offsets[number - 1]
+                length, _ = _FRAME.unpack(os.pread(fd, _FRAME.size, offset))
+                yield json.loads(os.pread(fd, length, offset + _FRAME.size))
+        finally:
+            os.close(fd)
+
+    def _read(self, number: int) -> dict:
+        return list(self._read_many([number]))[0]
+
+    def get(self, number: int) -> Optional[dict]:
+        """Return block ``number`` (1-based) or ``None`` if it does not exist."""
+        if not 1 <= number <= self.height:
+            return None
+        return self._read(number)
+
+    def merkle_tree(self, number: int) -> Optional[List[List[bytes]]]:
+        """Return the Merkle levels of block ``number``, cached per block.
+
+        Blocks never change once written, so trees stay valid until evicted.
+        """
+        with self._lock:
+            levels = self._trees.get(number)
+            if levels is not None:
+                self._trees.move_to_end(number)
+                return levels
+        block = self.get(number)
+        if block is None:
+            return None
+        levels = merkle_levels([tx_digest(tx) for tx in block["data"]])
+        with self._lock:
+            self._trees[number] = levels
+            while len(self._trees) > self.tree_cache_size:
+                self._trees.popitem(last=False)
+        return levels
+
+    def headers(self, first: int, last: int) -> Iterator[Tuple[str, dict]]:
+        """Yield ``(hash, header)`` for blocks ``first``..``last`` inclusive."""
+        numbers = range(max(first, 1), min(last, self.height) + 1)
+        for block in self._read_many(numbers):
+            yield block["hash"], block["header"]
+
+    def verify(self) -> Optional[int]:
+        """Check hash links and data hashes; return the first bad block number."""
+        previous = GENESIS_HASH
+        for number, block in enumerate(self._read_many(range(1, self.height + 1)), 1):
+            header = block["header"]
+            leaves = [tx_digest(tx) for tx in block["data"]]
+            if (
+                header["previous_hash"] != previous
+                or header["data_hash"] != data_hash(leaves)
+                or header["merkle_root"] != merkle_root(leaves)
+                or header_hash(header) != block["hash"]
+            ):
+                return number
+            previous = block["hash"]
+        return None
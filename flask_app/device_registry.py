@@ -0,0 +1,154 @@
+"""Registered, active and quarantined device IDs.
+
+Each set of device IDs is a :class:`DeviceSet`.  A dict gives O(1)
+membership, a list keeps registration order and a sorted list answers
+ordered and prefix scans.  IDs are inserted into the sorted list with
+``bisect.insort``, so it is never re-sorted.  Writers hold the registry lock.
+New IDs are appended to the registration-order list in place, and a removal
+replaces that list, so iterating it never skips an ID.  The sorted list is
+edited in place; :meth:`DeviceSet.sorted` copies it under the lock and
+:meth:`DeviceSet.scan` reads it in locked chunks.
+
+:func:`sorted_ids` and :func:`scan_ids` accept a :class:`DeviceSet` or any
+plain iterable of IDs, for callers that may be handed either.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from collections.abc import Sequence
+from typing import Iterable, Iterator, List, Optional
+
+
+class DeviceSet(Sequence):
+    """Insertion-ordered set of device IDs that also behaves like a list."""
+
+    def __init__(self, lock: Optional[threading.RLock] = None) -> None:
+        self._lock = lock or threading.RLock()
+        self._index: dict = {}
+        self._order: List[str] = []
+        self._sorted: List[str] = []
+
+    def __contains__(self, device_id) -> bool:
+        return device_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._order)
+
+    def __getitem__(self, index):
+        return self._order[index]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, DeviceSet):
+            return self._order == other._order
+        return self._order == other
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._order!r})"
+
+    def add(self, device_id: str) -> bool:
+        """Add ``device_id``; return ``False`` if it was already present."""
+        with self._lock:
+            if device_id in self._index:
+                return False
+            self._index[device_id] = None
+            self._order.append(device_id)
+            bisect.insort(self._sorted, device_id)
+            return True
+
+    append = add
+
+    def extend(self, device_ids: Iterable[str]) -> None:
+        with self._lock:
+            for device_id in device_ids:
+                self.add(device_id)
+
+    def discard(self, device_id: str) -> bool:
+        """Remove ``device_id``; return ``False`` if it was not present."""
+        with self._lock:
+            if device_id not in self._index:
+                return False
+            del self._index[device_id]
+            self._order = [d for d in self._order if d != device_id]
+            del self._sorted[bisect.bisect_left(self._sorted, device_id)]
+            return True
+
+    def remove(self, device_id: str) -> None:
+        if not self.discard(device_id):
+            raise ValueError(f"{device_id!r} not in device set")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index = {}
+            self._order = []
+            self._sorted = []
+
+    def sorted(self) -> List[str]:
+        """Return a copy of the IDs in sorted order."""
+        with self._lock:
+            return list(self._sorted)
+
+    def scan(self, after: str = "", prefix: str = "", chunk: int = 256) -> Iterator[str]:
+        """Yield sorted IDs greater than ``after`` that start with ``prefix``.
+
+        IDs are copied ``chunk`` at a time under the lock and each chunk is
+        located by value, so registrations during the scan are safe.
+        """
+        while True:
+            with self._lock:
+                ids = self._sorted
+                if after >= prefix:
+                    pos = bisect.bisect_right(ids, after)
+                else:
+                    pos = bisect.bisect_left(ids, prefix)
+                batch = ids[pos:pos + chunk]
+            for device_id in batch:
+                if not device_id.startswith(prefix):
+                    return
+                yield device_id
+            if len(batch) < chunk:
+                return
+            after = batch[-1]
+
+
+class DeviceRegistry:
+    """Registered, active and quarantined devices behind one lock."""
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self.devices = DeviceSet(self._lock)
+        self.active = DeviceSet(self._lock)
+        self.quarantined = DeviceSet(self._lock)
+
+    def register(self, device_id: str) -> bool:
+        """Register and activate a device; return ``True`` if it is new."""
+        with self._lock:
+            added = self.devices.add(device_id)
+            self.active.add(device_id)
+            return added
+
+    def activate(self, device_id: str) -> bool:
+        return self.active.add(device_id)
+
+    def quarantine(self, device_id: str) -> bool:
+        return self.quarantined.add(device_id)
+
+    def release(self, device_id: str) -> bool:
+        """Lift a quarantine; return ``False`` if the device was not quarantined."""
+        return self.quarantined.discard(device_id)
+
+
+def sorted_ids(ids: Iterable[str]) -> List[str]:
+    """Return ``ids`` in sorted order, without re-sorting a :class:`DeviceSet`."""
+    return ids.sorted() if isinstance(ids, DeviceSet) else sorted(ids)
+
+
+def scan_ids(ids: Iterable[str], after: str = "", prefix: str = "") -> Iterator[str]:
+    """Yield sorted IDs greater than ``after`` that start with ``prefix``."""
+    if isinstance(ids, DeviceSet):
+        return ids.scan(after, prefix)
+    return (d for d in sorted(ids) if d > after and d.startswith(prefix))
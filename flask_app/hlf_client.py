@@ -1,44 +1,86 @@
 """Simple placeholder Hyperledger Fabric client."""
 
-from datetime import datetime
+from datetime import datetime, timezone
 import base64
+import functools
+import hashlib
+import heapq
 import json
 import zlib
 import os
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import padding, rsa
 from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 import threading
 import queue
 import time
+import atexit
+import shutil
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
 
 # This file is a stub demonstrating how a client might interact with
 # a Fabric network to invoke the sensor chaincode.
 # A real implementation would use the Fabric SDK to submit transactions.
 
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from flask_app.block_store import BlockStore, merkle_proof
+from flask_app.device_registry import DeviceRegistry, sorted_ids
+from flask_app.reading_store import METRICS, ReadingStore
+from flask_app.segment_log import SegmentLog
+
 # Keep simple in-memory registries so the Flask app can demonstrate node
-# lifecycle events without a real Fabric backend.
-DEVICES = []
+# lifecycle events without a real Fabric backend.  ``DEVICES`` and
+# ``ACTIVE_DEVICES`` stay list-like but answer membership in O(1).
+DEVICE_REGISTRY = DeviceRegistry()
+DEVICES = DEVICE_REGISTRY.devices
 # Track devices that have been promoted to active status.  In the testing
 # environment we automatically activate devices upon registration so sensors
 # appear in both the registered and active lists.
-ACTIVE_DEVICES = []
-from typing import Dict, List, Optional
-
-# Mapping of sensor ID to a list of recorded readings
-SENSOR_DATA: Dict[str, List[dict]] = {}
+ACTIVE_DEVICES = DEVICE_REGISTRY.active
+QUARANTINED = DEVICE_REGISTRY.quarantined
+
+# Root directory for the gateway's on-disk ledger state.  When ``HLF_DATA_DIR``
+# is unset a scratch directory is used and removed on exit, matching the
+# previous purely in-memory behaviour.
+_DATA_DIR_ENV = os.getenv("HLF_DATA_DIR")
+DATA_DIR = Path(_DATA_DIR_ENV or tempfile.mkdtemp(prefix="hlf-"))
+if not _DATA_DIR_ENV:
+    atexit.register(shutil.rmtree, DATA_DIR, True)
+# Rows older than this many days are dropped from the reading store (0 keeps
+# everything).
+READING_RETENTION_DAYS = float(os.getenv("READING_RETENTION_DAYS", "0"))
+READING_STORE_MAX_OPEN = int(os.getenv("READING_STORE_MAX_OPEN", "256"))
+
+# Mapping of sensor ID to its recorded readings in timestamp order.  Readings
+# live in memory-mapped column files; each value is a read-only list view.
+SENSOR_DATA = ReadingStore(DATA_DIR / "readings", max_open=READING_STORE_MAX_OPEN)
 # Track the last sequence number seen for each device to enforce monotonic
 # ordering and detect duplicates.  This mirrors the behaviour of the actual
 # chaincode which stores the most recent sequence value on-chain.
-LAST_SEQ: Dict[str, int] = {}
+LAST_SEQ: Dict[str, int] = {
+    dev: SENSOR_DATA.device(dev).last_seq() for dev in SENSOR_DATA.keys()
+}
+# Per-device summary maintained on write: reading count, latest timestamp
+# and the CID (or stored payload) of the latest reading.  Listing pages read
+# this instead of scanning device histories.
+DEVICE_SUMMARY: Dict[str, dict] = {}
 INCIDENTS = []
 ATTESTATIONS = []
 
-# Blockchain event log and simple block counter for demo purposes
+# Blockchain event log, persisted blocks and the height of the chain
 BLOCK_EVENTS = []
-CURRENT_BLOCK = 0
+_BLOCK_EVENT_ID = 0
+MERKLE_CACHE_SIZE = int(os.getenv("MERKLE_CACHE_SIZE", "128"))
+BLOCK_STORE = BlockStore(DATA_DIR / "blocks", tree_cache_size=MERKLE_CACHE_SIZE)
+CURRENT_BLOCK = BLOCK_STORE.height
+# Records waiting to be cut into the next block
 BLOCK_BUFFER: List[dict] = []
 
 # Block creation policy
@@ -54,10 +96,22 @@ LAST_PH: Dict[str, float] = {}
 BACKLOG_DIR = Path(__file__).resolve().parents[1] / "backlog"
 BACKLOG_DIR.mkdir(exist_ok=True)
 MAX_BACKLOG_AGE = 300  # seconds
-
-# Per-device in-memory queues and worker threads
+# Each device's backlog is a segmented append-only log under BACKLOG_DIR.
+BACKLOG_SEGMENT_BYTES = int(os.getenv("BACKLOG_SEGMENT_BYTES", str(1 << 20)))
+BACKLOG_FSYNC_INTERVAL = float(os.getenv("BACKLOG_FSYNC_INTERVAL", "0.5"))
+BACKLOG_FSYNC_BATCH = int(os.getenv("BACKLOG_FSYNC_BATCH", "64"))
+
+# Fixed-size worker pool.  Device IDs hash onto ``WORKER_SHARDS`` bounded
+# queues, each drained serially by one thread, which keeps per-device ordering
+# without a thread per device.  Producers block for up to ``ENQUEUE_TIMEOUT``
+# seconds when a shard is full and then receive ``queue.Full``.
+WORKER_SHARDS = max(1, int(os.getenv("WORKER_SHARDS", "8")))
+SHARD_QUEUE_SIZE = int(os.getenv("SHARD_QUEUE_SIZE", "1000"))
+ENQUEUE_TIMEOUT = float(os.getenv("ENQUEUE_TIMEOUT", "5"))
+SHARD_QUEUES: List["queue.Queue"] = []
+SHARD_THREADS: List[Optional[threading.Thread]] = []
+# Mapping of device ID to the queue of the shard serving it
 DEVICE_QUEUES: Dict[str, "queue.Queue"] = {}
-DEVICE_THREADS: Dict[str, threading.Thread] = {}
 _QUEUE_LOCK = threading.Lock()
 
 # Exponential backoff state per device for retrying backlog flushes
@@ -66,12 +120,43 @@ _BACKOFF: Dict[str, float] = defaultdict(lambda: 1.0)
 # RSA key pair for encrypting sensor payloads
 PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
 PUBLIC_KEY = PRIVATE_KEY.public_key()
+_OAEP = padding.OAEP(
+    mgf=padding.MGF1(algorithm=hashes.SHA256()),
+    algorithm=hashes.SHA256(),
+    label=None,
+)
+
+# Payload encryption mode.  ``envelope`` encrypts each payload with AES-GCM
+# under a data key that is wrapped once with ``PUBLIC_KEY``; ``rsa`` keeps the
+# original direct RSA-OAEP scheme.  Both formats can always be decrypted.
+ENCRYPTION_MODE = os.getenv("ENCRYPTION_MODE", "envelope")
+# Data keys rotate either per ``epoch`` (every ``DATA_KEY_EPOCH_SECONDS``) or
+# per ``block`` (whenever a block is cut).
+DATA_KEY_ROTATION = os.getenv("DATA_KEY_ROTATION", "epoch")
+DATA_KEY_EPOCH_SECONDS = int(os.getenv("DATA_KEY_EPOCH_SECONDS", "3600"))
+ENVELOPE_PREFIX = "env1:"
+_KEY_ID_SIZE = 8
+_NONCE_SIZE = 12
+
+# RSA-wrapped data keys by key ID, plus a cache of unwrapped AES-GCM ciphers
+# so each data key costs a single RSA operation on either side.
+WRAPPED_KEYS: Dict[bytes, bytes] = {}
+_DATA_KEY_CACHE: Dict[bytes, AESGCM] = {}
+_ACTIVE_KEY: Optional[Tuple[bytes, AESGCM, float]] = None
+_KEY_LOCK = threading.Lock()
 
 
 def log_block_event(message):
-    """Record a blockchain operation event with timestamp."""
+    """Record a blockchain operation event with timestamp.
+
+    Events carry an increasing ``id`` so pollers can tell new events apart
+    from the ones they already have.
+    """
+    global _BLOCK_EVENT_ID
+    _BLOCK_EVENT_ID += 1
     BLOCK_EVENTS.append(
         {
+            "id": _BLOCK_EVENT_ID,
             "time": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
             "message": message,
         }
@@ -81,49 +166,320 @@ def log_block_event(message):
         del BLOCK_EVENTS[0]
 
 
+def rotate_data_key() -> bytes:
+    """Generate a fresh AES-256 data key, wrap it with RSA and make it active.
+
+    Returns the key ID embedded in envelopes encrypted under the new key.
+    Previously issued keys stay in :data:`WRAPPED_KEYS` so older ciphertexts
+    remain decryptable.
+    """
+    global _ACTIVE_KEY
+    key = AESGCM.generate_key(bit_length=256)
+    key_id = os.urandom(_KEY_ID_SIZE)
+    with _KEY_LOCK:
+        WRAPPED_KEYS[key_id] = PUBLIC_KEY.encrypt(key, _OAEP)
+        cipher = AESGCM(key)
+        _DATA_KEY_CACHE[key_id] = cipher
+        _ACTIVE_KEY = (key_id, cipher, time.monotonic())
+    return key_id
+
+
+def _active_data_key() -> Tuple[bytes, AESGCM]:
+    """Return the current data key, rotating it when the epoch has expired."""
+    active = _ACTIVE_KEY
+    if active is None or (
+        DATA_KEY_ROTATION == "epoch"
+        and time.monotonic() - active[2] >= DATA_KEY_EPOCH_SECONDS
+    ):
+        rotate_data_key()
+        active = _ACTIVE_KEY
+    return active[0], active[1]
+
+
+def _unwrap_data_key(key_id: bytes) -> AESGCM:
+    """Return the AES-GCM cipher for ``key_id``, unwrapping it on first use."""
+    cipher = _DATA_KEY_CACHE.get(key_id)
+    if cipher is None:
+        key = PRIVATE_KEY.decrypt(WRAPPED_KEYS[key_id], _OAEP)
+        cipher = AESGCM(key)
+        with _KEY_LOCK:
+            _DATA_KEY_CACHE[key_id] = cipher
+    return cipher
+
+
 def encrypt_payload(data: dict) -> str:
-    """Encrypt a JSON payload using the RSA public key.
+    """Encrypt a JSON payload for storage on the ledger.
 
-    RSA can only encrypt messages up to a limited size.  We first compress
-    the JSON payload with zlib to ensure typical sensor readings fit within
-    the RSA block size.  The compressed ciphertext is then RSA encrypted and
-    base64 encoded for transport.
+    The JSON payload is first compressed with zlib.  In ``envelope`` mode the
+    result is sealed with AES-GCM under the active data key and returned as
+    ``env1:<base64(key_id | nonce | ciphertext)>``, so there is no size
+    limit.  In ``rsa`` mode the compressed bytes are RSA encrypted directly,
+    which only fits payloads that compress below the RSA block size.
     """
 
     plaintext = zlib.compress(json.dumps(data).encode("utf-8"))
+    if ENCRYPTION_MODE == "envelope":
+        key_id, cipher = _active_data_key()
+        nonce = os.urandom(_NONCE_SIZE)
+        sealed = cipher.encrypt(nonce, plaintext, key_id)
+        blob = base64.b64encode(key_id + nonce + sealed).decode("utf-8")
+        return ENVELOPE_PREFIX + blob
+
     max_len = PUBLIC_KEY.key_size // 8 - 2 * hashes.SHA256().digest_size - 2
     if len(plaintext) > max_len:
         raise ValueError("Payload too large to encrypt")
 
-    ciphertext = PUBLIC_KEY.encrypt(
-        plaintext,
-        padding.OAEP(
-            mgf=padding.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None,
-        ),
-    )
+    ciphertext = PUBLIC_KEY.encrypt(plaintext, _OAEP)
     return base64.b64encode(ciphertext).decode("utf-8")
 
 
 def decrypt_payload(enc: str) -> dict:
-    """Decrypt a base64 encoded payload using the RSA private key."""
+    """Decrypt a payload produced by :func:`encrypt_payload`.
+
+    Envelope ciphertexts are recognised by their ``env1:`` prefix; anything
+    else is treated as a legacy base64 encoded RSA-OAEP ciphertext.
+    """
     try:
-        ciphertext = base64.b64decode(enc.encode("utf-8"))
-        plaintext = PRIVATE_KEY.decrypt(
-            ciphertext,
-            padding.OAEP(
-                mgf=padding.MGF1(algorithm=hashes.SHA256()),
-                algorithm=hashes.SHA256(),
-                label=None,
-            ),
-        )
+        if enc.startswith(ENVELOPE_PREFIX):
+            raw = base64.b64decode(enc[len(ENVELOPE_PREFIX):].encode("utf-8"))
+            key_id = raw[:_KEY_ID_SIZE]
+            nonce = raw[_KEY_ID_SIZE:_KEY_ID_SIZE + _NONCE_SIZE]
+            sealed = raw[_KEY_ID_SIZE + _NONCE_SIZE:]
+            plaintext = _unwrap_data_key(key_id).decrypt(nonce, sealed, key_id)
+        else:
+            ciphertext = base64.b64decode(enc.encode("utf-8"))
+            plaintext = PRIVATE_KEY.decrypt(ciphertext, _OAEP)
         decompressed = zlib.decompress(plaintext)
         return json.loads(decompressed.decode("utf-8"))
     except Exception:
         return {}
 
 
+def _payload_digest(payload) -> bytes:
+    """Return a SHA-256 digest identifying the plaintext ``payload``.
+
+    Dict payloads are hashed in canonical (sorted key) JSON form so the digest
+    is stable across re-submissions, unlike the randomized RSA ciphertext.
+    """
+    if isinstance(payload, dict):
+        data = json.dumps(payload, sort_keys=True).encode("utf-8")
+    else:
+        data = str(payload).encode("utf-8")
+    return hashlib.sha256(data).digest()
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_timestamp(text: str) -> float:
+    """Parse an ISO-8601 (or numeric) timestamp string into epoch seconds."""
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        return 0.0
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _timestamp_key(value) -> float:
+    """Return the sort key used to order readings by ``timestamp``."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return _parse_timestamp(str(value))
+
+
+def timestamp_epoch(value) -> float:
+    """Return a reading timestamp (ISO text or epoch) as epoch seconds."""
+    return _timestamp_key(value)
+
+
+def _history_bounds(sensor_id: str, start=None, end=None) -> Tuple[int, int]:
+    """Return the ``[lo, hi)`` positions of readings within ``start``/``end``."""
+    columns = SENSOR_DATA.device(sensor_id)
+    if columns is None:
+        return 0, 0
+    lo_key = _timestamp_key(start) if start else None
+    hi_key = _timestamp_key(end) if end else None
+    return columns.bounds(lo_key, hi_key)
+
+
+# Hot-path metrics.  They live in their own registry which the Flask app
+# appends to its ``/metrics`` output.
+METRICS_REGISTRY = CollectorRegistry()
+STAGE_SECONDS = Histogram(
+    "hlf_stage_seconds",
+    "Time spent in each stage of the ledger write path",
+    ["stage"],
+    registry=METRICS_REGISTRY,
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "hlf_queue_wait_seconds",
+    "Time readings wait in a worker shard queue",
+    ["shard"],
+    registry=METRICS_REGISTRY,
+)
+ENQUEUE_COMMIT_SECONDS = Histogram(
+    "hlf_enqueue_commit_seconds",
+    "Latency from enqueue to ledger commit, including backlog retries",
+    registry=METRICS_REGISTRY,
+)
+WORKER_BUSY_SECONDS = Counter(
+    "hlf_worker_busy_seconds_total",
+    "Time each shard worker spends processing; rate() gives utilization",
+    ["shard"],
+    registry=METRICS_REGISTRY,
+)
+REJECTED_READINGS = Counter(
+    "hlf_rejected_readings_total",
+    "Readings dropped by the sequence checks instead of being retried",
+    registry=METRICS_REGISTRY,
+)
+DEVICE_QUEUE_DEPTH = Gauge(
+    "hlf_device_queue_depth",
+    "Readings queued but not yet processed per device",
+    ["device"],
+    registry=METRICS_REGISTRY,
+)
+_STAGES = {
+    name: STAGE_SECONDS.labels(name)
+    for name in ("duplicate_check", "encrypt", "block_policy", "block_cut", "backlog_flush")
+}
+# Enqueue time of readings parked in the backlog keyed by tx_id (or device
+# and seq when the payload carries no tx_id), so their latency still counts
+# from the original enqueue.  Readings committed straight from a shard queue
+# use the enqueue time carried with the queue item instead.  Bounded so
+# readings that never commit do not accumulate.
+_ENQUEUED_AT: Dict[object, float] = {}
+_MAX_TRACKED = 10000
+_DEVICE_PENDING: Dict[str, int] = defaultdict(int)
+_PENDING_LOCK = threading.Lock()
+_WORKER_STATE = threading.local()
+
+
+@contextmanager
+def _stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _STAGES[name].observe(time.perf_counter() - start)
+
+
+def _tx_key(device_id, seq, payload):
+    tx_id = payload.get("tx_id") if isinstance(payload, dict) else None
+    return tx_id or (device_id, seq)
+
+
+def _device_enqueued(device_id: str, count: int = 1) -> None:
+    # Called after the put so producers contend on nothing before it; the
+    # depth may briefly dip below zero if the worker is faster.
+    with _PENDING_LOCK:
+        _DEVICE_PENDING[device_id] += count
+
+
+def _device_dequeued(device_id: str, count: int = 1) -> None:
+    with _PENDING_LOCK:
+        _DEVICE_PENDING[device_id] -= count
+
+
+def _park_enqueued(record) -> None:
+    """Keep the enqueue time of a reading that is moving to the backlog."""
+    enqueued = getattr(_WORKER_STATE, "enqueued", None)
+    if enqueued is None:
+        return
+    with _PENDING_LOCK:
+        _ENQUEUED_AT.setdefault(_tx_key(record[0], record[1], record[9]), enqueued)
+        while len(_ENQUEUED_AT) > _MAX_TRACKED:
+            del _ENQUEUED_AT[next(iter(_ENQUEUED_AT))]
+
+
+def _commit_latency(key) -> Optional[float]:
+    """Observe and return enqueue→commit latency for ``key`` if known."""
+    with _PENDING_LOCK:
+        enqueued = _ENQUEUED_AT.pop(key, None)
+    if enqueued is None:
+        enqueued = getattr(_WORKER_STATE, "enqueued", None)
+    if enqueued is None:
+        return None
+    latency = time.monotonic() - enqueued
+    ENQUEUE_COMMIT_SECONDS.observe(latency)
+    return latency
+
+
+def update_queue_metrics() -> None:
+    """Refresh per-device queue depth gauges; called on scrape."""
+    with _PENDING_LOCK:
+        pending = dict(_DEVICE_PENDING)
+    for device_id, depth in pending.items():
+        DEVICE_QUEUE_DEPTH.labels(device_id).set(depth)
+
+
+# Recent commit notifications for clients waiting on their own writes.  Each
+# event gets a monotonically increasing ``id`` so consumers can resume after
+# the last one they saw.
+COMMIT_EVENT_BUFFER = int(os.getenv("COMMIT_EVENT_BUFFER", "1000"))
+COMMIT_EVENTS: deque = deque(maxlen=COMMIT_EVENT_BUFFER)
+_COMMIT_COND = threading.Condition()
+_COMMIT_EVENT_ID = 0
+
+
+def _publish_commit(device_id, seq, tx_id, block_number, latency=None) -> None:
+    """Append a commit notification and wake up waiting readers."""
+    global _COMMIT_EVENT_ID
+    with _COMMIT_COND:
+        _COMMIT_EVENT_ID += 1
+        COMMIT_EVENTS.append(
+            {
+                "id": _COMMIT_EVENT_ID,
+                "device": device_id,
+                "seq": seq,
+                "tx_id": tx_id,
+                "block": block_number,
+                "committed": datetime.now(timezone.utc).isoformat(),
+                "latency_seconds": latency,
+            }
+        )
+        _COMMIT_COND.notify_all()
+
+
+def last_commit_id() -> int:
+    """Return the id of the most recent commit event."""
+    return _COMMIT_EVENT_ID
+
+
+def wait_for_commits(after=0, timeout=0.0, device=None, seq=None) -> List[dict]:
+    """Return commit events newer than ``after`` that match the filters.
+
+    Blocks for up to ``timeout`` seconds until at least one matching event is
+    available.  Events older than the last ``COMMIT_EVENT_BUFFER`` commits are
+    no longer returned.
+    """
+
+    def matching():
+        return [
+            event
+            for event in COMMIT_EVENTS
+            if event["id"] > after
+            and (device is None or event["device"] == device)
+            and (seq is None or event["seq"] == seq)
+        ]
+
+    deadline = time.monotonic() + timeout
+    with _COMMIT_COND:
+        events = matching()
+        while not events:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _COMMIT_COND.wait(remaining)
+            events = matching()
+    return events
+
+
 def get_block_events():
     """Return recent blockchain events."""
     return BLOCK_EVENTS
@@ -153,6 +509,69 @@ def _should_create_block(sensor_id, soil_moisture, ph, water_level) -> Optional[
     return mode
 
 
+def _payload_cid(payload, stored_payload):
+    """Return the content identifier a reading refers to."""
+    if isinstance(payload, dict) and payload.get("cid"):
+        return payload["cid"]
+    return stored_payload
+
+
+def _update_summary(device_id, count, ts_key, timestamp, cid) -> None:
+    summary = DEVICE_SUMMARY.get(device_id)
+    if summary is None:
+        summary = DEVICE_SUMMARY[device_id] = {"last_key": float("-inf")}
+    summary["count"] = count
+    # Late arrivals update the count but not the latest reading.
+    if ts_key >= summary["last_key"]:
+        summary.update(last_key=ts_key, last_timestamp=timestamp, last_cid=cid)
+
+
+def _load_summaries() -> None:
+    """Rebuild ``DEVICE_SUMMARY`` from the reading store."""
+    for device_id in SENSOR_DATA.keys():
+        columns = SENSOR_DATA.device(device_id)
+        if not len(columns):
+            continue
+        row = columns.row_at(len(columns) - 1)
+        record = columns.record(row)
+        _update_summary(
+            device_id,
+            len(columns),
+            columns.snapshot()[0]["timestamp"][row],
+            record["timestamp"],
+            _payload_cid(decrypt_payload(record["payload"]), record["payload"]),
+        )
+
+
+_load_summaries()
+
+
+def get_device_summary(device_id) -> Optional[dict]:
+    """Return ``{"count", "last_timestamp", "last_cid"}`` for a device."""
+    summary = DEVICE_SUMMARY.get(device_id)
+    if summary is None:
+        return None
+    return {
+        "count": summary["count"],
+        "last_timestamp": summary["last_timestamp"],
+        "last_cid": summary["last_cid"],
+    }
+
+
+class SequenceError(ValueError):
+    """A reading's seq is a duplicate or older than the device's last one."""
+
+    def __init__(self, message: str, reason: str) -> None:
+        super().__init__(message)
+        self.reason = reason  # "duplicate" or "out_of_order"
+
+
+_SEQUENCE_ERRORS = {
+    "duplicate": "duplicate sequence number",
+    "out_of_order": "sequence out of order",
+}
+
+
 def _record_sensor_data_direct(
     id,
     seq,
@@ -170,28 +589,33 @@ def _record_sensor_data_direct(
     # Reject out-of-order sequences and allow idempotent re-submissions of the
     # same payload.  Each sensor keeps its own sequence counter so readings can
     # be uniquely identified.
-    history = SENSOR_DATA.setdefault(id, [])
-    for existing in history:
-        if existing.get("seq") == seq:
+    with _stage("duplicate_check"):
+        digest = _payload_digest(payload)
+        columns = SENSOR_DATA.device(id, create=True)
+        last = LAST_SEQ.get(id, 0)
+        # Sequence numbers only grow, so a new high seq needs no lookup.
+        row = columns.find_seq(seq) if seq <= last else None
+        if row is not None:
+            existing = columns.snapshot()[0]
             # If the payload matches exactly treat it as a successful repeat,
             # otherwise raise an error to simulate chaincode rejection.
             if (
-                existing.get("temperature") == temperature
-                and existing.get("humidity") == humidity
-                and existing.get("soil_moisture") == soil_moisture
-                and existing.get("ph") == ph
-                and existing.get("light") == light
-                and existing.get("water_level") == water_level
-                and existing.get("payload")
-                == (encrypt_payload(payload) if isinstance(payload, dict) else payload)
+                existing["temperature"][row] == temperature
+                and existing["humidity"][row] == humidity
+                and existing["soil_moisture"][row] == soil_moisture
+                and existing["ph"][row] == ph
+                and existing["light"][row] == light
+                and existing["water_level"][row] == water_level
+                and columns.digest(row) == digest
             ):
                 return
-            raise ValueError("duplicate sequence number")
+            raise SequenceError(_SEQUENCE_ERRORS["duplicate"], "duplicate")
 
-    last = LAST_SEQ.get(id, 0)
-    if seq <= last:
-        raise ValueError("sequence out of order")
+        if seq <= last:
+            raise SequenceError(_SEQUENCE_ERRORS["out_of_order"], "out_of_order")
 
+    with _stage("encrypt"):
+        stored_payload = encrypt_payload(payload) if isinstance(payload, dict) else payload
     entry = {
         "id": id,
         "seq": seq,
@@ -202,63 +626,184 @@ def _record_sensor_data_direct(
         "light": light,
         "water_level": water_level,
         "timestamp": timestamp,
-        "payload": encrypt_payload(payload) if isinstance(payload, dict) else payload,
+        "payload": stored_payload,
     }
-    history.append(entry)
+    ts_key = _timestamp_key(timestamp)
+    row = columns.append(
+        seq,
+        ts_key,
+        [entry[name] for name in METRICS],
+        timestamp,
+        entry["payload"],
+        digest,
+    )
+    if READING_RETENTION_DAYS and row % 256 == 0:
+        columns.retain(ts_key - READING_RETENTION_DAYS * 86400)
+        clear_export_digests()
     LAST_SEQ[id] = seq
+    _note_write(id, ts_key)
+    _update_summary(id, len(columns), ts_key, timestamp, _payload_cid(payload, stored_payload))
     BLOCK_BUFFER.append(entry)
-    mode = _should_create_block(id, soil_moisture, ph, water_level)
+    with _stage("block_policy"):
+        mode = _should_create_block(id, soil_moisture, ph, water_level)
     if mode:
-        CURRENT_BLOCK += 1
-        log_block_event(
-            f"Creating {mode} block {CURRENT_BLOCK} with {len(BLOCK_BUFFER)} records"
-        )
-        log_block_event(f"Hashing block {CURRENT_BLOCK}")
-        log_block_event(f"Saving block {CURRENT_BLOCK}")
-        BLOCK_BUFFER.clear()
+        with _stage("block_cut"):
+            number = BLOCK_STORE.height + 1
+            log_block_event(
+                f"Creating {mode} block {number} with {len(BLOCK_BUFFER)} records"
+            )
+            log_block_event(f"Hashing block {number}")
+            header = BLOCK_STORE.append(list(BLOCK_BUFFER), mode=mode)
+            log_block_event(f"Saving block {number}")
+            CURRENT_BLOCK = header["number"]
+            BLOCK_BUFFER.clear()
+            SENSOR_DATA.sync()
+            if DATA_KEY_ROTATION == "block":
+                rotate_data_key()
+        block_number = header["number"]
+    else:
+        # The reading is part of the next block to be cut.
+        block_number = BLOCK_STORE.height + 1
+    tx_id = payload.get("tx_id") if isinstance(payload, dict) else None
+    latency = _commit_latency(tx_id or (id, seq))
+    _publish_commit(id, seq, tx_id, block_number, latency)
     print(
         f"[HLF] record {id} {temperature} {humidity} {soil_moisture} {ph} {light} {water_level} {timestamp}"
     )
 
 
+def _backlog_dir_name(device_id: str) -> str:
+    """Return a directory name for ``device_id`` that cannot leave the root."""
+    name = quote(device_id, safe="")
+    if name in (".", ".."):
+        name = name.replace(".", "%2E")
+    return name
+
+
+class _DeviceBacklogs:
+    """Per-device backlog logs under one directory with an O(1) total depth.
+
+    Device IDs are percent-encoded into directory names, as in the reading
+    store, so IDs containing ``/`` or ``..`` stay under ``root``.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.logs: Dict[str, SegmentLog] = {}
+        self.total = 0
+        self.lock = threading.Lock()
+        self.flushing: set = set()
+        root.mkdir(parents=True, exist_ok=True)
+        for child in root.iterdir():
+            if child.is_dir():
+                log = self._open(unquote(child.name))
+                self.total += log.depth
+        for legacy in root.glob("*.jsonl"):
+            self._migrate(legacy)
+
+    def _open(self, device_id: str) -> SegmentLog:
+        log = SegmentLog(
+            self.root / _backlog_dir_name(device_id),
+            segment_bytes=BACKLOG_SEGMENT_BYTES,
+            fsync_interval=BACKLOG_FSYNC_INTERVAL,
+            fsync_batch=BACKLOG_FSYNC_BATCH,
+        )
+        self.logs[device_id] = log
+        return log
+
+    def _migrate(self, path: Path) -> None:
+        """Import a backlog file written by the previous ``.jsonl`` format."""
+        log = self.logs.get(path.stem) or self._open(path.stem)
+        with path.open() as fh:
+            for line in fh:
+                if line.strip():
+                    log.append(json.loads(line))
+                    self.total += 1
+        log.sync()
+        path.unlink()
+
+    def get(self, device_id: str, create: bool = False) -> Optional[SegmentLog]:
+        log = self.logs.get(device_id)
+        if log is None and create:
+            with self.lock:
+                log = self.logs.get(device_id) or self._open(device_id)
+        return log
+
+    def append(self, device_id: str, entry: dict) -> None:
+        self.get(device_id, create=True).append(entry)
+        with self.lock:
+            self.total += 1
+
+    def consumed(self, count: int) -> None:
+        with self.lock:
+            self.total -= count
+
+
+_BACKLOGS: Dict[Path, _DeviceBacklogs] = {}
+_BACKLOGS_LOCK = threading.Lock()
+
+
+def _backlogs() -> _DeviceBacklogs:
+    """Return the backlog logs for the current ``BACKLOG_DIR``."""
+    root = BACKLOG_DIR
+    backlogs = _BACKLOGS.get(root)
+    if backlogs is None:
+        with _BACKLOGS_LOCK:
+            backlogs = _BACKLOGS.get(root)
+            if backlogs is None:
+                backlogs = _BACKLOGS[root] = _DeviceBacklogs(root)
+    return backlogs
+
+
 def _store_backlog(device_id: str, record: tuple) -> None:
     """Persist a failed record to disk for later retry."""
-    BACKLOG_DIR.mkdir(exist_ok=True)
-    path = BACKLOG_DIR / f"{device_id}.jsonl"
-    entry = {"time": time.time(), "args": record}
-    with path.open("a") as fh:
-        fh.write(json.dumps(entry) + "\n")
+    entry = {"time": time.time(), "args": list(record)}
+    _backlogs().append(device_id, entry)
 
 
 def _flush_backlog(device_id: str) -> bool:
     """Attempt to flush the backlog for a device.
 
-    Returns ``True`` if the backlog was fully processed, ``False`` otherwise.
+    Records are replayed from the log's committed offset and acknowledged one
+    by one; fully consumed segments are then compacted.  Records appended
+    while the flush runs are picked up before it returns.  Returns ``True`` if
+    the backlog was fully processed, ``False`` otherwise.
     """
-    path = BACKLOG_DIR / f"{device_id}.jsonl"
-    if not path.exists():
-        _BACKOFF[device_id] = 1.0
-        return True
-    remaining = []
-    with path.open() as fh:
-        lines = fh.readlines()
-    for line in lines:
-        data = json.loads(line)
-        if time.time() - data.get("time", 0) > MAX_BACKLOG_AGE:
-            # Drop stale entry
-            continue
+    backlogs = _backlogs()
+    log = backlogs.get(device_id)
+    while log is not None and log.depth:
+        with backlogs.lock:
+            if device_id in backlogs.flushing:
+                # Another worker or retry timer is draining this device; it
+                # re-checks the depth after releasing it.
+                return False
+            backlogs.flushing.add(device_id)
+        start = time.perf_counter()
+        replayed = 0
         try:
-            _record_sensor_data_direct(*data["args"])
-        except Exception:
-            remaining.append(data)
+            for record in log.pending():
+                replayed += 1
+                data = record.data
+                if time.time() - data.get("time", 0) <= MAX_BACKLOG_AGE:
+                    try:
+                        _record_sensor_data_direct(*data["args"])
+                    except ValueError as exc:
+                        _reject(data["args"], exc)
+                    except Exception:
+                        log.sync()
+                        _schedule_retry(device_id)
+                        return False
+                # Stale entries are dropped by committing past them.
+                log.commit(record)
+                backlogs.consumed(1)
+            log.sync()
+            log.compact()
+        finally:
+            with backlogs.lock:
+                backlogs.flushing.discard(device_id)
+            _STAGES["backlog_flush"].observe(time.perf_counter() - start)
+        if not replayed:
             break
-    if remaining:
-        with path.open("w") as fh:
-            for item in remaining:
-                fh.write(json.dumps(item) + "\n")
-        _schedule_retry(device_id)
-        return False
-    path.unlink()
     _BACKOFF[device_id] = 1.0
     return True
 
@@ -272,18 +817,114 @@ def _schedule_retry(device_id: str) -> None:
     _BACKOFF[device_id] = min(delay * 2, 60)
 
 
-def _worker(device_id: str) -> None:
-    """Process a device's queue serially."""
-    q = DEVICE_QUEUES[device_id]
+def _shard_for(device_id: str) -> int:
+    """Return the worker shard index for ``device_id``.
+
+    CRC32 is used rather than :func:`hash` so the mapping is stable across
+    processes.
+    """
+    return zlib.crc32(str(device_id).encode("utf-8")) % WORKER_SHARDS
+
+
+def _shard_worker(shard: int) -> None:
+    """Process a shard's queue serially."""
+    q = SHARD_QUEUES[shard]
+    label = str(shard)
+    queue_wait = QUEUE_WAIT_SECONDS.labels(label)
+    busy = WORKER_BUSY_SECONDS.labels(label)
     while True:
-        record = q.get()
+        enqueued, item = q.get()
+        started = time.monotonic()
+        queue_wait.observe(started - enqueued)
+        _WORKER_STATE.enqueued = enqueued
+        try:
+            if isinstance(item, list):
+                _device_dequeued(item[0][0], len(item))
+                _process_chunk(item)
+            else:
+                _device_dequeued(item[0])
+                _process_chunk([item])
+        finally:
+            _WORKER_STATE.enqueued = None
+            busy.inc(time.monotonic() - started)
+            q.task_done()
+
+
+def _reject(record, exc: Exception) -> None:
+    """Drop a reading the sequence checks refused; retrying cannot fix it."""
+    REJECTED_READINGS.inc()
+    print(f"[HLF] reject {record[0]} seq {record[1]}: {exc}")
+
+
+def _park(records: List[tuple]) -> None:
+    for record in records:
+        _park_enqueued(record)
+        _store_backlog(record[0], record)
+
+
+def _process_chunk(records: List[tuple]) -> None:
+    """Commit one device's readings in order, behind any parked ones.
+
+    While the device has a backlog, the readings join its tail and the
+    backlog is flushed, so parked readings commit first.  A reading refused
+    by the sequence checks is dropped and the rest of the chunk is still
+    committed.  After any other failure the remaining readings go to the
+    backlog behind it so they are retried in their original order.
+    """
+    device_id = records[0][0]
+    log = _backlogs().get(device_id)
+    if log is not None and log.depth:
+        _park(records)
+        _flush_backlog(device_id)
+        return
+    for i, record in enumerate(records):
         try:
             _record_sensor_data_direct(*record)
-            _flush_backlog(device_id)
+        except ValueError as exc:
+            _reject(record, exc)
         except Exception:
-            _store_backlog(device_id, record)
+            _park(records[i:])
             _schedule_retry(device_id)
-        q.task_done()
+            return
+
+
+def _shard_queue(device_id: str) -> "queue.Queue":
+    """Return the queue serving ``device_id``.
+
+    Workers are started by :func:`_ensure_worker` after the put, so a
+    producer never waits on a thread start before its reading is queued;
+    readings from concurrent producers keep the order they arrived in.
+    """
+    q = DEVICE_QUEUES.get(device_id)
+    if q is not None:
+        return q
+    with _QUEUE_LOCK:
+        if not SHARD_QUEUES:
+            SHARD_QUEUES.extend(
+                queue.Queue(maxsize=SHARD_QUEUE_SIZE) for _ in range(WORKER_SHARDS)
+            )
+            SHARD_THREADS.extend([None] * WORKER_SHARDS)
+        q = DEVICE_QUEUES[device_id] = SHARD_QUEUES[_shard_for(device_id)]
+    return q
+
+
+def _ensure_worker(device_id: str) -> None:
+    """Start the worker for ``device_id``'s shard if it is not running."""
+    shard = _shard_for(device_id)
+    t = SHARD_THREADS[shard]
+    if t is not None and t.is_alive():
+        return
+    with _QUEUE_LOCK:
+        t = SHARD_THREADS[shard]
+        if t is None or not t.is_alive():
+            t = threading.Thread(
+                target=_shard_worker,
+                args=(shard,),
+                name=f"hlf-shard-{shard}",
+                daemon=True,
+            )
+            SHARD_THREADS[shard] = t
+            t.start()
 
 
 def record_sensor_data(
@@ -298,44 +939,106 @@ def record_sensor_data(
     timestamp,
     payload,
 ):
-    """Enqueue sensor data for serial processing per device."""
-    with _QUEUE_LOCK:
-        q = DEVICE_QUEUES.setdefault(id, queue.Queue())
-        if id not in DEVICE_THREADS or not DEVICE_THREADS[id].is_alive():
-            t = threading.Thread(target=_worker, args=(id,), daemon=True)
-            DEVICE_THREADS[id] = t
-            t.start()
-    q.put((id, seq, temperature, humidity, soil_moisture, ph, light, water_level, timestamp, payload))
+    """Enqueue sensor data for serial processing per device.
+
+    Raises ``queue.Full`` if the device's shard stays full for longer than
+    ``ENQUEUE_TIMEOUT`` seconds.
+    """
+    q = _shard_queue(id)
+    record = (id, seq, temperature, humidity, soil_moisture, ph, light, water_level, timestamp, payload)
+    q.put((time.monotonic(), record), timeout=ENQUEUE_TIMEOUT)
+    _ensure_worker(id)
+    _device_enqueued(id)
+
+
+def _check_sequence(device_id: str, seq: int, last: int) -> Optional[str]:
+    """Return why ``seq`` cannot follow ``last`` for a device, if anything."""
+    if seq > last:
+        return None
+    columns = SENSOR_DATA.device(device_id)
+    if seq == last or (columns is not None and columns.find_seq(seq) is not None):
+        return "duplicate"
+    return "out_of_order"
+
+
+def check_sequence(device_id: str, seq: int) -> None:
+    """Raise :class:`SequenceError` if ``seq`` cannot follow the committed readings.
+
+    Readings still queued are not considered; they are checked again when
+    committed.
+    """
+    reason = _check_sequence(device_id, seq, LAST_SEQ.get(device_id, 0))
+    if reason:
+        raise SequenceError(_SEQUENCE_ERRORS[reason], reason)
+
+
+def record_sensor_data_batch(records: Iterable[tuple]) -> List[dict]:
+    """Enqueue many readings and return one result per reading.
+
+    Each record holds the positional arguments of :func:`record_sensor_data`.
+    Readings are grouped per device and each group is queued in submission
+    order with a single put.  Sequence numbers that are not above the
+    device's last committed seq or an earlier reading in the same batch are
+    rejected up front as ``duplicate`` or ``out_of_order``; a group whose
+    shard stays full is reported as ``backpressure``.  Accepted readings are
+    ``queued`` and still go through the full chaincode checks when committed.
+    """
+    records = list(records)
+    results: List[dict] = [{} for _ in records]
+    groups: Dict[str, List[int]] = {}
+    high_water: Dict[str, int] = {}
+    for i, record in enumerate(records):
+        device_id, seq = record[0], record[1]
+        results[i] = {"id": device_id, "seq": seq}
+        last = high_water.get(device_id, LAST_SEQ.get(device_id, 0))
+        reason = _check_sequence(device_id, seq, last)
+        if reason:
+            results[i]["status"] = reason
+            continue
+        high_water[device_id] = seq
+        groups.setdefault(device_id, []).append(i)
+    for device_id, indexes in groups.items():
+        chunk = [tuple(records[i]) for i in indexes]
+        try:
+            _shard_queue(device_id).put((time.monotonic(), chunk), timeout=ENQUEUE_TIMEOUT)
+            _ensure_worker(device_id)
+            _device_enqueued(device_id, len(chunk))
+            status = "queued"
+        except queue.Full:
+            status = "backpressure"
+        for i in indexes:
+            results[i]["status"] = status
+    return results
+
+
+def get_shard_depths() -> List[int]:
+    """Return the number of queued readings per worker shard."""
+    return [q.qsize() for q in SHARD_QUEUES]
 
 
 def get_backlog_stats() -> Dict[str, int]:
     """Return the number of queued readings per device."""
-    stats: Dict[str, int] = {}
-    if not BACKLOG_DIR.exists():
-        return stats
-    for path in BACKLOG_DIR.glob("*.jsonl"):
-        try:
-            with path.open() as fh:
-                count = sum(1 for _ in fh)
-            if count:
-                stats[path.stem] = count
-        except FileNotFoundError:
-            continue
-    return stats
+    return {
+        device_id: log.depth
+        for device_id, log in list(_backlogs().logs.items())
+        if log.depth
+    }
+
+
+def get_backlog_depth() -> int:
+    """Return the total number of queued readings across all devices."""
+    return _backlogs().total
 
 
 def register_device(id, owner):
     """Register a device with the ledger."""
-    if id not in DEVICES:
-        DEVICES.append(id)
-    activate_device(id)
+    DEVICE_REGISTRY.register(id)
     print(f"[HLF] register device {id} owner {owner}")
 
 
 def activate_device(id):
     """Mark a device as active if not already present."""
-    if id not in ACTIVE_DEVICES:
-        ACTIVE_DEVICES.append(id)
+    DEVICE_REGISTRY.activate(id)
 
 
 def list_active_devices():
@@ -385,8 +1088,12 @@ def get_attestations():
 
 
 def list_devices():
-    """Return a list of registered device IDs."""
-    # This would normally query the ledger. We return the in-memory list.
+    """Return the registered device IDs in registration order.
+
+    The result is list-like with O(1) ``in`` checks; ``.sorted()`` gives the
+    IDs in sorted order.
+    """
+    # This would normally query the ledger. We return the in-memory registry.
     return DEVICES
 
 
@@ -395,6 +1102,11 @@ def get_incidents():
     return INCIDENTS
 
 
+def get_last_seq(device_id) -> int:
+    """Return the last committed sequence number for ``device_id`` (0 if none)."""
+    return LAST_SEQ.get(device_id, 0)
+
+
 def get_sensor_data(sensor_id):
     """Retrieve the latest sensor metadata for the given device."""
     print(f"[HLF] query sensor data for {sensor_id}")
@@ -405,21 +1117,186 @@ def get_sensor_data(sensor_id):
 
 
 def get_sensor_history(sensor_id, start=None, end=None):
-    """Return all recorded readings for a device optionally filtered by date."""
-    records = SENSOR_DATA.get(sensor_id, [])
-    if start:
-        records = [r for r in records if r["timestamp"] >= start]
-    if end:
-        records = [r for r in records if r["timestamp"] <= end]
-    return records
+    """Return all recorded readings for a device optionally filtered by date.
+
+    Readings are returned in timestamp order.  Range bounds are located by
+    binary search over the device's timestamp column and only the rows in
+    range are materialized.
+    """
+    history = SENSOR_DATA.get(sensor_id)
+    if history is None:
+        return []
+    lo, hi = _history_bounds(sensor_id, start, end)
+    return history[lo:hi]
+
+
+def get_sensor_columns(sensor_id, start=None, end=None) -> Dict[str, memoryview]:
+    """Return metric, ``seq`` and ``timestamp`` columns for a device.
+
+    Values are in timestamp order and, for in-order data, are zero-copy slices
+    of the memory-mapped store.  Timestamps are epoch seconds.
+    """
+    columns = SENSOR_DATA.device(sensor_id)
+    if columns is None:
+        return {}
+    lo, hi = _history_bounds(sensor_id, start, end)
+    names = ("seq", "timestamp") + METRICS
+    return {name: columns.column(name, lo, hi) for name in names}
+
+
+def _iter_history(sensor_id: str, start=None, end=None) -> Iterator[Tuple[float, dict]]:
+    columns = SENSOR_DATA.device(sensor_id)
+    if columns is None:
+        return iter(())
+    lo, hi = _history_bounds(sensor_id, start, end)
+    return columns.iter_range(lo, hi)
+
+
+def _encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        ts_key, device_id, seq = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(ts_key), str(device_id), int(seq)
+    except Exception:
+        raise ValueError("invalid cursor") from None
+
+
+def page_sensor_data(
+    start=None,
+    end=None,
+    sensor_ids: Optional[Iterable[str]] = None,
+    limit: int = 500,
+    cursor: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """Return one page of readings in timestamp order and the next cursor.
+
+    Readings are ordered by ``(timestamp, device, seq)``; the cursor encodes
+    the last key of the page and resumes strictly after it, so pages stay
+    stable while new readings arrive.  Raises ``ValueError`` for a malformed
+    cursor.
+    """
+    ids = sorted_ids(DEVICES if sensor_ids is None else sensor_ids)
+    after = _decode_cursor(cursor) if cursor else None
+    lo = after[0] if after else None
+    if lo is not None and start and _timestamp_key(start) > lo:
+        lo = None
+
+    def keyed(dev):
+        for ts, record in _iter_history(dev, start if lo is None else lo, end):
+            yield (ts, dev, record["seq"]), record
+
+    merged = heapq.merge(*(keyed(dev) for dev in ids), key=lambda item: item[0])
+    page: List[dict] = []
+    key = None
+    for key, record in merged:
+        if after is not None and key <= after:
+            continue
+        page.append(record)
+        if len(page) >= limit:
+            break
+    else:
+        return page, None
+    return page, _encode_cursor(key)
+
+
+def iter_sensor_data(
+    start=None, end=None, sensor_ids: Optional[Iterable[str]] = None
+) -> Iterator[dict]:
+    """Yield readings for several devices merged in timestamp order.
+
+    Each device history is already sorted, so a k-way merge streams the
+    combined result without building or sorting a global list.  Defaults to
+    all registered devices.
+    """
+    ids = DEVICES if sensor_ids is None else sensor_ids
+    streams = [_iter_history(dev, start, end) for dev in ids]
+    for _, record in heapq.merge(*streams, key=lambda item: item[0]):
+        yield record
+
+
+# Digests of CSV exports keyed by (sensor_id, start, end).  ``DATA_VERSION``
+# counts committed readings; a write drops every cached digest whose range it
+# falls in, and recent writes are kept so a digest computed while a write
+# landed in its range is not cached.
+DATA_VERSION = 0
+EXPORT_DIGEST_CACHE_SIZE = int(os.getenv("EXPORT_DIGEST_CACHE_SIZE", "256"))
+_EXPORT_DIGESTS: "OrderedDict[tuple, str]" = OrderedDict()
+_RECENT_WRITES: deque = deque(maxlen=4096)
+_DIGEST_LOCK = threading.Lock()
+
+
+def _in_range(key: tuple, device_id: str, ts_key: float) -> bool:
+    sensor_id, start, end = key
+    if sensor_id is not None and sensor_id != device_id:
+        return False
+    if start and ts_key < _timestamp_key(start):
+        return False
+    if end and ts_key > _timestamp_key(end):
+        return False
+    return True
+
+
+def _note_write(device_id: str, ts_key: float) -> None:
+    global DATA_VERSION
+    with _DIGEST_LOCK:
+        DATA_VERSION += 1
+        _RECENT_WRITES.append((DATA_VERSION, device_id, ts_key))
+        if _EXPORT_DIGESTS:
+            stale = [k for k in _EXPORT_DIGESTS if _in_range(k, device_id, ts_key)]
+            for key in stale:
+                del _EXPORT_DIGESTS[key]
+
+
+def data_version() -> int:
+    """Return a counter that increases with every committed reading."""
+    return DATA_VERSION
+
+
+def get_export_digest(sensor_id=None, start=None, end=None) -> Optional[str]:
+    """Return the cached export digest for a range, if still valid."""
+    key = (sensor_id or None, start or None, end or None)
+    with _DIGEST_LOCK:
+        digest = _EXPORT_DIGESTS.get(key)
+        if digest is not None:
+            _EXPORT_DIGESTS.move_to_end(key)
+        return digest
+
+
+def put_export_digest(sensor_id, start, end, digest: str, version: int) -> bool:
+    """Cache ``digest`` for a range computed from data as of ``version``.
+
+    The digest is discarded if a reading in the range was written after
+    ``version`` or if too many writes happened to tell.  Returns whether it
+    was cached.
+    """
+    key = (sensor_id or None, start or None, end or None)
+    with _DIGEST_LOCK:
+        if DATA_VERSION != version:
+            if not _RECENT_WRITES or _RECENT_WRITES[0][0] > version + 1:
+                return False
+            for written, device_id, ts_key in reversed(_RECENT_WRITES):
+                if written <= version:
+                    break
+                if _in_range(key, device_id, ts_key):
+                    return False
+        _EXPORT_DIGESTS[key] = digest
+        _EXPORT_DIGESTS.move_to_end(key)
+        while len(_EXPORT_DIGESTS) > EXPORT_DIGEST_CACHE_SIZE:
+            _EXPORT_DIGESTS.popitem(last=False)
+    return True
+
+
+def clear_export_digests() -> None:
+    with _DIGEST_LOCK:
+        _EXPORT_DIGESTS.clear()
 
 
 def get_all_sensor_data(start=None, end=None):
-    """Return readings for all devices."""
-    result = []
-    for dev in DEVICES:
-        result.extend(get_sensor_history(dev, start, end))
-    return result
+    """Return readings for all devices in timestamp order."""
+    return list(iter_sensor_data(start, end))
 
 
 def get_latest_readings():
@@ -438,41 +1315,81 @@ def get_state_on(date: str):
     start = date + "T00:00:00Z"
     end = date + "T23:59:59Z"
     for dev in DEVICES:
-        records = get_sensor_history(dev, start, end)
-        if records:
-            result[dev] = records[-1]
+        lo, hi = _history_bounds(dev, start, end)
+        if hi > lo:
+            result[dev] = SENSOR_DATA[dev][hi - 1]
     return result
 
 
 def query_blockchain_info():
     """Return basic ledger info such as height and current block hash."""
     print("[HLF] query blockchain info")
-    # ``CURRENT_BLOCK`` tracks the number of commits performed by the in-memory
-    # ledger used in the test environment.  Exposing it here allows external
-    # callers such as the sensor simulator to retrieve a monotonically
-    # increasing ledger height similar to ``peer channel getinfo`` in a real
-    # Fabric network.
-    return {"height": CURRENT_BLOCK, "current_hash": "0x0"}
+    # The height is the number of blocks in the block store, similar to
+    # ``peer channel getinfo`` in a real Fabric network.
+    return {"height": BLOCK_STORE.height, "current_hash": BLOCK_STORE.current_hash}
 
 
 def get_block(block_number):
-    """Retrieve a specific block."""
+    """Retrieve a specific block or ``None`` if it has not been cut."""
     print(f"[HLF] get block {block_number}")
-    return {
-        "header": {"number": block_number, "previous_hash": "0x0", "data_hash": "0x0"},
-        "data": [],
-    }
+    return BLOCK_STORE.get(block_number)
+
+
+def list_blocks(before=None, limit=20):
+    """Return up to ``limit`` block headers, newest first, below ``before``.
+
+    Each entry is the header plus the block ``hash``.  Pass the smallest
+    number from one page as ``before`` to fetch the next.
+    """
+    last = BLOCK_STORE.height if before is None else min(before - 1, BLOCK_STORE.height)
+    first = max(1, last - limit + 1)
+    page = [dict(header, hash=block_hash) for block_hash, header in BLOCK_STORE.headers(first, last)]
+    page.reverse()
+    return page
+
 
+def get_merkle_tree(block_number):
+    """Return ``{"root", "tree"}`` for a block as hex, or ``None``."""
+    levels = BLOCK_STORE.merkle_tree(block_number)
+    if levels is None:
+        return None
+    tree = [[node.hex() for node in level] for level in levels]
+    return {"root": tree[-1][0] if tree else "0x0", "tree": tree}
 
-QUARANTINED = set()
+
+def get_merkle_proof(block_number, tx_index):
+    """Return an inclusion proof for one transaction of a block.
+
+    The proof lists one sibling hash per tree level; see
+    :func:`flask_app.block_store.verify_proof`.  ``None`` is returned for an
+    unknown block or index.
+    """
+    levels = BLOCK_STORE.merkle_tree(block_number)
+    if not levels or not 0 <= tx_index < len(levels[0]):
+        return None
+    return {
+        "block": block_number,
+        "index": tx_index,
+        "leaf": levels[0][tx_index].hex(),
+        "root": levels[-1][0].hex(),
+        "proof": [
+            {"hash": sibling, "position": side}
+            for sibling, side in merkle_proof(levels, tx_index)
+        ],
+    }
 
 
 def quarantine_device(device_id):
     """Mark a device as quarantined."""
-    QUARANTINED.add(device_id)
+    DEVICE_REGISTRY.quarantine(device_id)
     print(f"[HLF] device {device_id} quarantined")
 
 
+def release_device(device_id):
+    """Lift a device's quarantine."""
+    DEVICE_REGISTRY.release(device_id)
+
+
 def is_quarantined(device_id):
     """Return True if the device is quarantined."""
     return device_id in QUARANTINED
@@ -15,11 +15,17 @@ or as a whole.
 from __future__ import annotations
 
 import argparse
+import hashlib
+import heapq
+import hmac
+import importlib.util
 import json
 import logging
 import os
+import sys
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field, asdict
 from http import HTTPStatus
 from pathlib import Path
@@ -34,6 +40,15 @@ from prometheus_client import (
     generate_latest,
 )
 
+# Load the sibling segment log module by path so this file also runs directly.
+_segment_log_spec = importlib.util.spec_from_file_location(
+    "gateway_segment_log", Path(__file__).with_name("segment_log.py")
+)
+_segment_log = importlib.util.module_from_spec(_segment_log_spec)
+sys.modules["gateway_segment_log"] = _segment_log
+_segment_log_spec.loader.exec_module(_segment_log)  # type: ignore[misc]
+SegmentLog = _segment_log.SegmentLog
+
 log = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -54,6 +69,17 @@ REQUIRED_KNOBS = [
     "LOG_LEVEL",
 ]
 
+# Tuning knobs resolved like REQUIRED_KNOBS but falling back to the
+# ``Settings`` default when unset.
+OPTIONAL_KNOBS = [
+    "DEDUP_WINDOW",
+    "STORE_FLUSH_BATCH",
+    "STORE_FLUSH_CONCURRENCY",
+    "STORE_SEGMENT_BYTES",
+    "STORE_RETRY_SEC",
+    "FABRIC_MAX_INFLIGHT",
+]
+
 
 @dataclass
 class Settings:
@@ -71,6 +97,12 @@ class Settings:
     store_dir: str = "./store"
     log_level: str = "INFO"
     dry_run: bool = False
+    dedup_window: int = 1024
+    store_flush_batch: int = 32
+    store_flush_concurrency: int = 4
+    store_segment_bytes: int = 1 << 20
+    store_retry_sec: float = 1.0
+    fabric_max_inflight: int = 4
 
 
 class ConfigService:
@@ -120,7 +152,7 @@ class ConfigService:
             raise SystemExit(f"create/adjust {cfg_path} and rerun")
 
         values: Dict[str, object] = {}
-        for key in REQUIRED_KNOBS:
+        for key in REQUIRED_KNOBS + OPTIONAL_KNOBS:
             env_val = os.getenv(key)
             if env_val is not None:
                 values[key] = env_val
@@ -134,6 +166,11 @@ class ConfigService:
         missing = [k for k in REQUIRED_KNOBS if k not in values]
         if missing:
             raise SystemExit(f"missing config keys: {', '.join(missing)}")
+        tuning = {
+            key.lower(): type(getattr(Settings, key.lower()))(values[key])
+            for key in OPTIONAL_KNOBS
+            if key in values
+        }
 
         settings = Settings(
             uplink_period_min=int(values["UPLINK_PERIOD_MIN"]),
@@ -148,6 +185,7 @@ class ConfigService:
             store_dir=str(values["STORE_DIR"]),
             log_level=str(values["LOG_LEVEL"]),
             dry_run=bool(args.dry_run),
+            **tuning,
         )
         return settings
 
@@ -271,17 +309,40 @@ bundles_submitted_total = Counter(
     "bundles_submitted_total", "Bundles submitted", ["type"], registry=REGISTRY
 )
 submit_commit_seconds = Histogram(
-    "submit_commit_seconds", "Submit to commit latency", registry=REGISTRY
+    "submit_commit_seconds",
+    "Submit to commit latency by phase (queue, submit, commit)",
+    ["phase"],
+    registry=REGISTRY,
 )
 mesh_neighbors_gauge = Gauge(
     "mesh_neighbors", "Number of BATMAN neighbors", registry=REGISTRY
 )
 store_backlog_files = Gauge(
-    "store_backlog_files", "Store and forward backlog", registry=REGISTRY
+    "store_backlog_files", "Bundles waiting in the store-and-forward log", registry=REGISTRY
+)
+store_expired_total = Counter(
+    "store_expired_total",
+    "Stored bundles dropped after store_max_age_hours",
+    registry=REGISTRY,
 )
 events_rate_limited_total = Counter(
     "events_rate_limited_total", "Events dropped due to rate limiting", registry=REGISTRY
 )
+stale_packets_total = Counter(
+    "stale_packets_total",
+    "Packets whose seq fell behind the per-device dedup window",
+    registry=REGISTRY,
+)
+late_arrivals_total = Counter(
+    "late_arrivals_total",
+    "Packets accepted out of order from inside the dedup window",
+    registry=REGISTRY,
+)
+dedup_window_evictions_total = Counter(
+    "dedup_window_evictions_total",
+    "Seen seqs shifted out of a dedup window",
+    registry=REGISTRY,
+)
 
 
 # ---------------------------------------------------------------------------
@@ -295,15 +356,15 @@ class MeshMonitor(threading.Thread):
     def __init__(self, settings: Settings) -> None:
         super().__init__(daemon=True)
         self.settings = settings
-        self._stop = threading.Event()
+        self._halt = threading.Event()
         self.neighbors: List[str] = []
 
     def run(self) -> None:  # pragma: no cover - monitoring loop
-        while not self._stop.wait(self.settings.mesh_check_interval_sec):
+        while not self._halt.wait(self.settings.mesh_check_interval_sec):
             self.check()
 
     def stop(self) -> None:
-        self._stop.set()
+        self._halt.set()
 
     def check(self) -> None:
         cmd = f"batctl n {self.settings.mesh_iface} 2>/dev/null"
@@ -324,13 +385,27 @@ class MeshMonitor(threading.Thread):
 
 
 class FabricClient:
-    """Very small stub of a Fabric client used for tests."""
+    """Very small stub of a Fabric client used for tests.
+
+    :meth:`submit_async` pipelines submissions: up to
+    ``settings.fabric_max_inflight`` bundles are in flight at once and each
+    returns a future that resolves when the bundle commits.  Bundles for the
+    same window (and all event bundles) commit in the order they were queued,
+    and a failure also fails the bundles queued behind it.
+    """
 
     def __init__(self, settings: Settings) -> None:
         self.settings = settings
         self.connected = True
         self.last_commit_time: Optional[float] = None
         self.submits: List[Dict] = []
+        # Simulated wait for the commit event after the orderer accepts a tx.
+        self.commit_delay = 0.0
+        self._lock = threading.Lock()
+        self._inflight = threading.BoundedSemaphore(max(1, settings.fabric_max_inflight))
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # Ordering key -> future of the last bundle queued under that key.
+        self._tails: Dict[tuple, Future] = {}
 
     def submit_reading_bundle(self, bundle: IntervalBundle) -> None:
         self._submit(bundle, "interval")
@@ -338,16 +413,83 @@ class FabricClient:
     def submit_event_bundle(self, bundle: EventBundle) -> None:
         self._submit(bundle, "event")
 
+    def submit_async(self, bundle, on_failure=None) -> Future:
+        """Queue ``bundle`` and return a future resolved on commit.
+
+        Blocks while the pipeline is full.  A failed submit sets the
+        future's exception, and bundles queued behind it for the same window
+        fail without being sent.  ``on_failure(bundle)`` runs before the
+        future resolves, so failures are handled in queue order.
+        """
+        btype = "event" if isinstance(bundle, EventBundle) else "interval"
+        key = (btype, getattr(bundle, "window_id", None))
+        self._inflight.acquire()
+        queued = time.time()
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=max(1, self.settings.fabric_max_inflight),
+                    thread_name_prefix="fabric-submit",
+                )
+            prev = self._tails.get(key)
+            future = self._pool.submit(
+                self._pipelined, bundle, btype, queued, prev, on_failure
+            )
+            self._tails[key] = future
+        future.add_done_callback(lambda f: self._done(key, f))
+        return future
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every queued bundle; return ``False`` on timeout."""
+        with self._lock:
+            pending = list(self._tails.values())
+        return not wait(pending, timeout).not_done
+
+    def shutdown(self) -> None:
+        """Wait for queued bundles and stop the submit threads."""
+        self.drain()
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def _done(self, key: tuple, future: Future) -> None:
+        with self._lock:
+            if self._tails.get(key) is future:
+                del self._tails[key]
+        self._inflight.release()
+
+    def _pipelined(
+        self, bundle, btype: str, queued: float, prev: Optional[Future], on_failure
+    ) -> None:
+        try:
+            # The pool is FIFO, so ``prev`` is already running or finished.
+            if prev is not None:
+                wait([prev])
+                if prev.exception() is not None:
+                    raise RuntimeError("an earlier bundle for this window failed")
+            submit_commit_seconds.labels(phase="queue").observe(time.time() - queued)
+            self._submit(bundle, btype)
+        except Exception:
+            if on_failure is not None:
+                on_failure(bundle)
+            raise
+
     def _submit(self, bundle, btype: str) -> None:
         start = time.time()
         if not self.connected or self.settings.dry_run:
             raise RuntimeError("fabric unavailable")
         # simulate network delay
         time.sleep(0.01)
-        self.last_commit_time = time.time()
-        self.submits.append({"type": btype, "bundle": bundle})
+        sent = time.time()
+        submit_commit_seconds.labels(phase="submit").observe(sent - start)
+        if self.commit_delay:
+            time.sleep(self.commit_delay)
+        with self._lock:
+            self.last_commit_time = time.time()
+            self.submits.append({"type": btype, "bundle": bundle})
         bundles_submitted_total.labels(type=btype).inc()
-        submit_commit_seconds.observe(self.last_commit_time - start)
+        submit_commit_seconds.labels(phase="commit").observe(self.last_commit_time - sent)
 
 
 # ---------------------------------------------------------------------------
@@ -355,40 +497,192 @@ class FabricClient:
 # ---------------------------------------------------------------------------
 
 
+def _bundle_kind(bundle) -> str:
+    if isinstance(bundle, EventBundle):
+        return "event"
+    if isinstance(bundle, IntervalBundle):
+        return "interval"
+    if isinstance(bundle, dict) and bundle.get("type") == "event":
+        return "event"
+    return "raw"
+
+
+def _bundle_from_record(record: Dict):
+    """Rebuild the bundle object persisted by :meth:`StoreAndForward.persist`."""
+    data = record["bundle"]
+    kind = record.get("kind", "raw")
+    if kind == "event":
+        if "events" not in data:
+            return data
+        return EventBundle(
+            start=data["start"],
+            end=data["end"],
+            events=[NormalizedReading(**r) for r in data["events"]],
+        )
+    if kind == "interval":
+        return IntervalBundle(
+            window_id=data["window_id"],
+            readings=[NormalizedReading(**r) for r in data["readings"]],
+            started_at=data["started_at"],
+            closes_at=data["closes_at"],
+        )
+    return data
+
+
 class StoreAndForward:
+    """Durable backlog of bundles that could not be submitted.
+
+    Bundles are appended to a :class:`SegmentLog` in ``store_dir/bundles``
+    (CRC-framed records in segment files), so the backlog survives restarts
+    and a torn write only loses the record being written.  :meth:`flush`
+    submits pending bundles in batches with bounded concurrency, drops those
+    older than ``store_max_age_hours`` and deletes fully delivered segments.
+
+    The log's committed offset only advances over a delivered prefix, so a
+    failed bundle stays at the head ahead of later bundles for its window.
+    Bundles delivered beyond that prefix are remembered in memory and skipped
+    until the offset catches up; after a restart they are submitted again.
+    """
+
     def __init__(self, settings: Settings):
         self.settings = settings
         self.dir = Path(settings.store_dir)
         self.dir.mkdir(parents=True, exist_ok=True)
-        self.queue: List[Dict] = []
+        self.log = SegmentLog(
+            self.dir / "bundles",
+            segment_bytes=settings.store_segment_bytes,
+            fsync_interval=0.0,
+            fsync_batch=1,
+        )
+        self._flush_lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # Log seqs past the committed offset that were already delivered.
+        self._delivered: set = set()
+        self._migrate_legacy()
+        store_backlog_files.set(self.depth)
+
+    def _migrate_legacy(self) -> None:
+        """Move ``bundle_*.json`` files written by older releases into the log."""
+        for path in sorted(self.dir.glob("bundle_*.json")):
+            try:
+                data = json.loads(path.read_text())
+            except Exception:
+                log.warning("dropping unreadable stored bundle %s", path)
+            else:
+                kind = "event" if "events" in data else "interval" if "window_id" in data else "raw"
+                self.log.append(
+                    {"kind": kind, "stored_at": path.stat().st_mtime, "bundle": data}
+                )
+            path.unlink(missing_ok=True)
+
+    @property
+    def depth(self) -> int:
+        """Number of stored bundles still awaiting delivery."""
+        return self.log.depth - len(self._delivered)
+
+    @property
+    def queue(self) -> List[Dict]:
+        """Pending stored records, oldest first.
+
+        Reads the backlog from disk; use :attr:`depth` for the count.
+        """
+        return [
+            record.data for record in self.log.pending() if record.seq not in self._delivered
+        ]
 
-    def persist(self, bundle: Dict) -> None:
-        ts = int(time.time()*1000)
-        path = self.dir / f"bundle_{ts}.json"
+    def persist(self, bundle) -> None:
         data = bundle
         if not isinstance(bundle, dict):
             try:
                 data = asdict(bundle)
             except Exception:
                 data = dict(bundle)  # type: ignore
-        path.write_text(json.dumps(data))
-        self.queue.append({"path": path, "bundle": bundle})
-        store_backlog_files.set(len(self.queue))
+        self.log.append(
+            {"kind": _bundle_kind(bundle), "stored_at": time.time(), "bundle": data}
+        )
+        store_backlog_files.set(self.depth)
+
+    def _submit(self, client: FabricClient, record: Dict) -> bool:
+        bundle = _bundle_from_record(record)
+        try:
+            if record.get("kind") == "event":
+                client.submit_event_bundle(bundle)  # type: ignore[arg-type]
+            else:
+                client.submit_reading_bundle(bundle)  # type: ignore[arg-type]
+            return True
+        except Exception:
+            return False
+
+    def _submit_in_order(self, client: FabricClient, records: List) -> List[int]:
+        """Submit ``records`` one after another, stopping at the first failure.
+
+        Returns the log seqs that were delivered.
+        """
+        delivered = []
+        for record in records:
+            if not self._submit(client, record.data):
+                break
+            delivered.append(record.seq)
+        return delivered
 
     def flush(self, client: FabricClient) -> None:
-        remaining: List[Dict] = []
-        for item in list(self.queue):
-            bundle = item["bundle"]
-            try:
-                if isinstance(bundle, EventBundle) or (isinstance(bundle, dict) and bundle.get("type") == "event"):
-                    client.submit_event_bundle(bundle)  # type: ignore[arg-type]
-                else:
-                    client.submit_reading_bundle(bundle)  # type: ignore[arg-type]
-                item["path"].unlink(missing_ok=True)
-            except Exception:
-                remaining.append(item)
-        self.queue = remaining
-        store_backlog_files.set(len(self.queue))
+        """Submit stored bundles until the backlog is empty or a submit fails.
+
+        Each batch is grouped by window (all event bundles form one group).
+        Groups run concurrently, each in stored order, and a group stops at
+        its first failure so later bundles for that window wait behind it.
+        """
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=max(1, self.settings.store_flush_concurrency),
+                    thread_name_prefix="store-flush",
+                )
+            max_age = self.settings.store_max_age_hours * 3600
+            while True:
+                scanned, batch = [], []
+                for record in self.log.pending():
+                    scanned.append(record)
+                    if record.seq in self._delivered:
+                        continue
+                    batch.append(record)
+                    if len(batch) >= self.settings.store_flush_batch:
+                        break
+                now = time.time()
+                groups: Dict[tuple, List] = {}
+                for record in batch:
+                    if now - record.data.get("stored_at", now) > max_age:
+                        store_expired_total.inc()
+                        self._delivered.add(record.seq)
+                        continue
+                    bundle = record.data.get("bundle")
+                    window = bundle.get("window_id") if isinstance(bundle, dict) else None
+                    groups.setdefault((record.data.get("kind"), window), []).append(record)
+                delivered = self._pool.map(
+                    lambda g: self._submit_in_order(client, g), groups.values()
+                )
+                attempted = sum(len(g) for g in groups.values())
+                done = 0
+                for seqs in delivered:
+                    self._delivered.update(seqs)
+                    done += len(seqs)
+                # Advance the committed offset over the delivered prefix.
+                head = None
+                for record in scanned:
+                    if record.seq not in self._delivered:
+                        break
+                    self._delivered.discard(record.seq)
+                    head = record
+                if head is not None:
+                    self.log.commit(head)
+                if not batch or done < attempted:
+                    break
+            self.log.compact()
+        finally:
+            store_backlog_files.set(self.depth)
+            self._flush_lock.release()
 
 
 # ---------------------------------------------------------------------------
@@ -396,6 +690,43 @@ class StoreAndForward:
 # ---------------------------------------------------------------------------
 
 
+class SeqWindow:
+    """Seqs seen from one device: a high-water mark and a bitmap below it.
+
+    Bit ``i`` of ``bits`` is set when ``high - i`` has been seen.  Seqs more
+    than ``size - 1`` below the high-water mark can no longer be checked and
+    are reported as stale.
+    """
+
+    __slots__ = ("size", "high", "bits")
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.high = -1
+        self.bits = 0
+
+    def check(self, seq: int) -> str:
+        """Record ``seq`` and return ``new``, ``late``, ``duplicate`` or ``stale``."""
+        if seq > self.high:
+            shift = seq - self.high
+            if self.high >= 0:
+                kept = self.bits if shift >= self.size else self.bits >> (self.size - shift)
+                evicted = bin(kept).count("1")
+                if evicted:
+                    dedup_window_evictions_total.inc(evicted)
+            self.bits = ((self.bits << shift) | 1) & ((1 << self.size) - 1)
+            self.high = seq
+            return "new"
+        offset = self.high - seq
+        if offset >= self.size:
+            return "stale"
+        mask = 1 << offset
+        if self.bits & mask:
+            return "duplicate"
+        self.bits |= mask
+        return "late"
+
+
 class Bundler:
     def __init__(self, settings: Settings, store: StoreAndForward, client: FabricClient):
         self.settings = settings
@@ -405,24 +736,52 @@ class Bundler:
         self.event_buffer: List[NormalizedReading] = []
         self.event_window_end = 0.0
         self.event_rate_count = 0
-        self.seen: Dict[str, int] = {}
-
-    def ingest(self, reading: NormalizedReading) -> None:
+        self.seq_windows: Dict[str, SeqWindow] = {}
+        # (closes_at, started_at, window_id) for every open interval window;
+        # ``wakeup`` is set when a deadline earlier than the scheduler's
+        # current sleep may have appeared.
+        self._deadlines: List[tuple] = []
+        self._lock = threading.Lock()
+        self.wakeup = threading.Event()
+
+    def ingest(self, reading: NormalizedReading) -> str:
+        """Bundle ``reading`` unless it was seen before.
+
+        Returns the dedup verdict: ``new`` or ``late`` readings are bundled,
+        ``duplicate`` and ``stale`` ones are dropped.
+        """
         ingress_packets_total.inc()
-        key = f"{reading.device_id}:{reading.seq}"
-        if key in self.seen:
+        window = self.seq_windows.get(reading.device_id)
+        if window is None:
+            window = self.seq_windows[reading.device_id] = SeqWindow(self.settings.dedup_window)
+        verdict = window.check(reading.seq)
+        if verdict == "duplicate":
             duplicates_total.inc()
-            return
-        self.seen[key] = 1
+            return verdict
+        if verdict == "stale":
+            stale_packets_total.inc()
+            log.warning("stale packet %s:%s behind window", reading.device_id, reading.seq)
+            return verdict
+        if verdict == "late":
+            late_arrivals_total.inc()
         if reading.urgent:
             self._handle_event(reading)
         else:
             self._handle_interval(reading)
+        return verdict
 
     # interval
     def _handle_interval(self, reading: NormalizedReading) -> None:
         window = reading.window_id
-        self.readings.setdefault(window, []).append(reading)
+        with self._lock:
+            readings = self.readings.get(window)
+            if readings is None:
+                readings = self.readings[window] = []
+                start, end = map(int, window.split("-"))
+                if not self._deadlines or end < self._deadlines[0][0]:
+                    self.wakeup.set()
+                heapq.heappush(self._deadlines, (end, start, window))
+            readings.append(reading)
 
     # events
     def _handle_event(self, reading: NormalizedReading) -> None:
@@ -433,11 +792,12 @@ class Bundler:
         if now > self.event_window_end:
             self.event_buffer = []
             self.event_window_end = now + self.settings.event_coalesce_sec
+            self.wakeup.set()
         self.event_buffer.append(reading)
         self.event_rate_count += 1
 
     def close_event_window(self) -> Optional[EventBundle]:
-        if self.event_buffer and time.time() > self.event_window_end:
+        if self.event_buffer and time.time() >= self.event_window_end:
             bundle = EventBundle(
                 start=self.event_window_end - self.settings.event_coalesce_sec,
                 end=self.event_window_end,
@@ -448,22 +808,37 @@ class Bundler:
             return bundle
         return None
 
-    def pop_closed_windows(self) -> List[IntervalBundle]:
-        now = time.time()
+    def pop_closed_windows(self, now: Optional[float] = None) -> List[IntervalBundle]:
+        """Return bundles for every window whose deadline has passed.
+
+        Deadlines sit in a min-heap, so each closed window costs O(log n)
+        and open windows are not visited.
+        """
+        now = time.time() if now is None else now
         bundles: List[IntervalBundle] = []
-        for window_id, readings in list(self.readings.items()):
-            start, end = map(int, window_id.split("-"))
-            if now >= end:
-                bundle = IntervalBundle(
-                    window_id=window_id,
-                    readings=readings,
-                    started_at=start,
-                    closes_at=end,
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                end, start, window_id = heapq.heappop(self._deadlines)
+                readings = self.readings.pop(window_id, None)
+                if readings is None:
+                    continue
+                bundles.append(
+                    IntervalBundle(
+                        window_id=window_id,
+                        readings=readings,
+                        started_at=start,
+                        closes_at=end,
+                    )
                 )
-                bundles.append(bundle)
-                del self.readings[window_id]
         return bundles
 
+    def next_deadline(self) -> Optional[float]:
+        """Return when the next interval or event window closes, if any."""
+        deadline = self._deadlines[0][0] if self._deadlines else None
+        if self.event_buffer and (deadline is None or self.event_window_end < deadline):
+            deadline = self.event_window_end
+        return deadline
+
     def submit_bundle(self, bundle) -> None:
         try:
             if isinstance(bundle, EventBundle):
@@ -471,7 +846,16 @@ class Bundler:
             else:
                 self.client.submit_reading_bundle(bundle)
         except Exception:
-            self.store.persist(bundle)
+            self._persist(bundle)
+
+    def _persist(self, bundle) -> None:
+        """Store ``bundle`` and wake the scheduler so it schedules a retry."""
+        self.store.persist(bundle)
+        self.wakeup.set()
+
+    def submit_bundle_async(self, bundle) -> Future:
+        """Pipeline ``bundle`` to the client; store it if the submit fails."""
+        return self.client.submit_async(bundle, on_failure=self._persist)
 
     def flush_store(self) -> None:
         self.store.flush(self.client)
@@ -483,31 +867,52 @@ class Bundler:
 
 
 class Scheduler(threading.Thread):
+    """Close windows at their deadlines and retry the stored backlog.
+
+    The thread sleeps until the earliest window deadline, event-coalesce
+    expiry or store retry, and is woken early by the bundler when a sooner
+    deadline appears.
+    """
+
     def __init__(self, settings: Settings, bundler: Bundler):
         super().__init__(daemon=True)
         self.settings = settings
         self.bundler = bundler
-        self._stop = threading.Event()
+        self._halt = threading.Event()
+
+    def tick(self) -> Optional[float]:
+        """Submit everything that is due and return seconds until the next deadline."""
+        self.bundler.wakeup.clear()
+        ev = self.bundler.close_event_window()
+        if ev:
+            self.bundler.submit_bundle_async(ev)
+        for bundle in self.bundler.pop_closed_windows():
+            self.bundler.submit_bundle_async(bundle)
+        self.bundler.flush_store()
+        now = time.time()
+        deadline = self.bundler.next_deadline()
+        if self.bundler.store.depth:
+            retry = now + self.settings.store_retry_sec
+            deadline = retry if deadline is None else min(deadline, retry)
+        return None if deadline is None else max(0.0, deadline - now)
 
     def run(self) -> None:  # pragma: no cover - thread loop
-        period = self.settings.uplink_period_min * 60
-        while not self._stop.wait(1):
-            # event bundles
-            ev = self.bundler.close_event_window()
-            if ev:
-                self.bundler.submit_bundle(ev)
-            # interval bundles
-            for bundle in self.bundler.pop_closed_windows():
-                self.bundler.submit_bundle(bundle)
-            # periodic flush
-            if time.time() % period < 1:
-                for bundle in self.bundler.pop_closed_windows():
-                    self.bundler.submit_bundle(bundle)
-            # store and forward retry
-            self.bundler.flush_store()
+        while not self._halt.is_set():
+            timeout = self.tick()
+            if self._halt.is_set():
+                break
+            if timeout is None and self.bundler.store.depth:
+                # A bundle was stored after tick() measured the backlog.
+                timeout = self.settings.store_retry_sec
+            self.bundler.wakeup.wait(timeout)
 
     def stop(self) -> None:
-        self._stop.set()
+        """Stop the loop, then wait for bundles already handed to the client."""
+        self._halt.set()
+        self.bundler.wakeup.set()
+        if self.is_alive() and self is not threading.current_thread():
+            self.join()
+        self.bundler.client.shutdown()
 
 
 # ---------------------------------------------------------------------------
@@ -515,22 +920,65 @@ class Scheduler(threading.Thread):
 # ---------------------------------------------------------------------------
 
 
+# Packets arrive already parsed, so the signed bytes are rebuilt from the
+# body: one sort_keys encoding per packet, as the leaf nodes produce them.
+_canonical_json = json.JSONEncoder(sort_keys=True).encode
+
+
 class IngressService:
-    def __init__(self, bundler: Bundler, registry: Dict[str, str]):
+    """Verify signed leaf packets and hand normalized readings to the bundler.
+
+    Each device's HMAC key is hashed into a primed ``hmac`` object once;
+    verifying a packet copies it instead of re-keying.  :meth:`ingest_batch`
+    verifies large batches on a thread pool and bundles the accepted readings
+    in their original order.
+    """
+
+    def __init__(
+        self,
+        bundler: Bundler,
+        registry: Dict[str, str],
+        verify_workers: int = 4,
+        parallel_threshold: int = 64,
+    ):
         self.bundler = bundler
         self.registry = registry  # device_id -> hmac_key
+        self.verify_workers = verify_workers
+        self.parallel_threshold = parallel_threshold
+        self._templates: Dict[str, tuple] = {}  # device_id -> (key, primed hmac)
+        self._pool: Optional[ThreadPoolExecutor] = None
 
-    def ingest(self, packet: Dict) -> None:
-        dev = packet["device_id"]
-        seq = int(packet["seq"])
+    def _template(self, dev: str):
         key = self.registry.get(dev)
-        body = {k: packet[k] for k in packet if k != "sig"}
-        payload = json.dumps(body, sort_keys=True).encode()
-        expected = hmac_sha256(key, payload)
-        if packet.get("sig") != expected:
-            raise ValueError("bad signature")
-        reading = NormalizedReading(
-            device_id=dev,
+        if key is None:
+            return None
+        cached = self._templates.get(dev)
+        if cached is None or cached[0] != key:
+            cached = (key, hmac.new(key.encode(), digestmod=hashlib.sha256))
+            self._templates[dev] = cached
+        return cached[1]
+
+    def _verify(self, packet: Dict) -> Optional[str]:
+        """Return ``None`` if ``packet`` is authentic, else the rejection reason."""
+        try:
+            dev = packet["device_id"]
+            int(packet["seq"])
+        except (KeyError, TypeError, ValueError):
+            return "malformed packet"
+        template = self._template(dev)
+        if template is None:
+            return "unknown device"
+        body = {k: v for k, v in packet.items() if k != "sig"}
+        mac = template.copy()
+        mac.update(_canonical_json(body).encode())
+        if not hmac.compare_digest(mac.hexdigest(), str(packet.get("sig", ""))):
+            return "bad signature"
+        return None
+
+    def _normalize(self, packet: Dict) -> NormalizedReading:
+        seq = int(packet["seq"])
+        return NormalizedReading(
+            device_id=packet["device_id"],
             seq=seq,
             window_id=packet.get("window_id", derive_window(seq, self.bundler.settings)).replace(":", "-"),
             stats=packet.get("stats", {}),
@@ -539,7 +987,43 @@ class IngressService:
             urgent=bool(packet.get("urgent")),
             sig_verified=True,
         )
-        self.bundler.ingest(reading)
+
+    def ingest(self, packet: Dict) -> str:
+        """Verify and bundle one packet, returning the bundler's verdict.
+
+        Raises ``ValueError`` with the rejection reason (``bad signature``,
+        ``unknown device`` or ``malformed packet``).
+        """
+        error = self._verify(packet)
+        if error:
+            raise ValueError(error)
+        return self.bundler.ingest(self._normalize(packet))
+
+    def ingest_batch(self, packets: List[Dict]) -> List[Dict]:
+        """Verify and ingest ``packets``, returning one result per packet.
+
+        Results carry ``device_id``, ``seq`` and ``status``: the bundler's
+        verdict (``new``, ``late``, ``duplicate`` or ``stale``) or
+        ``rejected`` with an ``error``.
+        """
+        packets = list(packets)
+        if len(packets) >= self.parallel_threshold and self.verify_workers > 1:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.verify_workers, thread_name_prefix="ingress-verify"
+                )
+            errors = list(self._pool.map(self._verify, packets))
+        else:
+            errors = [self._verify(p) for p in packets]
+        results = []
+        for packet, error in zip(packets, errors):
+            result = {"device_id": packet.get("device_id"), "seq": packet.get("seq")}
+            if error:
+                result.update(status="rejected", error=error)
+            else:
+                result["status"] = self.bundler.ingest(self._normalize(packet))
+            results.append(result)
+        return results
 
 
 def derive_window(seq: int, settings: Settings) -> str:
@@ -550,8 +1034,6 @@ def derive_window(seq: int, settings: Settings) -> str:
 
 
 def hmac_sha256(key: str, payload: bytes) -> str:
-    import hmac, hashlib
-
     return hmac.new(key.encode(), payload, hashlib.sha256).hexdigest()
 
 
@@ -625,6 +1107,8 @@ def main(argv: Optional[List[str]] = None) -> None:
             time.sleep(3600)
     except KeyboardInterrupt:
         pass
+    finally:
+        scheduler.stop()
 
 
 if __name__ == "__main__":  # pragma: no cover - manual execution
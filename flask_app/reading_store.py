@@ -0,0 +1,470 @@
+"""Memory-mapped columnar storage for sensor readings.
+
+Every device gets a directory holding two files:
+
+``columns.bin``
+    One fixed-width, append-only array per column (``seq``, ``timestamp`` and
+    the six sensor metrics, plus the location and digest of the payload).
+    Each array occupies its own region of the file, which is memory-mapped so
+    reads are zero-copy :class:`memoryview` slices and the data lives in the
+    page cache rather than on the Python heap.  Regions are re-laid out into a
+    file of twice the capacity when they fill up.
+``payloads.blob``
+    The original timestamp text, the encrypted payload and a bitmask of the
+    metrics that were given as integers, appended as JSON and addressed by
+    ``blob_offset``/``blob_length``.  Metric columns hold float64 values; the
+    bitmask turns integer readings back into ``int`` when rows are read, so
+    ``300`` is not returned as ``300.0``.
+
+Rows are stored in arrival order.  The ledger client only appends increasing
+sequence numbers, so duplicate lookups binary search the ``seq`` column and
+need no index in memory.  Timestamps are normally non-decreasing as well;
+when a late reading arrives (for example from the backlog) a permutation of
+row numbers in timestamp order is kept in memory until the next compaction.
+
+Retention drops rows older than a cutoff by advancing a ``head`` row.  Once
+more than half of the file is behind the head the device is compacted.
+
+Writers hold the device lock.  Growing the file swaps in a new mapping, so
+readers take the columns together with the row count from
+:meth:`DeviceColumns.snapshot` and never index a mapping with a row count
+that belongs to another one.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import mmap
+import os
+import shutil
+import threading
+import weakref
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+METRICS = ("temperature", "humidity", "soil_moisture", "ph", "light", "water_level")
+DIGEST_SIZE = 32
+# (name, array typecode, items per row)
+COLUMNS = (
+    [("seq", "q", 1), ("timestamp", "d", 1)]
+    + [(name, "d", 1) for name in METRICS]
+    + [("blob_offset", "q", 1), ("blob_length", "q", 1), ("digest", "B", DIGEST_SIZE)]
+)
+_ROW_BYTES = sum(array(code).itemsize * width for _, code, width in COLUMNS)
+_INITIAL_CAPACITY = 1024
+_COLUMNS_FILE = "columns.bin"
+_BLOB_FILE = "payloads.blob"
+_META_FILE = "meta.json"
+
+
+class DeviceColumns:
+    """Column arrays and payload blobs for a single device."""
+
+    def __init__(self, directory: Path, device_id: str) -> None:
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.device_id = device_id
+        self.lock = threading.RLock()
+        self._load()
+
+    # ------------------------------------------------------------------
+    # file layout
+    # ------------------------------------------------------------------
+
+    def _load(self) -> None:
+        self.rows = 0
+        self.head = 0
+        self.sorted = True
+        self._order: Optional[array] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self.cols: Dict[str, memoryview] = {}
+        meta = self._read_meta()
+        path = self.dir / _COLUMNS_FILE
+        capacity = path.stat().st_size // _ROW_BYTES if path.exists() else 0
+        self._map(max(capacity, _INITIAL_CAPACITY))
+        self.head = int(meta.get("head", 0))
+        self.sorted = bool(meta.get("sorted", True))
+        self._recover_rows(int(meta.get("rows", 0)))
+
+    def _read_meta(self) -> dict:
+        try:
+            return json.loads((self.dir / _META_FILE).read_text())
+        except Exception:
+            return {}
+
+    def _map(self, capacity: int, path: Optional[Path] = None) -> None:
+        path = path or self.dir / _COLUMNS_FILE
+        with path.open("a+b") as fh:
+            if os.fstat(fh.fileno()).st_size < capacity * _ROW_BYTES:
+                fh.truncate(capacity * _ROW_BYTES)
+            mapped = mmap.mmap(fh.fileno(), capacity * _ROW_BYTES)
+        raw = memoryview(mapped)
+        cols: Dict[str, memoryview] = {}
+        offset = 0
+        for name, code, width in COLUMNS:
+            size = capacity * width * array(code).itemsize
+            cols[name] = raw[offset:offset + size].cast(code)
+            offset += size
+        # Views handed out earlier keep the previous mapping alive until they
+        # are released, so the old map is dropped rather than closed.
+        self._mmap = mapped
+        self.cols = cols
+        self.capacity = capacity
+
+    def _recover_rows(self, hint: int) -> None:
+        seq = self.cols["seq"]
+        ts = self.cols["timestamp"]
+        rows = min(hint, self.capacity)
+        # ``seq`` is written last and is always positive, so any fully
+        # written rows past the persisted count are still picked up.
+        while rows < self.capacity and seq[rows] != 0:
+            if rows > self.head and ts[rows] < ts[rows - 1]:
+                self.sorted = False
+            rows += 1
+        self.rows = rows
+        self.head = min(self.head, rows)
+
+    def _grow(self, needed: int) -> None:
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        tmp = self.dir / (_COLUMNS_FILE + ".tmp")
+        tmp.unlink(missing_ok=True)
+        old = self.cols
+        rows = self.rows
+        self._map(capacity, tmp)
+        for name, _, width in COLUMNS:
+            self.cols[name][: rows * width] = old[name][: rows * width]
+        self._mmap.flush()
+        os.replace(tmp, self.dir / _COLUMNS_FILE)
+
+    # ------------------------------------------------------------------
+    # writes
+    # ------------------------------------------------------------------
+
+    def append(
+        self,
+        seq: int,
+        ts_key: float,
+        metrics: Sequence[float],
+        timestamp,
+        payload,
+        digest: bytes,
+    ) -> int:
+        """Append a row and return its row number."""
+        ints = sum(1 << i for i, value in enumerate(metrics) if type(value) is int)
+        blob = json.dumps([timestamp, payload, ints]).encode("utf-8")
+        with self.lock:
+            with (self.dir / _BLOB_FILE).open("ab") as fh:
+                offset = fh.tell()
+                fh.write(blob)
+            if self.rows >= self.capacity:
+                self._grow(self.rows + 1)
+            row = self.rows
+            cols = self.cols
+            cols["timestamp"][row] = ts_key
+            for name, value in zip(METRICS, metrics):
+                cols[name][row] = value
+            cols["blob_offset"][row] = offset
+            cols["blob_length"][row] = len(blob)
+            cols["digest"][row * DIGEST_SIZE:(row + 1) * DIGEST_SIZE] = digest
+            cols["seq"][row] = seq
+            if row > self.head and ts_key < cols["timestamp"][row - 1]:
+                self.sorted = False
+            if not self.sorted and self._order is not None:
+                ts = cols["timestamp"]
+                pos = bisect.bisect_right(
+                    self._order, ts_key, key=ts.__getitem__
+                )
+                self._order.insert(pos, row)
+            self.rows = row + 1
+            return row
+
+    def retain(self, cutoff: float) -> None:
+        """Drop rows whose timestamp is older than ``cutoff``."""
+        with self.lock:
+            ts = self.cols["timestamp"]
+            head = self.head
+            while head < self.rows and ts[head] < cutoff:
+                head += 1
+            if head == self.head:
+                return
+            self.head = head
+            self._order = None
+            if head > _INITIAL_CAPACITY and head * 2 > self.rows:
+                self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the device files without the rows behind ``head``."""
+        with self.lock:
+            tmp_dir = self.dir.with_name(self.dir.name + ".compact")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            fresh = DeviceColumns(tmp_dir, self.device_id)
+            rows = range(self.head, self.rows)
+            for row, entry in zip(rows, self.records(rows)):
+                fresh.append(
+                    entry["seq"],
+                    self.cols["timestamp"][row],
+                    [entry[name] for name in METRICS],
+                    entry["timestamp"],
+                    entry["payload"],
+                    self.digest(row),
+                )
+            fresh.sync()
+            shutil.rmtree(self.dir)
+            os.replace(tmp_dir, self.dir)
+            self._load()
+
+    def sync(self) -> None:
+        """Flush mapped columns and persist the row count and head."""
+        with self.lock:
+            if self._mmap is not None:
+                self._mmap.flush()
+            meta = {
+                "id": self.device_id,
+                "rows": self.rows,
+                "head": self.head,
+                "sorted": self.sorted,
+            }
+            (self.dir / _META_FILE).write_text(json.dumps(meta))
+
+    # ------------------------------------------------------------------
+    # reads
+    # ------------------------------------------------------------------
+
+    def snapshot(self) -> Tuple[Dict[str, memoryview], int, int]:
+        """Return ``(cols, head, rows)`` taken together under the lock."""
+        with self.lock:
+            return self.cols, self.head, self.rows
+
+    def __len__(self) -> int:
+        _, head, rows = self.snapshot()
+        return rows - head
+
+    def _blobs(self, rows, cols: Optional[Dict[str, memoryview]] = None) -> Iterator[list]:
+        """Yield ``[timestamp, payload, ints]`` for each row, reusing one descriptor."""
+        cols = cols or self.snapshot()[0]
+        offsets = cols["blob_offset"]
+        lengths = cols["blob_length"]
+        fd = os.open(self.dir / _BLOB_FILE, os.O_RDONLY)
+        try:
+            for row in rows:
+                yield json.loads(os.pread(fd, lengths[row], offsets[row]))
+        finally:
+            os.close(fd)
+
+    def digest(self, row: int) -> bytes:
+        cols = self.snapshot()[0]
+        return bytes(cols["digest"][row * DIGEST_SIZE:(row + 1) * DIGEST_SIZE])
+
+    def records(self, rows) -> Iterator[dict]:
+        """Materialize each of ``rows`` as a reading dict."""
+        cols = self.snapshot()[0]
+        rows = list(rows)
+        for row, blob in zip(rows, self._blobs(rows, cols)):
+            ints = blob[2]
+            entry = {"id": self.device_id, "seq": cols["seq"][row]}
+            for i, name in enumerate(METRICS):
+                value = cols[name][row]
+                entry[name] = int(value) if ints >> i & 1 else value
+            entry["timestamp"] = blob[0]
+            entry["payload"] = blob[1]
+            yield entry
+
+    def record(self, row: int) -> dict:
+        """Materialize a single row as a reading dict."""
+        return next(self.records([row]))
+
+    def find_seq(self, seq: int) -> Optional[int]:
+        """Return the row holding ``seq`` or ``None``.
+
+        Rows are appended with increasing ``seq``, so the column is searched
+        with bisect.
+        """
+        cols, head, rows = self.snapshot()
+        column = cols["seq"]
+        row = bisect.bisect_left(column, seq, head, rows)
+        return row if row < rows and column[row] == seq else None
+
+    def last_seq(self) -> int:
+        cols, _, rows = self.snapshot()
+        return cols["seq"][rows - 1] if rows else 0
+
+    def _ordered(self) -> Optional[array]:
+        """Return row numbers in timestamp order, or ``None`` if rows are."""
+        if self.sorted:
+            return None
+        with self.lock:
+            if self._order is None:
+                ts = self.cols["timestamp"]
+                rows = sorted(range(self.head, self.rows), key=ts.__getitem__)
+                self._order = array("q", rows)
+            return self._order
+
+    def row_at(self, position: int) -> int:
+        """Return the row number at ``position`` in timestamp order."""
+        order = self._ordered()
+        return order[position] if order is not None else self.head + position
+
+    def bounds(self, lo_key: Optional[float], hi_key: Optional[float]) -> Tuple[int, int]:
+        """Return the ``[lo, hi)`` positions with timestamps inside the range."""
+        order = self._ordered()
+        cols, head, rows = self.snapshot()
+        ts = cols["timestamp"]
+        size = rows - head
+        if order is None:
+            lo = bisect.bisect_left(ts, lo_key, head, rows) - head if lo_key is not None else 0
+            hi = bisect.bisect_right(ts, hi_key, head, rows) - head if hi_key is not None else size
+        else:
+            key = ts.__getitem__
+            lo = bisect.bisect_left(order, lo_key, key=key) if lo_key is not None else 0
+            hi = bisect.bisect_right(order, hi_key, key=key) if hi_key is not None else size
+        return lo, max(lo, hi)
+
+    def column(self, name: str, lo: int, hi: int) -> memoryview:
+        """Return ``name`` values for positions ``[lo, hi)`` in timestamp order.
+
+        The slice is zero-copy unless late arrivals have made the stored
+        order differ from timestamp order.
+        """
+        order = self._ordered()
+        cols, head, _ = self.snapshot()
+        view = cols[name]
+        if order is None:
+            return view[head + lo:head + hi]
+        code = dict((n, c) for n, c, _ in COLUMNS)[name]
+        return memoryview(array(code, (view[order[p]] for p in range(lo, hi))))
+
+    def iter_range(self, lo: int, hi: int) -> Iterator[Tuple[float, dict]]:
+        """Yield ``(timestamp_key, record)`` for positions ``[lo, hi)``."""
+        # Materialize in chunks so a caller that stops early reads little.
+        for chunk in range(lo, hi, 256):
+            rows = [self.row_at(p) for p in range(chunk, min(chunk + 256, hi))]
+            ts = self.snapshot()[0]["timestamp"]
+            for row, record in zip(rows, self.records(rows)):
+                yield ts[row], record
+
+
+class DeviceHistory(Sequence):
+    """Read-only list view of a device's readings in timestamp order."""
+
+    def __init__(self, columns: DeviceColumns) -> None:
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def __getitem__(self, index):
+        columns = self.columns
+        if isinstance(index, slice):
+            positions = range(*index.indices(len(columns)))
+            return list(columns.records(columns.row_at(p) for p in positions))
+        size = len(columns)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("reading index out of range")
+        return columns.record(columns.row_at(index))
+
+
+class ReadingStore:
+    """Mapping of device ID to :class:`DeviceHistory` backed by mapped files.
+
+    At most ``max_open`` devices stay in the cache; the least recently used
+    ones are synced and dropped from it.  An evicted device is unmapped once
+    no caller holds it.  Until then later lookups return that same object,
+    so a device never has two open handles with their own row counters.
+    """
+
+    def __init__(self, root: Path, max_open: int = 256) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_open = max_open
+        self._lock = threading.RLock()
+        self._open: "OrderedDict[str, DeviceColumns]" = OrderedDict()
+        # Every live handle, including evicted ones still held by a caller.
+        self._handles: "weakref.WeakValueDictionary[str, DeviceColumns]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._dirs: Dict[str, Path] = {}
+        for child in self.root.iterdir():
+            if child.name.endswith(".compact"):
+                # Left behind by an interrupted compaction.
+                shutil.rmtree(child, ignore_errors=True)
+                continue
+            if child.is_dir() and (child / _META_FILE).exists():
+                try:
+                    meta = json.loads((child / _META_FILE).read_text())
+                except Exception:
+                    continue
+                self._dirs[meta.get("id", child.name)] = child
+
+    def device(self, device_id: str, create: bool = False) -> Optional[DeviceColumns]:
+        """Return the columns for ``device_id``, mapping them if needed."""
+        with self._lock:
+            columns = self._open.get(device_id)
+            if columns is not None:
+                self._open.move_to_end(device_id)
+                return columns
+            path = self._dirs.get(device_id)
+            if path is None:
+                if not create:
+                    return None
+                path = self.root / quote(device_id, safe="")
+                self._dirs[device_id] = path
+            columns = self._handles.get(device_id)
+            if columns is None:
+                columns = DeviceColumns(path, device_id)
+                if create:
+                    columns.sync()
+                self._handles[device_id] = columns
+            self._open[device_id] = columns
+            while len(self._open) > self.max_open:
+                _, evicted = self._open.popitem(last=False)
+                evicted.sync()
+            return columns
+
+    def sync(self) -> None:
+        with self._lock:
+            for columns in self._open.values():
+                columns.sync()
+
+    # Mapping-style access used by existing callers of ``SENSOR_DATA``.
+
+    def keys(self) -> List[str]:
+        return list(self._dirs)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self._dirs)
+
+    def __contains__(self, device_id) -> bool:
+        return device_id in self._dirs
+
+    def get(self, device_id, default=None):
+        columns = self.device(device_id)
+        return DeviceHistory(columns) if columns is not None else default
+
+    def __getitem__(self, device_id) -> DeviceHistory:
+        history = self.get(device_id)
+        if history is None:
+            raise KeyError(device_id)
+        return history
+
+    def items(self):
+        return [(device_id, self[device_id]) for device_id in self.keys()]
+
+    def clear(self) -> None:
+        """Delete every stored reading."""
+        with self._lock:
+            self._open.clear()
+            self._handles = weakref.WeakValueDictionary()
+            for path in self._dirs.values():
+                shutil.rmtree(path, ignore_errors=True)
+            self._dirs.clear()
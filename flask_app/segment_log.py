@@ -0,0 +1,270 @@
+"""Segmented append-only record log used for store-and-forward backlogs.
+
+Records are JSON documents written to fixed-size segment files.  Each record
+is framed with its length and a CRC32 checksum so a torn write at the tail of
+the active segment is detected and truncated on recovery.  Consumers read
+from a committed offset, acknowledge records with :meth:`SegmentLog.commit`
+and whole segments are deleted once every record in them is committed.
+
+Appends are flushed to the OS immediately but ``fsync`` is grouped: it runs
+at most once per ``fsync_interval`` seconds or every ``fsync_batch`` records,
+whichever comes first.  The committed offset is persisted with the same
+cadence.  A process crash may re-deliver a few acknowledged records but loses
+no appended ones, since they are already in the page cache.  A power loss or
+kernel crash can also drop the appends made since the last ``fsync``; pass
+``fsync_batch=1`` where every append must be durable before it returns.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Iterator, List, NamedTuple, Optional
+
+_FRAME = struct.Struct("<II")  # payload length, CRC32 of payload
+_SEGMENT_SUFFIX = ".seg"
+_COMMIT_FILE = "committed.json"
+
+
+class LogRecord(NamedTuple):
+    """A record read back from the log."""
+
+    seq: int
+    data: dict
+    segment: int
+    end: int
+
+
+def _segment_name(first_seq: int) -> str:
+    return f"{first_seq:020d}{_SEGMENT_SUFFIX}"
+
+
+def _read_frames(path: Path, offset: int = 0) -> Iterator[tuple]:
+    """Yield ``(payload, end_offset)`` for each intact frame in ``path``."""
+    with path.open("rb") as fh:
+        fh.seek(offset)
+        pos = offset
+        while True:
+            header = fh.read(_FRAME.size)
+            if len(header) < _FRAME.size:
+                return
+            length, crc = _FRAME.unpack(header)
+            payload = fh.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            pos += _FRAME.size + length
+            yield payload, pos
+
+
+class SegmentLog:
+    """Durable FIFO of JSON records split across segment files."""
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_bytes: int = 1 << 20,
+        fsync_interval: float = 0.5,
+        fsync_batch: int = 64,
+    ) -> None:
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.fsync_batch = fsync_batch
+        self._lock = threading.RLock()
+        self._segments: List[int] = []
+        self._fh = None
+        self._active_size = 0
+        self._next_seq = 0
+        self._committed = 0
+        self._commit_segment: Optional[int] = None
+        self._commit_offset = 0
+        self._unsynced = 0
+        self._commit_dirty = False
+        self._last_sync = time.monotonic()
+        self._recover()
+
+    # ------------------------------------------------------------------
+    # recovery
+    # ------------------------------------------------------------------
+
+    def _recover(self) -> None:
+        self._segments = sorted(
+            int(p.name[: -len(_SEGMENT_SUFFIX)])
+            for p in self.dir.glob(f"*{_SEGMENT_SUFFIX}")
+        )
+        commit_path = self.dir / _COMMIT_FILE
+        if commit_path.exists():
+            try:
+                state = json.loads(commit_path.read_text())
+                self._committed = int(state["seq"])
+                self._commit_segment = state.get("segment")
+                self._commit_offset = int(state.get("offset", 0))
+            except Exception:
+                self._committed = 0
+        if not self._segments:
+            self._next_seq = self._committed
+            return
+        if self._committed < self._segments[0]:
+            # Segments before the first one on disk were compacted away.
+            self._committed = self._segments[0]
+            self._commit_segment = None
+        last = self._segments[-1]
+        path = self.dir / _segment_name(last)
+        count = 0
+        end = 0
+        for _, end in _read_frames(path):
+            count += 1
+        if end != path.stat().st_size:
+            with path.open("r+b") as fh:
+                fh.truncate(end)
+        self._next_seq = last + count
+        self._active_size = end
+        self._committed = min(self._committed, self._next_seq)
+
+    # ------------------------------------------------------------------
+    # writing
+    # ------------------------------------------------------------------
+
+    @property
+    def depth(self) -> int:
+        """Number of appended records not yet committed."""
+        return self._next_seq - self._committed
+
+    def append(self, data: dict) -> int:
+        """Append ``data`` and return its sequence number in the log."""
+        payload = json.dumps(data).encode("utf-8")
+        frame = _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._lock:
+            if self._fh is None or self._active_size >= self.segment_bytes:
+                self._roll()
+            self._fh.write(frame)
+            self._fh.flush()
+            self._active_size += len(frame)
+            seq = self._next_seq
+            self._next_seq += 1
+            self._unsynced += 1
+            self._maybe_sync()
+            return seq
+
+    def _roll(self) -> None:
+        if self._fh is not None:
+            os.fsync(self._fh.fileno())
+            self._fh.close()
+        if not self._segments or self._active_size >= self.segment_bytes:
+            self._segments.append(self._next_seq)
+            self._active_size = 0
+        path = self.dir / _segment_name(self._segments[-1])
+        self._fh = path.open("ab")
+
+    def _maybe_sync(self) -> None:
+        if (
+            self._unsynced >= self.fsync_batch
+            or time.monotonic() - self._last_sync >= self.fsync_interval
+        ):
+            self.sync()
+
+    def sync(self) -> None:
+        """Force pending appends and the committed offset to stable storage."""
+        with self._lock:
+            if self._fh is not None and self._unsynced:
+                os.fsync(self._fh.fileno())
+            self._unsynced = 0
+            if self._commit_dirty:
+                state = {
+                    "seq": self._committed,
+                    "segment": self._commit_segment,
+                    "offset": self._commit_offset,
+                }
+                tmp = self.dir / (_COMMIT_FILE + ".tmp")
+                with tmp.open("w") as fh:
+                    json.dump(state, fh)
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                os.replace(tmp, self.dir / _COMMIT_FILE)
+                self._commit_dirty = False
+            self._last_sync = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # reading
+    # ------------------------------------------------------------------
+
+    def pending(self) -> Iterator[LogRecord]:
+        """Yield uncommitted records in append order.
+
+        Records appended while iterating are not included.
+        """
+        with self._lock:
+            if self._fh is not None:
+                self._fh.flush()
+            segments = list(self._segments)
+            seq = self._committed
+            stop = self._next_seq
+            start_segment = self._commit_segment
+            start_offset = self._commit_offset
+        for i, first in enumerate(segments):
+            following = segments[i + 1] if i + 1 < len(segments) else stop
+            if following <= seq:
+                continue
+            if first == start_segment and start_offset:
+                # Resume directly after the last committed frame.
+                offset, index = start_offset, seq
+            else:
+                offset, index = 0, first
+            path = self.dir / _segment_name(first)
+            if not path.exists():
+                continue
+            for payload, end in _read_frames(path, offset):
+                if index >= stop:
+                    return
+                if index >= seq:
+                    yield LogRecord(index, json.loads(payload), first, end)
+                index += 1
+
+    def commit(self, record: LogRecord) -> None:
+        """Acknowledge ``record`` and every record before it."""
+        with self._lock:
+            if record.seq < self._committed:
+                return
+            self._committed = record.seq + 1
+            self._commit_segment = record.segment
+            self._commit_offset = record.end
+            self._commit_dirty = True
+            self._maybe_sync()
+
+    def compact(self) -> int:
+        """Delete fully committed segments and return how many were removed."""
+        removed = 0
+        with self._lock:
+            if self.depth == 0 and self._segments:
+                if self._fh is not None:
+                    self._fh.close()
+                    self._fh = None
+                doomed = list(self._segments)
+                self._segments = []
+                self._active_size = 0
+                self._commit_segment = None
+                self._commit_offset = 0
+                self._commit_dirty = True
+            else:
+                doomed = []
+                while len(self._segments) > 1 and self._segments[1] <= self._committed:
+                    doomed.append(self._segments.pop(0))
+            for first in doomed:
+                (self.dir / _segment_name(first)).unlink(missing_ok=True)
+                removed += 1
+            if removed:
+                self.sync()
+        return removed
+
+    def close(self) -> None:
+        with self._lock:
+            self.sync()
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
@@ -41,6 +41,8 @@ CLIENT_CERT = os.environ.get("SIMULATOR_CLIENT_CERT")
 CLIENT_KEY = os.environ.get("SIMULATOR_CLIENT_KEY")
 CERT = (CLIENT_CERT, CLIENT_KEY) if CLIENT_CERT and CLIENT_KEY else None
 METRICS_PORT = int(os.environ.get("SIMULATOR_METRICS_PORT", "9101"))
+# How long to wait on the gateway's commit long-poll after each reading.
+COMMIT_WAIT_SECONDS = float(os.environ.get("SIMULATOR_COMMIT_WAIT", "5"))
 
 REGISTRY = CollectorRegistry()
 SEND_COUNTER = Counter("simulator_send_total", "Total payloads sent", registry=REGISTRY)
@@ -409,42 +411,33 @@ def _simulate_sensor(sensor_id: str, node_ip: str, gpio_pin: int) -> None:
         except Exception as exc:
             print(f"record_sensor_data failed for {sensor_id}: {exc}")
 
-        commit_record = None
-        for _ in range(10):
-            try:
-                resp = requests.get(
-                    urljoin(BASE_URL, "/latest-readings"),
-                    timeout=5,
-                    verify=VERIFY,
-                    cert=CERT,
-                )
-                latest = resp.json()
-                rec = latest.get(sensor_id)
-                if rec and int(rec.get("seq", 0)) == seq:
-                    commit_record = rec
-                    break
-            except Exception:
-                pass
-            time.sleep(0.5)
-
-        if commit_record:
-            commit_ts = commit_record.get("timestamp")
-            try:
-                info = requests.get(
-                    urljoin(BASE_URL, "/blockchain-info"), timeout=5, verify=VERIFY
-                ).json()
-                height = info.get("height")
-            except Exception:
-                height = None
+        commit_event = None
+        try:
+            # One long-poll returns as soon as this reading is committed.
+            resp = requests.get(
+                urljoin(BASE_URL, "/commits"),
+                params={"device": sensor_id, "seq": seq, "timeout": COMMIT_WAIT_SECONDS},
+                timeout=COMMIT_WAIT_SECONDS + 5,
+                verify=VERIFY,
+                cert=CERT,
+            )
+            events = resp.json().get("events", [])
+            commit_event = events[-1] if events else None
+        except Exception:
+            pass
+
+        if commit_event:
+            commit_ts = commit_event.get("committed")
+            height = commit_event.get("block")
             try:
-                commit_dt = datetime.fromisoformat(commit_ts.replace("Z", "+00:00"))
+                commit_dt = datetime.fromisoformat(commit_ts).replace(tzinfo=None)
                 latency = (commit_dt - submit_dt).total_seconds()
             except Exception:
                 latency = None
             latency_s = f"{latency:.3f}s" if latency is not None else "unknown"
             print(
                 f"[latency] {sensor_id} seq {seq} submit {submit_dt.isoformat()} "
-                f"commit {commit_ts} height {height} latency {latency_s}"
+                f"commit {commit_ts} block {height} latency {latency_s}"
             )
         else:
             print(f"[latency] {sensor_id} seq {seq} commit not confirmed")
@@ -0,0 +1,291 @@
+import importlib.util
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+import flask_app.hlf_client as hlf_client
+
+# Load flask_app.app against the real hlf_client; other test modules may
+# install a stub under the top-level name, so only swap it in for the import.
+_saved = sys.modules.get("hlf_client")
+sys.modules["hlf_client"] = hlf_client
+try:
+    spec = importlib.util.spec_from_file_location("flask_app.app", Path("flask_app/app.py"))
+    apps = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(apps)  # type: ignore[misc]
+finally:
+    if _saved is None:
+        sys.modules.pop("hlf_client", None)
+    else:
+        sys.modules["hlf_client"] = _saved
+    sys.modules.pop("gateway_orchestrator", None)
+
+
+def test_upload_assigns_next_sequence_number():
+    tc = apps.app.test_client()
+    start = hlf_client.last_commit_id()
+    for seq, body in enumerate([b"first", b"second"], 1):
+        resp = tc.post("/upload", data={"file": (io.BytesIO(body), "upload_seq.bin")})
+        assert resp.status_code == 200 and resp.get_json() == {"stored": True}
+        events = hlf_client.wait_for_commits(start, timeout=5, device="upload_seq.bin", seq=seq)
+        assert [e["seq"] for e in events] == [seq]
+    assert hlf_client.get_last_seq("upload_seq.bin") == 2
+
+
+def test_batch_readings_are_stamped_with_server_time():
+    tc = apps.app.test_client()
+    start = hlf_client.last_commit_id()
+    body = [{"id": "batch_ts", "seq": 1, "temperature": 20, "timestamp": "1999-01-01T00:00:00Z"}]
+    resp = tc.post("/sensor/batch", json=body)
+    assert [r["status"] for r in resp.get_json()["results"]] == ["queued"]
+    assert hlf_client.wait_for_commits(start, timeout=5, device="batch_ts", seq=1)
+    assert hlf_client.get_sensor_data("batch_ts")["timestamp"] != "1999-01-01T00:00:00Z"
+
+
+def test_export_streams_chunks_and_publishes_manifest(monkeypatch):
+    import gzip
+    import hashlib
+
+    records = [
+        {"id": "s1", "seq": i, "temperature": i, "humidity": 1, "timestamp": f"t{i}", "payload": "x" * 100}
+        for i in range(2000)
+    ]
+    monkeypatch.setattr(hlf_client, "iter_sensor_data", lambda *a: iter(records))
+    monkeypatch.setattr(apps, "EXPORT_CHUNK_BYTES", 4096)
+    hlf_client.clear_export_digests()
+
+    chunks = list(apps.iter_csv())
+    assert len(chunks) > 1
+    data, digest = apps.build_csv()
+    assert data == b"".join(chunks)
+
+    tc = apps.app.test_client()
+    resp = tc.get("/export?gzip=1")
+    assert gzip.decompress(resp.data) == data
+    manifest = tc.get(f"/export/{resp.headers['X-Export-Id']}/manifest").get_json()
+    assert manifest["complete"] and manifest["sha256"] == digest
+    assert hashlib.sha256(data).hexdigest() == digest
+
+    # The finished export primed the digest cache used by /verify-data.
+    assert tc.get("/export").headers["X-Data-Hash"] == digest
+    monkeypatch.setattr(apps, "iter_csv", None)
+    resp = tc.post(
+        "/verify-data",
+        data={"file": (io.BytesIO(gzip.compress(data)), "sensor_data.csv.gz")},
+    )
+    assert resp.get_json() == {"verified": True}
+
+
+def test_dashboard_snapshot_etag_and_deltas(monkeypatch):
+    state = {"version": 1, "readings": {}, "events": []}
+    monkeypatch.setattr(hlf_client, "data_version", lambda: state["version"])
+    monkeypatch.setattr(apps, "list_devices", lambda: ["n1_temp", "n2_temp"])
+    monkeypatch.setattr(apps, "get_latest_readings", lambda: dict(state["readings"]))
+    monkeypatch.setattr(apps, "get_block_events", lambda: list(state["events"]))
+    state["readings"] = {
+        "n1_temp": {"temperature": 20, "humidity": 40, "timestamp": "t1", "payload": "x"},
+        "n2_temp": {"temperature": 21, "humidity": 41, "timestamp": "t1", "payload": "x"},
+    }
+    state["events"] = [{"id": 1, "time": "t1", "message": "Creating block"}]
+
+    tc = apps.app.test_client()
+    first = tc.get("/dashboard-snapshot")
+    snap = first.get_json()
+    assert snap["full"] and [n["id"] for n in snap["nodes"]] == ["n1", "n2"]
+    assert snap["readings"]["n1_temp"] == {"temperature": 20, "humidity": 40, "timestamp": "t1"}
+    etag = first.headers["ETag"]
+    assert tc.get("/dashboard-snapshot", headers={"If-None-Match": etag}).status_code == 304
+
+    state["version"] += 1
+    state["readings"]["n2_temp"] = {"temperature": 22, "humidity": 41, "timestamp": "t2"}
+    state["events"].append({"id": 2, "time": "t2", "message": "Block 1 committed"})
+    resp = tc.get(f"/dashboard-snapshot?since={snap['version']}", headers={"If-None-Match": etag})
+    delta = resp.get_json()
+    assert resp.status_code == 200 and resp.headers["ETag"] != etag
+    assert not delta["full"] and delta["nodes"] is None
+    assert list(delta["readings"]) == ["n2_temp"]
+    assert [e["id"] for e in delta["events"]] == [2]
+
+
+def test_pages_are_compiled_once_and_served_compressed(monkeypatch, tmp_path):
+    import gzip
+    import os
+
+    page = tmp_path / "block_explorer.html"
+    page.write_text("<html>v1</html>")
+    monkeypatch.setattr(apps, "PAGE_DIR", tmp_path)
+    monkeypatch.setattr(apps, "_PAGES", {})
+    compiled = []
+    real_compile = apps._compile_page
+    monkeypatch.setattr(
+        apps, "_compile_page", lambda *a: compiled.append(a) or real_compile(*a)
+    )
+
+    tc = apps.app.test_client()
+    resp = tc.get("/explorer", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(resp.data) == b"<html>v1</html>"
+    assert "max-age" in resp.headers["Cache-Control"]
+    etag = resp.headers["ETag"]
+    again = tc.get("/explorer", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert again.status_code == 304
+    assert tc.get("/explorer").data == b"<html>v1</html>"
+    assert len(compiled) == 1
+
+    page.write_text("<html>v2</html>")
+    stat = page.stat()
+    os.utime(page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    resp = tc.get("/explorer", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.data == b"<html>v2</html>"
+    assert len(compiled) == 2
+
+
+def test_access_log_ring_and_route_latency(monkeypatch):
+    monkeypatch.setattr(apps, "ACCESS_LOG", apps.deque(maxlen=3))
+    tc = apps.app.test_client()
+    for _ in range(3):
+        tc.get("/access-log")
+    tc.get("/no-such-page")
+    entries = tc.get("/access-data").get_json()
+    assert len(entries) == 3
+    assert [(e["path"], e["status"]) for e in entries] == [
+        ("/access-log", 200),
+        ("/access-log", 200),
+        ("/no-such-page", 404),
+    ]
+    assert entries[0]["method"] == "GET" and entries[0]["duration_ms"] >= 0
+
+    sample = apps.REGISTRY.get_sample_value
+    assert sample("gateway_request_seconds_count", {"route": "/access-log", "status": "200"}) >= 3
+    assert sample("gateway_request_seconds_count", {"route": "<unmatched>", "status": "404"}) >= 1
+
+
+def test_async_sensor_ingest_returns_receipt_and_sheds_load(monkeypatch):
+    import queue
+
+    stored = []
+    monkeypatch.setattr(apps, "list_devices", lambda: ["s1"])
+    monkeypatch.setattr(apps, "record_sensor_data", lambda *args: stored.append(args[:2]))
+    tc = apps.app.test_client()
+
+    body = json.dumps({"id": "s1", "seq": 7, "temperature": 20}).encode()
+    resp = tc.post("/sensor", data=body, headers={"Prefer": "respond-async"})
+    assert resp.status_code == 202
+    receipt = resp.get_json()["receipt"]
+    assert resp.headers["Location"] == f"/sensor/receipts/{receipt}"
+    apps.ACCEPT_QUEUE.join()
+    assert stored == [("s1", 7)]
+    assert tc.get(resp.headers["Location"]).get_json()["status"] == "queued"
+    assert tc.get("/sensor/receipts/unknown").status_code == 404
+
+    full = queue.Queue(maxsize=1)
+    full.put_nowait(None)
+    monkeypatch.setattr(apps, "ACCEPT_QUEUE", full)
+    monkeypatch.setattr(apps, "_ensure_accept_worker", lambda: None)
+    resp = tc.post("/sensor", data=body, headers={"Prefer": "respond-async"})
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == str(apps.ACCEPT_RETRY_AFTER)
+
+
+def test_system_checks_run_concurrently_and_are_cached(monkeypatch):
+    calls = []
+
+    def container_running(name):
+        calls.append(name)
+        time.sleep(0.1)
+        return True
+
+    monkeypatch.setattr(apps, "_can_run", lambda args: True)
+    monkeypatch.setattr(apps, "compose_cmd", lambda: ["docker", "compose"])
+    monkeypatch.setattr(apps, "_container_running", container_running)
+    monkeypatch.setattr(apps, "_ledger_height", lambda peer: 5)
+    monkeypatch.setattr(apps, "_chaincode_committed", lambda name: True)
+    monkeypatch.setattr(apps, "ensure_admin_enrollment", lambda net_dir: None)
+    monkeypatch.setattr(apps, "fetch_channel_block", lambda *a: None)
+    monkeypatch.setattr(
+        apps, "SYSTEM_STATE", {"checks": None, "started": False, "error": None, "checked_at": 0.0}
+    )
+    tc = apps.app.test_client()
+
+    start = time.time()
+    first = tc.post("/start-blockchain").get_json()
+    assert time.time() - start < 0.5  # seven container probes in parallel
+    assert len(calls) == len(apps._CONTAINERS)
+    assert first["checks"] and first["checked_at"] > 0
+
+    assert tc.post("/start-blockchain").get_json()["checked_at"] == first["checked_at"]
+    health = tc.get("/health").get_json()
+    assert health["blockchain"]["checked_at"] == first["checked_at"]
+    assert len(calls) == len(apps._CONTAINERS)
+
+    tc.post("/start-blockchain?refresh=1")
+    assert len(calls) == 2 * len(apps._CONTAINERS)
+
+
+def test_export_survives_manifest_eviction(monkeypatch):
+    records = [{"id": "s1", "seq": 1, "temperature": 1, "timestamp": "t1", "payload": "x"}]
+    monkeypatch.setattr(hlf_client, "iter_sensor_data", lambda *a: iter(records))
+    monkeypatch.setattr(apps, "MAX_EXPORT_MANIFESTS", 0)
+
+    resp = apps.app.test_client().get("/export")
+    assert resp.status_code == 200 and b"s1" in resp.data
+    assert apps.EXPORT_MANIFESTS == {}
+
+
+def test_sync_sensor_rejects_duplicate_sequence(monkeypatch):
+    monkeypatch.setattr(apps, "list_devices", lambda: ["dup_seq"])
+    tc = apps.app.test_client()
+    sample = apps.REGISTRY.get_sample_value
+    before = sample("gateway_requests_total", {"result": "duplicate"}) or 0
+    start = hlf_client.last_commit_id()
+    body = json.dumps({"id": "dup_seq", "seq": 1, "temperature": 20}).encode()
+
+    assert tc.post("/sensor", data=body).status_code == 200
+    assert hlf_client.wait_for_commits(start, timeout=5, device="dup_seq", seq=1)
+    resp = tc.post("/sensor", data=body)
+    assert resp.status_code == 400 and b"duplicate sequence number" in resp.data
+    assert sample("gateway_requests_total", {"result": "duplicate"}) == before + 1
+
+    older = json.dumps({"id": "dup_seq", "seq": 0, "temperature": 20}).encode()
+    assert tc.post("/sensor", data=older).status_code == 400
+
+
+def test_health_triggers_first_check(monkeypatch):
+    started = []
+    monkeypatch.setattr(apps, "start_blockchain_in_background", lambda: started.append(1))
+    monkeypatch.setattr(
+        apps, "SYSTEM_STATE", {"checks": None, "started": False, "error": None, "checked_at": 0.0}
+    )
+    assert apps.app.test_client().get("/health").status_code == 200
+    assert started == [1]
+
+
+def test_startup_enrolls_concurrently_and_deploys_serially(monkeypatch):
+    active = []
+    overlapped = []
+
+    def slow(result):
+        def run(*args, **kwargs):
+            active.append(args)
+            overlapped.append(len(active) > 1)
+            time.sleep(0.2)
+            active.remove(args)
+            return result
+        return run
+
+    monkeypatch.setattr(apps, "_can_run", lambda args: True)
+    monkeypatch.setattr(apps, "compose_cmd", lambda: ["docker", "compose"])
+    monkeypatch.setattr(apps, "_container_running", lambda name: True)
+    monkeypatch.setattr(apps, "_ledger_height", lambda peer: 5)
+    monkeypatch.setattr(apps, "_chaincode_committed", lambda name: False)
+    monkeypatch.setattr(apps, "enroll_identity", slow(None))
+    monkeypatch.setattr(apps, "_deploy_chaincode", slow(True))
+    monkeypatch.setattr(apps, "fetch_channel_block", lambda *a: None)
+
+    checks, _ = apps.run_system_checks()
+    # The two enrollments overlap; the two deploys do not.
+    assert overlapped == [False, True, False, False]
+    ok = {c["check"]: c["ok"] for c in checks}
+    assert ok["Chaincode sensor committed"] and ok["Chaincode agri committed"]
@@ -76,6 +76,11 @@ def make_packet(seq, urgent=False, window_id="0-1"):
     return body
 
 
+def make_bundle(seq, window_id):
+    reading = apps._orch.NormalizedReading("leaf01", seq, window_id, {"temp": 1.0}, 0.0, ["temp"])
+    return apps._orch.IntervalBundle(window_id, [reading], 0.0, 1.0)
+
+
 def test_duplicate_rejection(tmp_path):
     cfg, client, bundler, ingress, store = setup_services(tmp_path)
     for i in range(5):
@@ -122,3 +127,262 @@ def test_health_endpoints(tmp_path):
     client.last_commit_time = time.time()
     assert tc.get("/readyz").status_code == 200
     assert tc.get("/metrics").status_code == 200
+
+
+def test_dedup_window_is_bounded_and_reports_stale(tmp_path):
+    cfg, client, bundler, ingress, store = setup_services(tmp_path)
+    bundler.settings.dedup_window = 8
+    sample = apps._orch.REGISTRY.get_sample_value
+    late_before = sample("late_arrivals_total") or 0
+    evicted_before = sample("dedup_window_evictions_total") or 0
+
+    assert [ingress.ingest(make_packet(s)) for s in (0, 2, 1, 2)] == ["new", "new", "late", "duplicate"]
+    assert ingress.ingest(make_packet(20)) == "new"
+    assert ingress.ingest(make_packet(5)) == "stale"
+    assert ingress.ingest(make_packet(13)) == "late"
+
+    window = bundler.seq_windows["leaf01"]
+    assert window.high == 20 and window.bits < 1 << 8
+    assert sample("late_arrivals_total") - late_before == 2
+    assert sample("dedup_window_evictions_total") - evicted_before == 3
+    assert sum(len(v) for v in bundler.readings.values()) == 5
+
+
+def test_store_replays_after_restart_and_expires_old_bundles(tmp_path):
+    cfg, client, bundler, ingress, store = setup_services(tmp_path, connected=False)
+    for i in range(3):
+        ingress.ingest(make_packet(i, window_id=f"{i}-{i + 1}"))
+    for b in bundler.pop_closed_windows():
+        bundler.submit_bundle(b)
+    assert len(store.queue) == 3
+
+    # A fresh instance on the same directory recovers the backlog.
+    restarted = StoreAndForward(cfg)
+    assert len(restarted.queue) == 3
+    sample = apps._orch.REGISTRY.get_sample_value
+    assert sample("store_backlog_files") == 3
+
+    # Age the first bundle past store_max_age_hours.
+    records = restarted.queue
+    restarted.log.commit(next(restarted.log.pending()))
+    records[0]["stored_at"] -= cfg.store_max_age_hours * 3600 + 1
+    restarted.log.append(records[0])
+
+    calls = []
+    client.connected = True
+    real_submit = client.submit_reading_bundle
+
+    def flaky(bundle):
+        calls.append(bundle.window_id)
+        if bundle.window_id == "1-2" and calls.count("1-2") == 1:
+            raise RuntimeError("timeout")
+        real_submit(bundle)
+
+    client.submit_reading_bundle = flaky
+    expired_before = sample("store_expired_total") or 0
+    restarted.flush(client)
+    assert sample("store_expired_total") - expired_before == 1
+    assert [r["bundle"]["window_id"] for r in restarted.queue] == ["1-2"]
+
+    restarted.flush(client)
+    assert sorted(calls) == ["1-2", "1-2", "2-3"]
+    assert not restarted.queue and sample("store_backlog_files") == 0
+    assert not list((tmp_path / "bundles").glob("*.seg"))
+
+
+def test_store_flush_keeps_failed_bundle_ahead_of_its_window(tmp_path):
+    cfg, client, bundler, ingress, store = setup_services(tmp_path)
+    for seq, window in [(1, "0-1"), (2, "0-1"), (3, "1-2")]:
+        store.persist(make_bundle(seq, window))
+    assert store.depth == 3
+
+    calls = []
+    real_submit = client.submit_reading_bundle
+
+    def flaky(bundle):
+        calls.append(bundle.readings[0].seq)
+        if calls.count(1) == 1 and bundle.readings[0].seq == 1:
+            raise RuntimeError("timeout")
+        real_submit(bundle)
+
+    client.submit_reading_bundle = flaky
+    store.flush(client)
+    # The failure holds back the rest of its window; the other window went out.
+    assert sorted(calls) == [1, 3]
+    assert [r["bundle"]["readings"][0]["seq"] for r in store.queue] == [1, 2]
+    assert store.depth == 2 and store.log.depth == 3
+
+    store.flush(client)
+    assert calls[2:] == [1, 2]
+    assert store.depth == 0 and store.log.depth == 0
+
+
+def test_config_loads_tuning_knobs(tmp_path, monkeypatch):
+    cfg_path = tmp_path / "gateway.json"
+    knobs = {key: "x" for key in apps._orch.REQUIRED_KNOBS}
+    knobs.update(
+        UPLINK_PERIOD_MIN=15,
+        EVENT_COALESCE_SEC=30,
+        EVENT_RATE_LIMIT_PER_PI=60,
+        MESH_CHECK_INTERVAL_SEC=30,
+        STORE_MAX_AGE_HOURS=24,
+        STORE_SEGMENT_BYTES=4096,
+        STORE_RETRY_SEC=0.5,
+    )
+    cfg_path.write_text(json.dumps(knobs))
+    for key in apps._orch.REQUIRED_KNOBS + apps._orch.OPTIONAL_KNOBS:
+        monkeypatch.delenv(key, raising=False)
+    monkeypatch.setenv("FABRIC_MAX_INFLIGHT", "7")
+
+    settings = apps._orch.ConfigService(["--config", str(cfg_path)]).load()
+    assert settings.store_segment_bytes == 4096
+    assert settings.store_retry_sec == 0.5
+    assert settings.fabric_max_inflight == 7
+    assert settings.dedup_window == Settings.dedup_window
+
+
+def test_store_migrates_legacy_bundle_files(tmp_path):
+    (tmp_path / "bundle_1.json").write_text(
+        json.dumps({"window_id": "0-1", "readings": [], "started_at": 0, "closes_at": 1})
+    )
+    cfg, client, bundler, ingress, store = setup_services(tmp_path)
+    assert not list(tmp_path.glob("bundle_*.json"))
+    store.flush(client)
+    assert [s["bundle"].window_id for s in client.submits] == ["0-1"]
+
+
+def test_scheduler_sleeps_until_next_window_deadline(tmp_path):
+    cfg, client, bundler, ingress, store = setup_services(tmp_path)
+    scheduler = apps.Scheduler(cfg, bundler)
+    now = int(time.time())
+    for i in range(10000):
+        ingress.ingest(make_packet(i, window_id=f"{now - 10}-{now + 100 + i}"))
+    ingress.ingest(make_packet(10000, window_id=f"{now - 10}-{now - 1}"))
+    assert bundler.wakeup.is_set()
+
+    wait = scheduler.tick()
+    expected = now + 100 - time.time()
+    assert client.drain(timeout=5)
+    assert [s["bundle"].window_id for s in client.submits] == [f"{now - 10}-{now - 1}"]
+    assert not bundler.wakeup.is_set()
+    assert expected <= wait <= expected + 1
+
+    closed = bundler.pop_closed_windows(now + 105)
+    assert [b.closes_at for b in closed] == [now + 100 + i for i in range(6)]
+    assert len(bundler.readings) == 10000 - 6
+
+
+def test_pipelined_submit_bounds_inflight_and_keeps_window_order(tmp_path):
+    cfg, client, bundler, ingress, store = setup_services(tmp_path)
+    cfg.fabric_max_inflight = 3
+    client = FabricClient(cfg)
+    client.commit_delay = 0.02
+    bundles = [make_bundle(i, f"w{i % 2}") for i in range(8)]
+    start = time.time()
+    futures = [client.submit_async(b) for b in bundles]
+    assert client.drain(timeout=5)
+    elapsed = time.time() - start
+
+    assert all(f.done() and f.exception() is None for f in futures)
+    # Two windows run side by side, each in queue order.
+    for window in ("w0", "w1"):
+        order = [s["bundle"].readings[0].seq for s in client.submits if s["bundle"].window_id == window]
+        assert order == [b.readings[0].seq for b in bundles if b.window_id == window]
+    assert elapsed < 8 * 0.03
+    phases = {
+        phase: apps._orch.REGISTRY.get_sample_value(
+            "submit_commit_seconds_count", {"phase": phase}
+        )
+        for phase in ("queue", "submit", "commit")
+    }
+    assert all(count and count >= 8 for count in phases.values())
+
+
+def test_failed_async_submit_is_stored(tmp_path):
+    cfg, client, bundler, ingress, store = setup_services(tmp_path, connected=False)
+    future = bundler.submit_bundle_async(make_bundle(1, "0-1"))
+    assert isinstance(future.exception(timeout=5), RuntimeError)
+    deadline = time.time() + 5
+    while not store.queue and time.time() < deadline:
+        time.sleep(0.01)
+    assert [r["bundle"]["window_id"] for r in store.queue] == ["0-1"]
+
+
+def test_failed_async_submit_holds_back_its_window(tmp_path):
+    cfg, client, bundler, ingress, store = setup_services(tmp_path)
+    real_submit = client._submit
+
+    def flaky(bundle, btype):
+        if bundle.readings[0].seq == 1:
+            time.sleep(0.05)
+            raise RuntimeError("timeout")
+        real_submit(bundle, btype)
+
+    client._submit = flaky
+    futures = [
+        bundler.submit_bundle_async(make_bundle(seq, window))
+        for seq, window in [(1, "0-1"), (2, "0-1"), (3, "1-2")]
+    ]
+    assert client.drain(timeout=5)
+    assert [f.exception() is None for f in futures] == [False, False, True]
+    assert [s["bundle"].window_id for s in client.submits] == ["1-2"]
+    assert [r["bundle"]["readings"][0]["seq"] for r in store.queue] == [1, 2]
+
+
+def test_scheduler_retries_bundle_stored_after_idle_tick(tmp_path):
+    cfg, client, bundler, ingress, store = setup_services(tmp_path, connected=False)
+    cfg.store_retry_sec = 0.05
+    scheduler = apps.Scheduler(cfg, bundler)
+    assert scheduler.tick() is None  # nothing due: the loop would sleep unbounded
+    scheduler.start()
+    try:
+        future = bundler.submit_bundle_async(make_bundle(1, "0-1"))
+        assert isinstance(future.exception(timeout=5), RuntimeError)
+        client.connected = True
+        deadline = time.time() + 5
+        while store.depth and time.time() < deadline:
+            time.sleep(0.01)
+        assert store.depth == 0
+        assert [s["bundle"].window_id for s in client.submits] == ["0-1"]
+    finally:
+        scheduler.stop()
+        scheduler.join(timeout=5)
+
+
+def test_scheduler_stop_drains_client(tmp_path):
+    cfg, client, bundler, ingress, store = setup_services(tmp_path)
+    client.commit_delay = 0.2
+    scheduler = apps.Scheduler(cfg, bundler)
+    scheduler.start()
+    future = bundler.submit_bundle_async(make_bundle(1, "0-1"))
+    scheduler.stop()
+    assert not scheduler.is_alive()
+    assert future.done() and future.exception() is None
+    assert client._pool is None
+
+
+def test_ingest_batch_reports_per_packet_results(tmp_path):
+    cfg, client, bundler, ingress, store = setup_services(tmp_path)
+    ingress.parallel_threshold = 8
+    packets = [make_packet(i) for i in range(20)]
+    packets[3]["sig"] = "0" * 64
+    packets[5] = dict(packets[4])
+    packets[7] = dict(packets[7], device_id="ghost")
+    del packets[9]["seq"]
+
+    results = ingress.ingest_batch(packets)
+    statuses = [r["status"] for r in results]
+    assert statuses[:3] == ["new"] * 3
+    assert results[3] == {"device_id": "leaf01", "seq": 3, "status": "rejected", "error": "bad signature"}
+    assert statuses[5] == "duplicate"
+    assert results[7]["error"] == "unknown device"
+    assert results[9]["error"] == "malformed packet"
+    assert statuses.count("new") == 16
+    assert sum(len(v) for v in bundler.readings.values()) == 16
+
+    # The primed per-device HMAC gives the same digest as a fresh one.
+    with pytest.raises(ValueError, match="bad signature"):
+        ingress.ingest(packets[3])
+    with pytest.raises(ValueError, match="unknown device"):
+        ingress.ingest(packets[7])
+    assert ingress.ingest(make_packet(99)) == "new"
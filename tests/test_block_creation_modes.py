@@ -3,6 +3,7 @@ import flask_app.hlf_client as hlf
 
 def test_scheduled_and_event_blocks(monkeypatch):
     hlf.CURRENT_BLOCK = 0
+    hlf.BLOCK_STORE.clear()
     hlf.BLOCK_EVENTS.clear()
     hlf.SENSOR_DATA.clear()
     hlf.LAST_SEQ.clear()
@@ -23,3 +24,49 @@ def test_scheduled_and_event_blocks(monkeypatch):
     assert messages[0].startswith("Creating scheduled block 1")
     assert messages[1].startswith("Creating scheduled block 2")
     assert messages[2].startswith("Creating event block 3")
+
+    block = hlf.get_block(3)
+    assert block["header"]["mode"] == "event"
+    assert [tx["seq"] for tx in block["data"]] == [4]
+    assert hlf.query_blockchain_info() == {"height": 3, "current_hash": block["hash"]}
+
+
+def test_blocks_are_chained_and_indexed(tmp_path):
+    store = hlf.BlockStore(tmp_path)
+    first = store.append([{"id": "a", "seq": 1}], mode="scheduled")
+    second = store.append([{"id": "a", "seq": 2}, {"id": "b", "seq": 1}], mode="event")
+    assert second["previous_hash"] == store.get(1)["hash"]
+    assert first["previous_hash"] == "0x0"
+
+    # A torn write after the last block is dropped when the store reopens.
+    with (tmp_path / "blocks.dat").open("ab") as fh:
+        fh.write(b"\x10\x00\x00\x00garbage")
+    reopened = hlf.BlockStore(tmp_path)
+    assert reopened.height == 2
+    assert reopened.current_hash == store.current_hash
+    assert reopened.get(2)["data"][1] == {"id": "b", "seq": 1}
+    assert reopened.get(3) is None
+    assert reopened.verify() is None
+    third = reopened.append([])
+    assert third["number"] == 3
+
+
+def test_merkle_proofs_verify_against_block_root(tmp_path, monkeypatch):
+    from flask_app.block_store import verify_proof
+
+    store = hlf.BlockStore(tmp_path, tree_cache_size=1)
+    txs = [{"id": "m", "seq": i} for i in range(5)]
+    header = store.append(txs)
+    assert store.merkle_tree(1) is store.merkle_tree(1)
+    monkeypatch.setattr(hlf, "BLOCK_STORE", store)
+
+    for index in range(len(txs)):
+        proof = hlf.get_merkle_proof(1, index)
+        assert proof["root"] == header["merkle_root"]
+        pairs = [(p["hash"], p["position"]) for p in proof["proof"]]
+        assert len(pairs) == 3
+        assert verify_proof(proof["leaf"], pairs, header["merkle_root"])
+    assert not verify_proof(hlf.get_merkle_proof(1, 0)["leaf"], pairs, header["merkle_root"])
+    assert hlf.get_merkle_proof(1, 5) is None
+    assert hlf.get_merkle_tree(1)["root"] == header["merkle_root"]
+    assert hlf.get_merkle_tree(2) is None
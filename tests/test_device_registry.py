@@ -0,0 +1,58 @@
+import threading
+
+from flask_app.device_registry import DeviceRegistry, DeviceSet, scan_ids, sorted_ids
+
+
+def test_registry_keeps_order_and_sorted_view():
+    registry = DeviceRegistry()
+    for device_id in ["n2_temp", "n1_soil", "n1_temp", "n2_temp", "n10_ph"]:
+        registry.register(device_id)
+
+    devices = registry.devices
+    assert list(devices) == ["n2_temp", "n1_soil", "n1_temp", "n10_ph"]
+    assert devices.sorted() == ["n10_ph", "n1_soil", "n1_temp", "n2_temp"]
+    assert "n1_temp" in devices and "n3" not in devices
+    assert list(registry.active) == list(devices)
+    assert list(devices.scan(prefix="n1_")) == ["n1_soil", "n1_temp"]
+    assert list(devices.scan(after="n1_soil", prefix="n1_")) == ["n1_temp"]
+    assert list(devices.scan(after="n1_temp")) == ["n2_temp"]
+
+    assert registry.quarantine("n1_soil") and not registry.quarantine("n1_soil")
+    assert "n1_soil" in registry.quarantined
+    assert registry.release("n1_soil") and not registry.release("n1_soil")
+    assert list(registry.quarantined) == [] and registry.quarantined.sorted() == []
+
+
+def test_concurrent_registration_is_deduplicated():
+    registry = DeviceRegistry()
+    ids = [f"dev{i % 50}" for i in range(1000)]
+
+    def worker(chunk):
+        for device_id in chunk:
+            registry.register(device_id)
+
+    threads = [threading.Thread(target=worker, args=(ids[i::4],)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(registry.devices) == 50
+    assert registry.devices.sorted() == sorted(set(ids))
+
+
+def test_scan_survives_registration_and_accepts_plain_iterables():
+    devices = DeviceSet()
+    devices.extend(f"d{i:03d}" for i in range(0, 20, 2))
+    seen = []
+    for device_id in devices.scan(chunk=3):
+        seen.append(device_id)
+        if device_id == "d004":
+            devices.add("d001")  # lands before the cursor
+            devices.add("d005")  # lands after it
+    assert seen == ["d000", "d002", "d004", "d005"] + [f"d{i:03d}" for i in range(6, 20, 2)]
+
+    plain = ["b", "a2", "a1"]
+    assert sorted_ids(plain) == ["a1", "a2", "b"]
+    assert list(scan_ids(plain, "a1", "a")) == ["a2"]
+    assert list(scan_ids(set(plain), prefix="b")) == ["b"]
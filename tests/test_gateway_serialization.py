@@ -63,3 +63,101 @@ def test_parallel_across_devices(monkeypatch, tmp_path):
     duration = time.time() - start
 
     assert duration < 0.2
+
+
+def test_devices_share_bounded_shard_pool(monkeypatch, tmp_path):
+    monkeypatch.setattr(hlf, "BACKLOG_DIR", tmp_path)
+    monkeypatch.setattr(hlf, "_schedule_retry", lambda device_id: None)
+    monkeypatch.setattr(hlf, "_record_sensor_data_direct", lambda *args: None)
+
+    for i in range(50):
+        hlf.record_sensor_data(f"pool{i}", 1, 0, 0, 0, 0, 0, 0, "t", {})
+    for q in hlf.SHARD_QUEUES:
+        q.join()
+
+    assert len(hlf.SHARD_QUEUES) == hlf.WORKER_SHARDS
+    assert sum(t is not None for t in hlf.SHARD_THREADS) <= hlf.WORKER_SHARDS
+    assert hlf.get_shard_depths() == [0] * hlf.WORKER_SHARDS
+    assert hlf.DEVICE_QUEUES["pool7"] is hlf.SHARD_QUEUES[hlf._shard_for("pool7")]
+
+
+def test_full_shard_applies_backpressure(monkeypatch):
+    import queue
+
+    blocked = queue.Queue(maxsize=1)
+    blocked.put(("busy",))
+    monkeypatch.setattr(hlf, "_shard_queue", lambda device_id: blocked)
+    monkeypatch.setattr(hlf, "ENQUEUE_TIMEOUT", 0.01)
+
+    try:
+        hlf.record_sensor_data("dev", 1, 0, 0, 0, 0, 0, 0, "t", {})
+    except queue.Full:
+        pass
+    else:  # pragma: no cover - failure path
+        raise AssertionError("expected queue.Full")
+
+
+def test_batch_enqueues_per_device_in_order(monkeypatch, tmp_path):
+    monkeypatch.setattr(hlf, "BACKLOG_DIR", tmp_path)
+    monkeypatch.setattr(hlf, "_schedule_retry", lambda device_id: None)
+    processed = []
+    monkeypatch.setattr(
+        hlf, "_record_sensor_data_direct", lambda *args: processed.append(args[:2])
+    )
+    hlf.LAST_SEQ["bx"] = 3
+
+    records = [
+        ("bx", 4, 0, 0, 0, 0, 0, 0, "t", {}),
+        ("by", 1, 0, 0, 0, 0, 0, 0, "t", {}),
+        ("bx", 4, 0, 0, 0, 0, 0, 0, "t", {}),
+        ("bx", 2, 0, 0, 0, 0, 0, 0, "t", {}),
+        ("bx", 5, 0, 0, 0, 0, 0, 0, "t", {}),
+    ]
+    results = hlf.record_sensor_data_batch(records)
+    for q in hlf.SHARD_QUEUES:
+        q.join()
+
+    assert [r["status"] for r in results] == [
+        "queued", "queued", "duplicate", "out_of_order", "queued"
+    ]
+    assert [p for p in processed if p[0] == "bx"] == [("bx", 4), ("bx", 5)]
+    assert ("by", 1) in processed
+
+
+def test_stage_metrics_and_enqueue_to_commit_latency(monkeypatch, tmp_path):
+    monkeypatch.setattr(hlf, "BACKLOG_DIR", tmp_path)
+    hlf.record_sensor_data("lat1", 1, 20, 40, 50, 7.0, 200, 50, "t", {"tx_id": "tx-lat"})
+    hlf.DEVICE_QUEUES["lat1"].join()
+
+    events = hlf.wait_for_commits(0, timeout=0, device="lat1")
+    assert events[-1]["tx_id"] == "tx-lat"
+    assert events[-1]["latency_seconds"] >= 0
+
+    registry = hlf.METRICS_REGISTRY
+    for stage in ("duplicate_check", "encrypt", "block_policy"):
+        assert registry.get_sample_value("hlf_stage_seconds_count", {"stage": stage}) >= 1
+    assert registry.get_sample_value("hlf_enqueue_commit_seconds_count") >= 1
+    shard = str(hlf._shard_for("lat1"))
+    assert registry.get_sample_value("hlf_queue_wait_seconds_count", {"shard": shard}) >= 1
+    hlf.update_queue_metrics()
+    assert registry.get_sample_value("hlf_device_queue_depth", {"device": "lat1"}) == 0
+
+
+def test_rejected_reading_does_not_block_the_rest_of_a_chunk(monkeypatch, tmp_path):
+    monkeypatch.setattr(hlf, "BACKLOG_DIR", tmp_path)
+    monkeypatch.setattr(hlf, "_schedule_retry", lambda device_id: None)
+    processed = []
+
+    def fake_send(*args):
+        if args[1] == 2:
+            raise ValueError("duplicate sequence number")
+        processed.append(args[1])
+
+    monkeypatch.setattr(hlf, "_record_sensor_data_direct", fake_send)
+    sample = hlf.METRICS_REGISTRY.get_sample_value
+    rejected = sample("hlf_rejected_readings_total")
+    hlf._process_chunk([("rj", seq, 0, 0, 0, 0, 0, 0, "t", {}) for seq in (1, 2, 3)])
+
+    assert processed == [1, 3]
+    assert hlf.get_backlog_stats() == {}
+    assert sample("hlf_rejected_readings_total") == rejected + 1
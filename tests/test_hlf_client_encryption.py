@@ -1,8 +1,11 @@
+import base64
+import os
 import sys
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+import flask_app.hlf_client as hlf
 from flask_app.hlf_client import encrypt_payload, decrypt_payload
 
 
@@ -15,3 +18,28 @@ def test_encrypt_decrypt_large_payload():
     enc = encrypt_payload(payload)
     dec = decrypt_payload(enc)
     assert dec == payload
+
+
+def test_envelope_mode_has_no_size_ceiling():
+    payload = {"filename": "img.bin", "data": base64.b64encode(os.urandom(4096)).decode()}
+    enc = hlf.encrypt_payload(payload)
+    assert enc.startswith(hlf.ENVELOPE_PREFIX)
+    assert hlf.decrypt_payload(enc) == payload
+
+
+def test_legacy_rsa_ciphertexts_remain_readable(monkeypatch):
+    monkeypatch.setattr(hlf, "ENCRYPTION_MODE", "rsa")
+    legacy = hlf.encrypt_payload({"id": "sensor", "temperature": 21})
+    assert not legacy.startswith(hlf.ENVELOPE_PREFIX)
+    monkeypatch.setattr(hlf, "ENCRYPTION_MODE", "envelope")
+    assert hlf.decrypt_payload(legacy) == {"id": "sensor", "temperature": 21}
+
+
+def test_rotated_keys_still_decrypt_older_envelopes():
+    old = hlf.encrypt_payload({"epoch": 1})
+    hlf.rotate_data_key()
+    new = hlf.encrypt_payload({"epoch": 2})
+    # Drop the unwrapped key cache to force an RSA unwrap of the old key.
+    hlf._DATA_KEY_CACHE.clear()
+    assert hlf.decrypt_payload(old) == {"epoch": 1}
+    assert hlf.decrypt_payload(new) == {"epoch": 2}
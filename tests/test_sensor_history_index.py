@@ -0,0 +1,67 @@
+import importlib.util
+from pathlib import Path
+
+
+spec = importlib.util.spec_from_file_location("hlf_client", Path("flask_app/hlf_client.py"))
+hlf = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(hlf)
+
+
+def _record(dev, seq, ts):
+    hlf._record_sensor_data_direct(dev, seq, 20, 40, 50, 7.0, 200, 50, ts, "cid")
+
+
+def test_history_sorted_and_range_queries():
+    hlf.DEVICES.extend(["h1", "h2"])
+    _record("h1", 1, "2024-05-01T10:00:00Z")
+    _record("h1", 2, "2024-05-03T10:00:00Z")
+    # late arrival, e.g. replayed from the backlog
+    _record("h1", 3, "2024-05-02T10:00:00Z")
+    _record("h2", 1, "2024-05-02T12:00:00Z")
+
+    assert [r["seq"] for r in hlf.get_sensor_history("h1")] == [1, 3, 2]
+    window = hlf.get_sensor_history("h1", "2024-05-02T00:00:00Z", "2024-05-03T10:00:00Z")
+    assert [r["seq"] for r in window] == [3, 2]
+    assert hlf.get_sensor_history("h1", start="2024-06-01") == []
+
+    merged = hlf.get_all_sensor_data("2024-05-02", None)
+    assert [(r["id"], r["seq"]) for r in merged] == [("h1", 3), ("h2", 1), ("h1", 2)]
+    assert hlf.get_state_on("2024-05-02")["h2"]["seq"] == 1
+
+
+def test_export_digest_cache_invalidated_by_writes_in_range():
+    hlf.clear_export_digests()
+    version = hlf.data_version()
+    assert hlf.put_export_digest("dg1", "2024-01-01T00:00:00Z", "2024-01-31T00:00:00Z", "aa", version)
+    assert hlf.put_export_digest("dg1", "2024-03-01T00:00:00Z", None, "bb", version)
+    assert hlf.get_export_digest("dg1", "2024-01-01T00:00:00Z", "2024-01-31T00:00:00Z") == "aa"
+
+    hlf._record_sensor_data_direct("dg1", 1, 20, 40, 50, 7.0, 200, 50, "2024-01-10T00:00:00Z", {})
+
+    assert hlf.get_export_digest("dg1", "2024-01-01T00:00:00Z", "2024-01-31T00:00:00Z") is None
+    assert hlf.get_export_digest("dg1", "2024-03-01T00:00:00Z") == "bb"
+    # A digest computed before that write must not be cached afterwards.
+    assert not hlf.put_export_digest("dg1", "2024-01-01T00:00:00Z", None, "cc", version)
+    assert hlf.put_export_digest("dg2", None, None, "dd", version)
+
+
+def test_device_summary_and_storage_pages():
+    for seq, ts in enumerate(["2024-06-01T00:00:00Z", "2024-06-03T00:00:00Z"], 1):
+        _record("pg1", seq, ts)
+    _record("pg2", 1, "2024-06-02T00:00:00Z")
+    # A late reading is counted but does not become the latest one.
+    _record("pg1", 3, "2024-05-30T00:00:00Z")
+
+    summary = hlf.get_device_summary("pg1")
+    assert summary == {"count": 3, "last_timestamp": "2024-06-03T00:00:00Z", "last_cid": "cid"}
+
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = hlf.page_sensor_data(sensor_ids=["pg1", "pg2"], limit=2, cursor=cursor)
+        seen.extend((r["id"], r["seq"]) for r in page)
+        if cursor is None:
+            break
+    assert seen == [("pg1", 3), ("pg1", 1), ("pg2", 1), ("pg1", 2)]
+    page, _ = hlf.page_sensor_data(start="2024-06-02T00:00:00Z", sensor_ids=["pg1", "pg2"])
+    assert [(r["id"], r["seq"]) for r in page] == [("pg2", 1), ("pg1", 2)]
@@ -0,0 +1,135 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+
+spec = importlib.util.spec_from_file_location("hlf_client", Path("flask_app/hlf_client.py"))
+hlf = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(hlf)
+
+
+def test_idempotent_resubmission_does_not_reencrypt(monkeypatch):
+    calls = []
+    real_encrypt = hlf.encrypt_payload
+
+    def counting_encrypt(data):
+        calls.append(data)
+        return real_encrypt(data)
+
+    monkeypatch.setattr(hlf, "encrypt_payload", counting_encrypt)
+    payload = {"id": "dup1", "seq": 1, "temperature": 21.5}
+    hlf._record_sensor_data_direct("dup1", 1, 21.5, 40, 50, 7.0, 200, 50, "t1", payload)
+    hlf._record_sensor_data_direct("dup1", 1, 21.5, 40, 50, 7.0, 200, 50, "t1", dict(payload))
+
+    assert len(calls) == 1
+    assert len(hlf.SENSOR_DATA["dup1"]) == 1
+    assert hlf.SENSOR_DATA["dup1"][0]["seq"] == 1
+
+
+def test_conflicting_payload_for_same_seq_is_rejected():
+    hlf._record_sensor_data_direct("dup2", 1, 20, 40, 50, 7.0, 200, 50, "t1", {"v": 1})
+    with pytest.raises(ValueError, match="duplicate"):
+        hlf._record_sensor_data_direct("dup2", 1, 20, 40, 50, 7.0, 200, 50, "t1", {"v": 2})
+    with pytest.raises(ValueError, match="out of order"):
+        hlf._record_sensor_data_direct("dup2", 0, 20, 40, 50, 7.0, 200, 50, "t0", {"v": 0})
+
+
+def test_readings_survive_reopening_the_store(tmp_path):
+    store = hlf.ReadingStore(tmp_path)
+    columns = store.device("dev", create=True)
+    for seq in range(1, 4):
+        columns.append(seq, float(seq), [seq, 0, 0, 0, 0, 0], f"t{seq}", {"s": seq}, bytes(32))
+    # A late reading is kept in timestamp order on read.
+    columns.append(4, 1.5, [4, 0, 0, 0, 0, 0], "t1.5", {"s": 4}, bytes(32))
+    store.sync()
+
+    reopened = hlf.ReadingStore(tmp_path)
+    history = reopened["dev"]
+    assert [r["seq"] for r in history] == [1, 4, 2, 3]
+    assert history[-1]["payload"] == {"s": 3}
+    cols = reopened.device("dev")
+    assert cols.find_seq(4) == 3
+    assert cols.last_seq() == 4
+    lo, hi = cols.bounds(1.5, 3.0)
+    assert list(cols.column("temperature", lo, hi)) == [4.0, 2.0, 3.0]
+
+
+def test_sensor_columns_are_zero_copy_views():
+    for seq, ts in enumerate(["2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z"], 1):
+        hlf._record_sensor_data_direct("cols1", seq, 20 + seq, 40, 50, 7.0, 200, 50, ts, {"n": seq})
+    cols = hlf.get_sensor_columns("cols1", start="2024-01-02T00:00:00Z")
+    assert isinstance(cols["temperature"], memoryview)
+    assert list(cols["temperature"]) == [22.0]
+    assert list(cols["seq"]) == [2]
+
+
+def test_commit_events_wake_waiting_clients():
+    import threading
+
+    start = hlf.last_commit_id()
+    timer = threading.Timer(
+        0.05,
+        hlf._record_sensor_data_direct,
+        ("ev1", 1, 20, 40, 50, 7.0, 200, 50, "t1", {"tx_id": "abc"}),
+    )
+    timer.start()
+    events = hlf.wait_for_commits(start, timeout=2, device="ev1", seq=1)
+    timer.join()
+
+    assert [(e["device"], e["seq"], e["tx_id"]) for e in events] == [("ev1", 1, "abc")]
+    assert events[0]["block"] >= 1
+    assert hlf.wait_for_commits(events[0]["id"], timeout=0, device="ev1") == []
+
+
+def test_evicted_device_handle_is_shared_until_released(tmp_path):
+    store = hlf.ReadingStore(tmp_path, max_open=1)
+    held = store.device("a", create=True)
+    held.append(1, 1.0, [1, 0, 0, 0, 0, 0], "t1", {}, bytes(32))
+    store.device("b", create=True)  # evicts "a" from the cache
+    assert store.device("a") is held
+
+    store.device("b")
+    store.device("a").append(2, 2.0, [2, 0, 0, 0, 0, 0], "t2", {}, bytes(32))
+    held.append(3, 3.0, [3, 0, 0, 0, 0, 0], "t3", {}, bytes(32))
+    assert [r["seq"] for r in store["a"]] == [1, 2, 3]
+
+
+def test_readers_see_consistent_rows_while_the_file_grows(tmp_path):
+    import threading
+
+    store = hlf.ReadingStore(tmp_path)
+    columns = store.device("grow", create=True)
+    errors = []
+
+    def read():
+        try:
+            while columns.rows < 5000:
+                last = columns.last_seq()
+                if last:
+                    assert columns.find_seq(last) == last - 1
+                    assert list(columns.column("seq", 0, len(columns)))[-1] > 0
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for seq in range(1, 5001):
+        columns.append(seq, float(seq), [seq, 0, 0, 0, 0, 0], "t", None, bytes(32))
+    reader.join()
+    assert errors == []
+    assert columns.capacity >= 5000
+
+
+def test_seq_index_is_rebuilt_and_integer_metrics_round_trip(tmp_path):
+    store = hlf.ReadingStore(tmp_path)
+    columns = store.device("ints", create=True)
+    columns.append(5, 1.0, [21.5, 40, 0, 7.0, 300, 50], "t1", {}, bytes(32))
+    columns.append(9, 2.0, [22.0, 41, 0, 7.5, 310, 50], "t2", {}, bytes(32))
+    store.sync()
+
+    reopened = hlf.ReadingStore(tmp_path).device("ints")
+    assert (reopened.find_seq(5), reopened.find_seq(9), reopened.find_seq(7)) == (0, 1, None)
+    record = reopened.record(0)
+    assert record["light"] == 300 and type(record["light"]) is int
+    assert type(record["temperature"]) is float and type(record["ph"]) is float
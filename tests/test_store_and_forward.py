@@ -32,3 +32,93 @@ def test_store_and_forward(monkeypatch, tmp_path):
 
     assert sent == [1]
     assert hlf.get_backlog_stats() == {}
+
+
+def test_backlog_survives_restart_and_compacts(monkeypatch, tmp_path):
+    monkeypatch.setattr(hlf, "BACKLOG_DIR", tmp_path)
+    monkeypatch.setattr(hlf, "_schedule_retry", lambda device_id: None)
+    monkeypatch.setattr(hlf, "BACKLOG_SEGMENT_BYTES", 128)
+
+    for seq in range(1, 6):
+        hlf._store_backlog("dev2", ("dev2", seq, 0, 0, 0, 0, 0, 0, "t", {}))
+    assert hlf.get_backlog_depth() == 5
+    assert len(list((tmp_path / "dev2").glob("*.seg"))) > 1
+
+    # Simulate a restart by dropping the in-memory logs.
+    hlf._BACKLOGS.clear()
+    assert hlf.get_backlog_stats() == {"dev2": 5}
+
+    sent = []
+
+    def flaky(*args):
+        if args[1] == 4:
+            raise RuntimeError("down")
+        sent.append(args[1])
+
+    monkeypatch.setattr(hlf, "_record_sensor_data_direct", flaky)
+    assert hlf._flush_backlog("dev2") is False
+    assert sent == [1, 2, 3]
+    assert hlf.get_backlog_stats() == {"dev2": 2}
+
+    monkeypatch.setattr(hlf, "_record_sensor_data_direct", lambda *args: sent.append(args[1]))
+    assert hlf._flush_backlog("dev2") is True
+    assert sent == [1, 2, 3, 4, 5]
+    assert hlf.get_backlog_depth() == 0
+    assert not list((tmp_path / "dev2").glob("*.seg"))
+
+
+def test_legacy_jsonl_backlog_is_migrated(monkeypatch, tmp_path):
+    import json
+    import time
+
+    (tmp_path / "old.jsonl").write_text(
+        json.dumps({"time": time.time(), "args": ["old", 1, 0, 0, 0, 0, 0, 0, "t", {}]}) + "\n"
+    )
+    monkeypatch.setattr(hlf, "BACKLOG_DIR", tmp_path)
+    assert hlf.get_backlog_stats() == {"old": 1}
+    assert not (tmp_path / "old.jsonl").exists()
+
+
+def test_backlog_paths_are_escaped(monkeypatch, tmp_path):
+    root = tmp_path / "backlog"
+    monkeypatch.setattr(hlf, "BACKLOG_DIR", root)
+    for device_id in ("../evil", "a/b", ".."):
+        hlf._store_backlog(device_id, (device_id, 1, 0, 0, 0, 0, 0, 0, "t", {}))
+    assert sorted(p.parent for p in tmp_path.rglob("*.seg")) == sorted(
+        p for p in root.iterdir()
+    )
+
+    hlf._BACKLOGS.clear()
+    assert hlf.get_backlog_stats() == {"../evil": 1, "a/b": 1, "..": 1}
+
+
+def test_parked_readings_commit_before_later_ones(monkeypatch, tmp_path):
+    monkeypatch.setattr(hlf, "BACKLOG_DIR", tmp_path)
+    monkeypatch.setattr(hlf, "_schedule_retry", lambda device_id: None)
+    real_send = hlf._record_sensor_data_direct
+    down = [True]
+
+    def flaky(*args):
+        if down[0]:
+            raise RuntimeError("down")
+        real_send(*args)
+
+    monkeypatch.setattr(hlf, "_record_sensor_data_direct", flaky)
+
+    def send(seq):
+        hlf.record_sensor_data("park1", seq, 0, 0, 0, 0, 0, 0, f"2024-01-01T00:00:0{seq}Z", {})
+        hlf.DEVICE_QUEUES["park1"].join()
+
+    send(1)
+    down[0] = False
+    send(2)  # seq 1 is still parked, so it commits first
+    assert [r["seq"] for r in hlf.get_sensor_history("park1")] == [1, 2]
+
+    down[0] = True
+    send(3)
+    send(4)
+    assert hlf.get_backlog_stats() == {"park1": 2}
+    down[0] = False
+    assert hlf._flush_backlog("park1") is True  # the retry
+    assert [r["seq"] for r in hlf.get_sensor_history("park1")] == [1, 2, 3, 4]
+    assert hlf.get_backlog_stats() == {}
@@ -9,6 +9,12 @@ def main():
         "--info", action="store_true", help="print ledger height and current hash"
     )
     parser.add_argument("--block", type=int, help="fetch a specific block number")
+    parser.add_argument(
+        "--list", type=int, metavar="N", help="list the headers of the last N blocks"
+    )
+    parser.add_argument(
+        "--verify", action="store_true", help="check the hash chain of stored blocks"
+    )
     args = parser.parse_args()
 
     if args.info:
@@ -18,7 +24,21 @@ def main():
 
     if args.block is not None:
         block = hlf_client.get_block(args.block)
-        print(json.dumps(block, indent=2))
+        if block is None:
+            print(f"Block {args.block} not found")
+        else:
+            print(json.dumps(block, indent=2))
+
+    if args.list:
+        for header in hlf_client.list_blocks(limit=args.list):
+            print(
+                f"{header['number']:>6}  {header['timestamp']}  "
+                f"{header['tx_count']:>4} txs  {header['hash']}"
+            )
+
+    if args.verify:
+        bad = hlf_client.BLOCK_STORE.verify()
+        print("Chain OK" if bad is None else f"Chain broken at block {bad}")
 
 
 if __name__ == "__main__":